@@ -8,6 +8,16 @@ try:
     import sys
     import traceback
     import platform
+    import time
+
+    import log_store
+    import env_integrity
+    import warm_launcher
+    import extras_install
+    import details_store
+    import conda_activation
+    import perf_history
+    import fast_rmtree
 except ImportError as e:
     print(f"❌ Import error: {e}")
     print("Please ensure all required modules are installed.")
@@ -101,16 +111,11 @@ class Tee:
 
 def setup_logging():
     # Set up logging at the beginning of your script
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_filename = f"{timestamp}_cellacdc_launch.log"
-    user_home_path = str(pathlib.Path.home())
-    user_profile_path = os.path.join(user_home_path, 'acdc-appdata')
-    log_path = os.path.join(user_profile_path, ".acdc-logs", log_filename)
-    os.makedirs(os.path.dirname(log_path), exist_ok=True)
-
+    # Open log file with UTF-8 encoding, launches in the same second get separate files
+    log_file, log_path = log_store.create_log_file(log_store.get_log_dir(), "launch")
 
-    # Open log file with UTF-8 encoding
-    log_file = open(log_path, 'w', encoding='utf-8', errors='replace')
+    # Compress and expire older logs in the background
+    log_store.start_maintenance(os.path.dirname(log_path), exclude=[log_path])
     
     # Store original stdout/stderr
     original_stdout = sys.stdout
@@ -136,6 +141,56 @@ def setup_logging():
 
     return log_file, original_stdout, original_stderr, log_path
 
+def check_environment(target_dir, venv_path, full=False, use_cache=True):
+    """Verify the environment against the manifest written by the installer"""
+    print("🔍 Checking Cell-ACDC environment integrity...")
+    damaged, from_cache = env_integrity.verify_cached(
+        target_dir, venv_path, full=full, use_cache=use_cache
+    )
+    if damaged is None:
+        print("   ⚠️ No environment manifest found, skipping check (installed with an older installer).")
+    elif damaged:
+        print(f"⚠️ Found {len(damaged)} damaged packages in the environment:")
+        env_integrity.print_damaged(damaged)
+        print("   To reinstall only the damaged packages, run:")
+        print(f'   Cell-ACDC.exe --target "{target_dir}" --repair')
+    else:
+        print(f"   ✅ Environment is intact{' (cached result)' if from_cache else ''}")
+    return damaged
+
+def repair_environment(target_dir, venv_path):
+    """Reinstall the packages whose files are missing or changed"""
+    damaged = check_environment(target_dir, venv_path, use_cache=False)
+    if not damaged:
+        return
+    manifest = env_integrity.read_manifest(target_dir)
+    print(f"🛠️ Reinstalling {len(damaged)} damaged packages...")
+    for cmd in env_integrity.get_repair_commands(venv_path, manifest, damaged):
+        run_subprocess_with_logging(cmd)
+    env_integrity.write_manifest(target_dir, venv_path)
+    damaged = check_environment(target_dir, venv_path, use_cache=False)
+    if damaged:
+        raise RuntimeError("Repair did not fix all damaged packages, please reinstall Cell-ACDC.")
+    print("✅ Environment repaired.")
+
+def get_activated_env(target_dir, venv_path, conda_path, install_details):
+    """Return the environment of the activated conda env, without a shell.
+
+    The activation is computed by the installer and stored in
+    install_details.json; it is only recomputed when the env changed.
+    """
+    activation = install_details.get("activation")
+    if not conda_activation.is_valid(activation, venv_path):
+        if not conda_path or not os.path.exists(conda_path):
+            print("⚠️ Conda activation is outdated and conda was not found, launching without it.")
+            return None
+        print("🔄 Conda environment changed, computing its activation...")
+        activation = conda_activation.compute(conda_path, venv_path)
+        details_store.update_install_details(
+            target_dir, lambda details: details.update(activation=activation)
+        )
+    return conda_activation.apply(activation)
+
 def print_closing_logging(target_dir, install_configs):
         print()
         print("=" * 80)
@@ -149,24 +204,48 @@ def print_closing_logging(target_dir, install_configs):
         print("✅ Run completed successfully!")
 
 if __name__ == "__main__":
+    session_status = "success"
+    acdc_returncode = None
+    perf_recorder = perf_history.RunRecorder("launch")
     try:
         # Set up logging at the beginning of your script
         log_file, original_stdout, original_stderr, log_path = setup_logging()
         start_time = datetime.datetime.now()
+        # Printed by the error handler, also for errors before the install is read
+        repo_url = "https://github.com/SchmollerLab/Cell_ACDC"
 
         parser = argparse.ArgumentParser()
         parser.add_argument('--target', help='Target install path')
+        parser.add_argument('--export_logs', help='Write the logs of all failed sessions to this zip file and exit')
+        parser.add_argument('--verify', action='store_true', help='Hash every file of the environment against the install manifest and exit')
+        parser.add_argument('--repair', action='store_true', help='Reinstall the packages with missing or changed files and exit')
+        parser.add_argument('--warm', action='store_true', help='Launch from a warm Cell-ACDC server with preloaded modules (POSIX only)')
+        parser.add_argument('--extras', help='Install these optional Cell-ACDC extras (comma-separated) before launching')
+        parser.add_argument('--perf_report', action='store_true', help='Show the install and launch performance history with regressed steps and exit')
+        parser.add_argument('--logs', nargs=argparse.REMAINDER, help='List or export logged sessions and exit, e.g. "--logs list --status error" (see log_store.py)')
 
 
         args = parser.parse_args()
         target_dir = args.target if args.target else os.getcwd()
 
+        if args.export_logs:
+            failed_sessions = log_store.query(status="error")
+            log_store.export_bundle(failed_sessions, args.export_logs)
+            print(f"📦 Exported logs of {len(failed_sessions)} failed sessions to: {args.export_logs}")
+            sys.exit(0)
+
+        if args.logs is not None:
+            sys.exit(log_store.main(args.logs))
+
+        if args.perf_report:
+            perf_recorder = None
+            sys.exit(perf_history.main(["report"]))
+
         install_configs = os.path.join(target_dir, "install_details.json")
         if not os.path.exists(install_configs):
             raise FileNotFoundError(f"""Install details file not found: {install_configs},
                                     please either use the --target argument to specify the correct path,
                                     or ensure that the file exists in the current working directory.""")
-        repo_url = "https://github.com/SchmollerLab/Cell_ACDC"
 
         with open(install_configs, 'r', encoding='utf-8', errors='replace') as f:
             install_details = json.load(f)
@@ -175,27 +254,103 @@ if __name__ == "__main__":
         is_conda = install_details.get("conda", False)
         conda_path = install_details.get("conda_path", "")
         conda_path = conda_path.strip('"')
+        perf_recorder.set_config(env_kind="conda" if is_conda else "venv")
+
+        if args.verify or args.repair:
+            perf_recorder = None
+            if args.repair:
+                repair_environment(target_dir, venv_path)
+            elif check_environment(target_dir, venv_path, full=True):
+                session_status = "error"
+            print_closing_logging(target_dir, install_configs)
+            sys.exit(0 if session_status == "success" else 1)
+
+        if args.extras:
+            names = extras_install.select_extras(extras_install.read_extras(venv_path), args.extras)
+            failed_extras = extras_install.install_extras(
+                target_dir, venv_path, names, lambda cmd, step: run_subprocess_with_logging(cmd)
+            )
+            if failed_extras:
+                session_status = "error"
+            install_details = details_store.read_install_details(target_dir)
+        extras_install.print_extras_state(install_details)
+
+        # Stat-only check, cached between launches
+        prepare_start = step_start = time.time()
+        try:
+            check_environment(target_dir, venv_path)
+        except Exception as e:
+            print(f"⚠️ Could not check environment integrity: {e}")
+        perf_recorder.add_step("integrity_check", time.time() - step_start)
         
+        # Leftovers of a previous env deleted by the installer, removed while Cell-ACDC runs
+        fast_rmtree.purge_trash(target_dir, background=True)
+
         print("🚀 Launching CellACDC...")
 
         is_windows = platform.system().lower() == "windows"
+        acdc_args = ["--install_details", os.path.join(target_dir, "install_details.json")]
+
+        launch_env = None
+        if is_conda:
+            step_start = time.time()
+            try:
+                launch_env = get_activated_env(target_dir, venv_path, conda_path, install_details)
+                perf_recorder.add_step("conda_activation", time.time() - step_start)
+            except Exception as e:
+                print(f"⚠️ Could not activate the conda environment: {e}")
+
+        warm_returncode = None
+        warm = args.warm or install_details.get("warm_launch", False)
+        perf_recorder.set_config(warm=bool(warm))
+        perf_recorder.add_step("prepare_launch", time.time() - prepare_start)
+        if warm:
+            warm_env = None
+            if launch_env is not None:
+                warm_env = conda_activation.changed_variables(launch_env)
+            warm_returncode = warm_launcher.launch(target_dir, acdc_args, env=warm_env)
+            if warm_returncode is None and warm_launcher.is_server_running(target_dir):
+                # Answers pings but refused the launch, a second server would not help
+                print("🧊 The warm Cell-ACDC server did not accept the launch, using a cold start.")
+            elif warm_returncode is None:
+                print("🧊 No warm Cell-ACDC server available, using a cold start.")
+                try:
+                    if warm_launcher.start_server(target_dir, env_integrity.get_env_python(venv_path),
+                                                  env=launch_env):
+                        print("   Started a warm server in the background for the next launches.")
+                    else:
+                        print("   ⚠️ Warm launches are not supported on this platform.")
+                except Exception as e:
+                    print(f"   ⚠️ Could not start warm server: {e}")
+            else:
+                print("🔥 Launched from warm Cell-ACDC server.")
 
         # Open PowerShell in the same terminal
-        if not is_conda:
+        if warm_returncode is not None:
+            acdc_returncode = warm_returncode
+        elif not is_conda:
             if is_windows:
                 acdc_exec_path = os.path.join(venv_path, "Scripts", "acdc.exe")
             else:
                 acdc_exec_path = os.path.join(venv_path, "bin", "acdc")
-            subprocess.run([acdc_exec_path,
-                                        "--install_details", os.path.join(target_dir, "install_details.json")])
+            acdc_returncode = subprocess.run([acdc_exec_path,
+                                        "--install_details", os.path.join(target_dir, "install_details.json")]).returncode
 
         else:
             if is_windows:
                 acdc_exec_path = os.path.join(venv_path, "Scripts", "acdc.exe")
             else:
                 acdc_exec_path = os.path.join(venv_path, "bin", "acdc")
-            subprocess.run([acdc_exec_path,
-                                        "--install_details", os.path.join(target_dir, "install_details.json")])
+            acdc_returncode = subprocess.run([acdc_exec_path,
+                                        "--install_details", os.path.join(target_dir, "install_details.json")],
+                                        env=launch_env).returncode
+
+        if acdc_returncode:
+            print(f"⚠️ Cell-ACDC exited with return code {acdc_returncode}")
+            try:
+                check_environment(target_dir, venv_path, use_cache=False)
+            except Exception as e:
+                print(f"⚠️ Could not check environment integrity: {e}")
 
         elapsed_time = datetime.datetime.now() - start_time
         print(f"Thanks for using CellACDC, you spend {elapsed_time.total_seconds():.2f} seconds on this session!")
@@ -204,6 +359,7 @@ if __name__ == "__main__":
         print_closing_logging(target_dir, install_configs)
 
     except Exception as e:
+        session_status = "error"
         # Restore original stdout/stderr for error handling
         sys.stdout = original_stdout
         sys.stderr = original_stderr
@@ -235,6 +391,8 @@ if __name__ == "__main__":
         print(os.path.dirname(log_path))
         print("Please copy the two newest log files, and report this issue to the CellACDC team at:")
         print(repo_url)
+        print("You can also bundle the logs of all failed sessions with:")
+        print("   Cell-ACDC.exe --export_logs cellacdc_logs.zip")
         input("❌!!!CELL-ACDC IS IN ERROR STATE!!!❌ Press Enter to close this window...")
         
     finally:
@@ -245,4 +403,19 @@ if __name__ == "__main__":
             if 'log_file' in locals() and not log_file.closed:
                 log_file.close()
         except:
+            pass
+        try:
+            if 'args' in locals() and not args.export_logs and args.logs is None:
+                log_store.record_session(
+                    log_path, "launch", start_time, session_status,
+                    target=target_dir,
+                    acdc_returncode=acdc_returncode
+                )
+        except Exception:
+            pass
+        try:
+            if 'args' in locals() and not args.export_logs and args.logs is None and perf_recorder is not None:
+                perf_recorder.set(version=perf_history.read_installed_version(venv_path))
+                perf_recorder.save(session_status, target=target_dir, log=log_path)
+        except Exception:
             pass
\ No newline at end of file
@@ -0,0 +1,210 @@
+"""Warm Cell-ACDC server, run with the Python of the Cell-ACDC environment.
+
+Preloads the heavy modules of Cell-ACDC once and forks a ready child for
+every launch request of Cell-ACDC.exe (see warm_launcher.py). POSIX only,
+since it relies on os.fork. Exits after `--idle_timeout` seconds without
+requests.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import select
+import secrets
+import argparse
+import datetime
+import importlib
+import traceback
+
+STATE_FILENAME = "server.json"
+EXIT_MARKER = b"\x00ACDC-EXIT:"
+
+DEFAULT_PRELOAD = [
+    "numpy",
+    "scipy.ndimage",
+    "pandas",
+    "skimage",
+    "matplotlib.pyplot",
+    "qtpy.QtWidgets",
+    "cellacdc",
+]
+
+def log(message):
+    print(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] {message}", flush=True)
+
+def load_entry_point(name="acdc"):
+    """Return the function behind the `acdc` console script"""
+    from importlib.metadata import entry_points
+    for entry_point in entry_points(group="console_scripts"):
+        if entry_point.name == name:
+            return entry_point.load()
+    raise LookupError(f"Console script not found: {name}")
+
+def preload(modules):
+    for module in modules:
+        start_time = time.time()
+        try:
+            importlib.import_module(module)
+            log(f"Preloaded {module} in {time.time() - start_time:.2f} seconds")
+        except Exception as e:
+            log(f"Could not preload {module}: {e}")
+
+def write_state(state_dir, port, token):
+    os.makedirs(state_dir, exist_ok=True)
+    state_path = os.path.join(state_dir, STATE_FILENAME)
+    tmp_path = state_path + f".{os.getpid()}.tmp"
+    # Only the current user may read the token
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump({
+            "pid": os.getpid(),
+            "port": port,
+            "token": token,
+            "python": sys.executable,
+            "started": datetime.datetime.now().isoformat(timespec='seconds'),
+        }, f)
+    os.replace(tmp_path, state_path)
+    return state_path
+
+def remove_state(state_path):
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            if json.load(f).get("pid") != os.getpid():
+                # Replaced by a newer server
+                return
+        os.remove(state_path)
+    except (OSError, ValueError):
+        pass
+
+def read_request(conn, timeout=5):
+    conn.settimeout(timeout)
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    conn.settimeout(None)
+    return json.loads(data.decode('utf-8'))
+
+def run_child(conn, other_fds, request, entry_point):
+    """Runs in the forked child: become the Cell-ACDC process of the request"""
+    exit_code = 1
+    try:
+        for fd in other_fds:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        os.setsid()
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        # Output goes straight back to the launcher
+        os.dup2(conn.fileno(), 1)
+        os.dup2(conn.fileno(), 2)
+        sys.stdout.reconfigure(line_buffering=True)
+        sys.stderr.reconfigure(line_buffering=True)
+        os.chdir(request.get("cwd") or os.getcwd())
+        os.environ.update(request.get("env") or {})
+        sys.argv = ["acdc", *request.get("argv", [])]
+        try:
+            result = entry_point()
+            exit_code = result if isinstance(result, int) else 0
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except Exception:
+            pass
+        os._exit(exit_code)
+
+def serve(state_dir, idle_timeout, modules):
+    if not hasattr(os, "fork"):
+        log("Warm server requires os.fork, which is not available on this platform.")
+        return 1
+
+    preload(modules)
+    entry_point = load_entry_point()
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(16)
+    token = secrets.token_hex(16)
+    state_path = write_state(state_dir, listener.getsockname()[1], token)
+    log(f"Warm server ready on port {listener.getsockname()[1]} (pid {os.getpid()})")
+
+    children = {}
+    last_activity = time.time()
+    try:
+        while True:
+            # Reap finished children and report their exit code to the launcher
+            while children:
+                try:
+                    pid, status = os.waitpid(-1, os.WNOHANG)
+                except ChildProcessError:
+                    break
+                if pid == 0:
+                    break
+                conn = children.pop(pid, None)
+                if conn is not None:
+                    exit_code = os.waitstatus_to_exitcode(status)
+                    log(f"Launch {pid} exited with code {exit_code}")
+                    try:
+                        conn.sendall(EXIT_MARKER + str(exit_code).encode() + b"\n")
+                    except OSError:
+                        pass
+                    conn.close()
+                last_activity = time.time()
+
+            if not children and time.time() - last_activity > idle_timeout:
+                log(f"No launch requests for {idle_timeout} seconds, shutting down.")
+                break
+
+            readable, _, _ = select.select([listener], [], [], 0.5)
+            if not readable:
+                continue
+            conn, _ = listener.accept()
+            try:
+                request = read_request(conn)
+            except (OSError, ValueError):
+                conn.close()
+                continue
+            if not secrets.compare_digest(str(request.get("token", "")), token):
+                log("Rejected launch request with invalid token")
+                conn.close()
+                continue
+            if request.get("ping"):
+                conn.sendall(b"pong\n")
+                conn.close()
+                continue
+
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                other_fds = [listener.fileno()] + [c.fileno() for c in children.values()]
+                run_child(conn, other_fds, request, entry_point)
+            log(f"Launch {pid} started with arguments {request.get('argv', [])}")
+            children[pid] = conn
+            last_activity = time.time()
+    finally:
+        remove_state(state_path)
+        listener.close()
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm Cell-ACDC launch server")
+    parser.add_argument('--state_dir', required=True, help='Folder of the server state file')
+    parser.add_argument('--idle_timeout', type=float, default=1800, help='Seconds without requests before shutting down')
+    parser.add_argument('--preload', help='Comma-separated modules to import at start')
+    args = parser.parse_args()
+    modules = args.preload.split(",") if args.preload else DEFAULT_PRELOAD
+    return serve(args.state_dir, args.idle_timeout, modules)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+import os
+import json
+import shutil
+import datetime
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import mirrors
+import payload_stage
+
+# The seven flags every target needs, same as a single flag-mode install
+TARGET_FLAGS = [
+    'target',
+    'use_github',
+    'version',
+    'python_path',
+    'embeddedpyflag',
+    'pyversion',
+    'custom_CellACDC_path',
+]
+
+# Options that decide what ends up in the shared caches. Targets sharing
+# these values are grouped so that only one of them runs cold.
+CACHE_KEY_FLAGS = [
+    'use_github',
+    'version',
+    'python_path',
+    'embeddedpyflag',
+    'pyversion',
+    'custom_CellACDC_path',
+]
+
+# Folders of an install that the installer expects in place before it runs,
+# as the setup wizard copies them: {folder: options that need it}
+PAYLOAD_FOLDERS = {
+    "miniforge": lambda options: options["embeddedpyflag"].lower() == "true",
+    "portable_git": lambda options: os.name == "nt" and options["use_github"].lower() == "true",
+}
+
+repo_url = "https://github.com/SchmollerLab/Cell_ACDC"
+
+def load_manifest(manifest_path):
+    """Load a batch manifest and merge per-target options with the defaults.
+
+    The manifest is a JSON file like:
+
+        {
+            "max_workers": 4,
+            "cache_dir": "D:/acdc-cache",
+            "defaults": {"use_github": "false", "version": "1.6.2", ...},
+            "targets": [{"target": "D:/seats/01"}, ...]
+        }
+    """
+    with open(manifest_path, 'r', encoding='utf-8', errors='replace') as f:
+        manifest = json.load(f)
+
+    defaults = manifest.get("defaults", {})
+    targets = []
+    for i, entry in enumerate(manifest.get("targets", [])):
+        options = {**defaults, **entry}
+        missing = [flag for flag in TARGET_FLAGS if options.get(flag) in (None, "")]
+        if missing:
+            raise ValueError(
+                f"Target #{i + 1} in {manifest_path} is missing: "
+                f"{', '.join(['--' + flag for flag in missing])}"
+            )
+        targets.append({flag: str(options[flag]) for flag in TARGET_FLAGS})
+
+    if not targets:
+        raise ValueError(f"No targets found in batch manifest: {manifest_path}")
+
+    # Two installs in the same folder (or one inside the other) would overwrite each other
+    paths = {}
+    for options in targets:
+        path = os.path.normcase(os.path.abspath(options["target"]))
+        if path in paths:
+            raise ValueError(f"Target {options['target']} appears twice in {manifest_path}")
+        paths[path] = options["target"]
+    for path, target in paths.items():
+        parent = os.path.dirname(path)
+        while parent != os.path.dirname(parent):
+            if parent in paths:
+                raise ValueError(
+                    f"Target {target} in {manifest_path} is inside target {paths[parent]}, "
+                    f"every target needs its own folder"
+                )
+            parent = os.path.dirname(parent)
+
+    return manifest, targets
+
+def get_missing_payload(options):
+    """Return the payload folders a target needs but does not have yet"""
+    return [name for name, is_needed in PAYLOAD_FOLDERS.items()
+            if is_needed(options) and not os.path.isdir(os.path.join(options["target"], name))]
+
+def check_payload(targets, payload_dir):
+    """Fail early if a target needs a payload folder that cannot be staged"""
+    unavailable = {}
+    for options in targets:
+        for name in get_missing_payload(options):
+            if not payload_dir or not os.path.isdir(os.path.join(payload_dir, name)):
+                unavailable.setdefault(name, []).append(options["target"])
+    if unavailable:
+        details = "; ".join(f"{name} for {', '.join(paths)}"
+                            for name, paths in unavailable.items())
+        raise ValueError(
+            f"Missing install payload ({details}). Run the batch from an existing "
+            f"Cell-ACDC install or set \"payload_dir\" to a folder containing it."
+        )
+
+# Files conda appends to in place, a hard link would share the changes
+PAYLOAD_COPIED_FILES = ("conda-meta", "urls", "urls.txt", ".condarc")
+
+def _link_or_copy(source_path, dst_path):
+    parts = os.path.normpath(source_path).split(os.sep)
+    if any(part in PAYLOAD_COPIED_FILES for part in parts[-2:]):
+        shutil.copy2(source_path, dst_path)
+        return
+    try:
+        payload_stage.link_file(source_path, dst_path)
+    except OSError:
+        # Other drive or no hard link support
+        shutil.copy2(source_path, dst_path)
+
+def stage_payload(options, payload_dir):
+    """Provide the payload folders a target needs (e.g. Miniforge) from `payload_dir`.
+
+    Files are hard-linked where the file system allows it, so every new
+    target costs little more than its folder entries.
+    """
+    for name in get_missing_payload(options):
+        source = os.path.join(payload_dir, name)
+        dst = os.path.join(options["target"], name)
+        # Staged next to the final folder, so an interrupted copy is never used
+        tmp_dst = dst + ".staging"
+        shutil.rmtree(tmp_dst, ignore_errors=True)
+        os.makedirs(os.path.dirname(tmp_dst), exist_ok=True)
+        shutil.copytree(source, tmp_dst, symlinks=True, copy_function=_link_or_copy)
+        os.replace(tmp_dst, dst)
+
+def get_git_mirror_path(cache_dir):
+    return os.path.join(cache_dir, "git", "Cell_ACDC.git")
+
+def _run_git(cmd):
+    """Run a git command, failing over to the next git mirror on connection errors"""
+    while True:
+        result = subprocess.run(cmd, capture_output=True, text=True, errors='replace')
+        output = result.stdout + result.stderr
+        print(output, end="")
+        if result.returncode == 0:
+            return
+        retry_cmd = mirrors.on_retry(cmd, output)
+        if retry_cmd == cmd:
+            raise subprocess.CalledProcessError(result.returncode, cmd, output)
+        cmd = retry_cmd
+
+def update_git_mirror(cache_dir, git_exec="git"):
+    """Create or refresh the bare mirror that GitHub installs clone from.
+
+    Done once by the batch process before any target starts, so that the
+    targets never write to the mirror concurrently.
+    """
+    mirror_path = get_git_mirror_path(cache_dir)
+    if os.path.exists(mirror_path):
+        print(f"🔄 Updating shared git mirror: {mirror_path}")
+        # From the selected git mirror rather than origin, same refs as `clone --mirror`
+        cmd = [git_exec, "--git-dir", mirror_path, "fetch", "--prune", repo_url, "+refs/*:refs/*"]
+    else:
+        print(f"📥 Creating shared git mirror: {mirror_path}")
+        os.makedirs(os.path.dirname(mirror_path), exist_ok=True)
+        cmd = [git_exec, "clone", "--mirror", repo_url, mirror_path]
+    try:
+        _run_git(cmd)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"⚠️ Could not prepare shared git mirror ({e}), targets will clone directly.")
+        return False
+    return True
+
+def build_target_command(installer_cmd, options, cache_dir):
+    cmd = list(installer_cmd)
+    for flag in TARGET_FLAGS:
+        cmd.extend([f"--{flag}", options[flag]])
+    cmd.extend(["--cache_dir", cache_dir, "--non_interactive"])
+    return cmd
+
+def _run_target(index, total, installer_cmd, options, cache_dir, logs_dir,
+                warmup, print_lock, payload_dir=None):
+    log_name = f"{index + 1:03d}_{os.path.basename(os.path.normpath(options['target']))}.log"
+    output_log = os.path.join(logs_dir, log_name)
+    cmd = build_target_command(installer_cmd, options, cache_dir)
+
+    env = os.environ.copy()
+    env["PYTHONIOENCODING"] = "utf-8"
+    env["PYTHONUTF8"] = "1"
+
+    with print_lock:
+        print(f"🚀 [{index + 1}/{total}] Starting install: {options['target']}"
+              f"{' (cache warm-up)' if warmup else ''}")
+
+    start_time = datetime.datetime.now()
+    try:
+        missing_payload = get_missing_payload(options)
+        if missing_payload:
+            with print_lock:
+                print(f"📦 [{index + 1}/{total}] Staging {', '.join(missing_payload)} "
+                      f"into: {options['target']}")
+            stage_payload(options, payload_dir)
+        with open(output_log, 'w', encoding='utf-8', errors='replace') as f:
+            return_code = subprocess.run(
+                cmd, stdin=subprocess.DEVNULL, stdout=f,
+                stderr=subprocess.STDOUT, env=env
+            ).returncode
+        error = ""
+    except Exception as e:
+        return_code = -1
+        error = str(e)
+    end_time = datetime.datetime.now()
+    duration = (end_time - start_time).total_seconds()
+
+    status = "success" if return_code == 0 else "failed"
+    with print_lock:
+        icon = "✅" if status == "success" else "❌"
+        print(f"{icon} [{index + 1}/{total}] {options['target']}: {status} "
+              f"in {duration:.2f} seconds")
+
+    return {
+        "target": options["target"],
+        "options": options,
+        "status": status,
+        "return_code": return_code,
+        "error": error,
+        "warmup": warmup,
+        "started": start_time.isoformat(timespec='seconds'),
+        "finished": end_time.isoformat(timespec='seconds'),
+        "duration_s": round(duration, 2),
+        "output_log": output_log,
+    }
+
+def run_batch(manifest_path, installer_cmd, max_workers=None, report_path=None,
+              cache_dir=None, payload_dir=None, git_exec="git"):
+    """Install Cell-ACDC into every target of a manifest.
+
+    Each target runs the regular installer in flag mode as a child process,
+    at most `max_workers` at a time. All targets share one cache directory
+    (pip downloads and built wheels, conda packages and a git mirror). The
+    first target of every group with identical options runs before the
+    rest of its group, so that the others install from warm caches.
+
+    New targets get the Miniforge and portable Git folders they need copied
+    from `payload_dir` (the manifest's "payload_dir" takes precedence),
+    usually an existing Cell-ACDC install. `git_exec` maintains the shared
+    git mirror.
+
+    Returns the aggregate report, which is also written as JSON.
+    """
+    manifest, targets = load_manifest(manifest_path)
+    max_workers = max_workers or manifest.get("max_workers") or 4
+    max_workers = max(1, int(max_workers))
+    cache_dir = cache_dir or manifest.get("cache_dir")
+    if not cache_dir:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(manifest_path)), "acdc-cache")
+    cache_dir = os.path.abspath(cache_dir)
+    payload_dir = manifest.get("payload_dir") or payload_dir
+    check_payload(targets, payload_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    if not report_path:
+        report_path = os.path.join(
+            os.path.dirname(os.path.abspath(manifest_path)),
+            f"{timestamp}_batch_report.json"
+        )
+    report_path = os.path.abspath(report_path)
+    logs_dir = os.path.splitext(report_path)[0] + "_logs"
+    os.makedirs(logs_dir, exist_ok=True)
+
+    print(f"📋 Batch manifest: {manifest_path}")
+    print(f"   Targets: {len(targets)}")
+    print(f"   Max parallel installs: {max_workers}")
+    print(f"   Shared cache: {cache_dir}")
+    if payload_dir:
+        print(f"   Payload for new targets: {payload_dir}")
+    print(f"   Report: {report_path}")
+
+    if any(options["use_github"].lower() == "true" for options in targets):
+        update_git_mirror(cache_dir, git_exec)
+
+    # Split targets into one warm-up target per group and the remaining ones
+    warmup_indices = []
+    rest_indices = []
+    seen_keys = set()
+    for i, options in enumerate(targets):
+        key = tuple(options[flag].lower() for flag in CACHE_KEY_FLAGS)
+        if key in seen_keys:
+            rest_indices.append(i)
+        else:
+            seen_keys.add(key)
+            warmup_indices.append(i)
+
+    results = [None] * len(targets)
+    print_lock = threading.Lock()
+    start_time = datetime.datetime.now()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for indices, warmup in ((warmup_indices, True), (rest_indices, False)):
+            futures = {
+                i: executor.submit(
+                    _run_target, i, len(targets), installer_cmd, targets[i],
+                    cache_dir, logs_dir, warmup, print_lock, payload_dir
+                )
+                for i in indices
+            }
+            for i, future in futures.items():
+                results[i] = future.result()
+    end_time = datetime.datetime.now()
+
+    succeeded = sum(1 for result in results if result["status"] == "success")
+    report = {
+        "manifest": os.path.abspath(manifest_path),
+        "started": start_time.isoformat(timespec='seconds'),
+        "finished": end_time.isoformat(timespec='seconds'),
+        "duration_s": round((end_time - start_time).total_seconds(), 2),
+        "max_workers": max_workers,
+        "cache_dir": cache_dir,
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "targets": results,
+    }
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=4)
+
+    print("=" * 80)
+    print("BATCH SUMMARY")
+    print("=" * 80)
+    print(f"Succeeded: {succeeded}/{len(results)}")
+    print(f"Total Duration: {report['duration_s']:.2f} seconds")
+    print(f"Report: {report_path}")
+    for result in results:
+        if result["status"] != "success":
+            print(f"❌ {result['target']} (see {result['output_log']})")
+    print("=" * 80)
+
+    return report
@@ -1,8 +1,17 @@
 import subprocess
 import shutil
 import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import statistics
 import requests
 
+import fast_rmtree
+import payload_stage
+
 # venv requirements: 
 # pip install pyinstaller
 # pip install requests
@@ -16,6 +25,8 @@ icon_path = r"path\to\icon.ico"
 install_py = r"install_CellACDC.py"
 # source code for the Cell-ACDC launcher
 launch_py = r"CellACDC.py"
+# warm launch server, shipped as source since it runs in the installed environment
+warm_server_py = r"acdc_warm_server.py"
 # python miniforge folder
 mini_source = r"path\to\miniforge3"
 # path to portable git source code, used for the installer
@@ -33,6 +44,20 @@ acdc_version = "1.6.2"
 acdc_version_no_points = acdc_version.replace(".", "_")
 
 build_output = os.path.join(acdc_version, "dist")
+# Compare payload files by hash instead of size and modification time when staging
+stage_verify_hash = False
+# PyInstaller build mode per executable: "onefile" (a single exe that unpacks
+# its runtime to a temp folder on every start) or "onedir" (the exe next to
+# an unpacked "<name>_internal" folder). Compare with: python compile.py --benchmark
+build_modes = {
+    "Cell-ACDC-installer": "onefile",
+    "Cell-ACDC": "onefile",
+}
+# Executables compared by --benchmark, the installer needs admin rights to start
+benchmark_targets = [(launch_py, "Cell-ACDC")]
+# Arguments of the benchmark runs, the launcher prints its log header first
+benchmark_args = ["--help"]
+benchmark_runs = 5
 
 def get_pypi_versions(package_name):
     url = f"https://pypi.org/pypi/{package_name}/json"
@@ -48,16 +73,25 @@ def get_pypi_versions(package_name):
     else:
         raise ValueError(f"Package {package_name} not found on PyPI")
 
-def run_pyinstaller(python_script, exe_name, admin=False):
+def get_contents_dir(exe_name):
+    """Runtime folder of a onedir build, unique per executable in {app}"""
+    return f"{exe_name}_internal"
+
+def run_pyinstaller(python_script, exe_name, admin=False, mode=None, output_dir=build_output):
     # if ps1_name is None:
     #     ps1_name = os.path.basename(python_script).replace(".py", ".ps1")
 
     # if not isinstance(ps1_name, list):
     #     ps1_name = [ps1_name]
+    mode = mode or build_modes.get(exe_name, "onefile")
+    if mode == "onedir":
+        mode_args = ["--onedir", f"--contents-directory={get_contents_dir(exe_name)}"]
+    else:
+        mode_args = ["--onefile"]
     
     cmd = [
         "pyinstaller",
-        "--onefile",
+        *mode_args,
         "--console",
         "--noconfirm",  # Don't ask for confirmation
         f"--name={exe_name}",
@@ -73,17 +107,109 @@ def run_pyinstaller(python_script, exe_name, admin=False):
     #     ps1 = os.path.join(os.path.dirname(python_script), ps1)
     #     cmd.append(f"--add-data={ps1};.")
 
-    print(f"📦 Compiling: {python_script}")
+    print(f"📦 Compiling: {python_script} ({mode})")
     subprocess.run(cmd, check=True)
 
-    exe_path = os.path.join("dist", exe_name + ".exe")
-    target_path = os.path.join(build_output, exe_name + ".exe")
-    shutil.move(exe_path, target_path)
-    filename = os.path.basename(exe_path)
-    target_path = os.path.join(os.path.dirname(os.path.dirname(target_path)), filename.replace(".exe", ".spec"))
-    shutil.move(filename.replace(".exe", ".spec"), target_path)
+    exe_file = exe_name + ".exe" if os.name == "nt" else exe_name
+    if mode == "onedir":
+        dist_dir = os.path.join("dist", exe_name)
+        contents_path = os.path.join(output_dir, get_contents_dir(exe_name))
+        if os.path.exists(contents_path):
+            fast_rmtree.remove_tree(contents_path)
+        shutil.move(os.path.join(dist_dir, get_contents_dir(exe_name)), contents_path)
+        exe_path = os.path.join(dist_dir, exe_file)
+    else:
+        dist_dir = None
+        exe_path = os.path.join("dist", exe_file)
+    exe_target_path = os.path.join(output_dir, exe_file)
+    shutil.move(exe_path, exe_target_path)
+    if dist_dir is not None:
+        os.rmdir(dist_dir)
+    target_path = os.path.join(os.path.dirname(os.path.dirname(exe_target_path)), exe_name + ".spec")
+    shutil.move(exe_name + ".spec", target_path)
     # clean up the build artifacts
-    print(f"✅ Copied to: {target_path}\n")
+    print(f"✅ Copied to: {exe_target_path}\n")
+    return exe_target_path
+
+def get_iss_executable_files():
+    """[Files] entries of the compiled executables, following their build mode"""
+    lines = []
+    for exe_name, mode in build_modes.items():
+        lines.append(f'Source: "dist\\{exe_name}.exe"; DestDir: "{{app}}"; Flags: ignoreversion')
+        if mode == "onedir":
+            contents_dir = get_contents_dir(exe_name)
+            lines.append(f'Source: "dist\\{contents_dir}\\*"; DestDir: "{{app}}\\{contents_dir}"; '
+                         'Flags: ignoreversion recursesubdirs createallsubdirs')
+    return "\n".join(lines)
+
+def measure_startup(exe_path, args=(), timeout=120):
+    """Run an executable once, return (time to first output, time to exit) in seconds"""
+    # Keep logs and app data written by the executable out of the user profile
+    with tempfile.TemporaryDirectory() as home_dir:
+        env = {**os.environ, "HOME": home_dir, "USERPROFILE": home_dir, "PYTHONUNBUFFERED": "1"}
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [os.path.abspath(exe_path), *args], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT, env=env, cwd=home_dir
+        )
+        first_output = []
+
+        def read_output():
+            # Read on a thread, an executable that hangs must not hang the build
+            if process.stdout.read(1):
+                first_output.append(time.perf_counter() - start)
+            process.stdout.read()
+
+        reader = threading.Thread(target=read_output, daemon=True)
+        reader.start()
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+            raise RuntimeError(f"{exe_path} did not exit within {timeout} seconds")
+        exit_time = time.perf_counter() - start
+        reader.join(timeout=5)
+        return (first_output[0] if first_output else None), exit_time
+
+def benchmark_startup(exe_path, runs=benchmark_runs, args=benchmark_args):
+    """Measure the cold (first run after the build) and warm startup of an executable"""
+    results = [measure_startup(exe_path, args) for _ in range(runs + 1)]
+    first_outputs = [first_output for first_output, _ in results[1:] if first_output is not None]
+    return {
+        "exe": exe_path,
+        "cold_first_output": results[0][0],
+        "cold_exit": results[0][1],
+        "warm_first_output": statistics.median(first_outputs) if first_outputs else None,
+        "warm_first_output_min": min(first_outputs) if first_outputs else None,
+        "warm_first_output_max": max(first_outputs) if first_outputs else None,
+        "warm_exit": statistics.median(exit_time for _, exit_time in results[1:]),
+        "runs": runs,
+    }
+
+def print_benchmark(results):
+    def seconds(value):
+        return f"{value:.2f}s" if value is not None else "n/a"
+    print(f"{'executable':<40}{'mode':<9}{'cold':>8}{'warm':>8}{'min':>8}{'max':>8}{'exit':>8}")
+    for mode, result in results:
+        print(f"{os.path.basename(result['exe']):<40}{mode:<9}{seconds(result['cold_first_output']):>8}"
+              f"{seconds(result['warm_first_output']):>8}{seconds(result['warm_first_output_min']):>8}"
+              f"{seconds(result['warm_first_output_max']):>8}{seconds(result['warm_exit']):>8}")
+    print("Times to first output; cold is the first start after the build, warm the median of "
+          "the following runs, exit the median time until the process ended.")
+
+def run_benchmark(runs=benchmark_runs):
+    """Build the benchmark targets in both modes and compare their startup"""
+    results = []
+    for python_script, exe_name in benchmark_targets:
+        for mode in ("onefile", "onedir"):
+            output_dir = os.path.join(acdc_version, "benchmark", mode)
+            os.makedirs(output_dir, exist_ok=True)
+            exe_path = run_pyinstaller(python_script, exe_name, mode=mode, output_dir=output_dir)
+            print(f"⏱️ Benchmarking {exe_name} ({mode}), {runs} warm runs...")
+            results.append((mode, benchmark_startup(exe_path, runs)))
+    print_benchmark(results)
+    return results
 
 def move_build_folder(acdc_version):
     print(f"📦 Moving build folder to: {acdc_version}"
@@ -92,12 +218,10 @@ def move_build_folder(acdc_version):
         shutil.move("build", acdc_version)
     except shutil.Error as e:
         print(f"❌ Error moving build folder: {e}")
-        try:
-            shutil.rmtree("build")
-        except Exception as e:
-            import time
-            time.sleep(3)
-            shutil.rmtree("build")
+        # Retries files still locked by the build with backoff
+        result = fast_rmtree.remove_tree("build")
+        if not result.success:
+            print(f"❌ Could not delete {len(result.failed)} files of the build folder")
         return False
     return True
 
@@ -122,8 +246,32 @@ def move_build_folder(acdc_version):
 #     print(f"✅ Copied python")
 #     return True
 
+def clean_build_folder(acdc_version):
+    """Remove the previous build, except the staged payloads"""
+    if not os.path.isdir(acdc_version):
+        return
+    for entry in os.listdir(acdc_version):
+        if entry != payload_stage.STAGE_DIRNAME:
+            fast_rmtree.remove_tree(os.path.join(acdc_version, entry), background=True)
+
+def stage_payloads(acdc_version):
+    """Stage Miniforge and Portable Git in the build folder, return their paths
+
+    Sources that do not exist are passed to Inno Setup unchanged.
+    """
+    staged = []
+    for source, name in ((mini_source, "miniforge"), (git_source, "portable_git")):
+        if os.path.isdir(source):
+            staged.append(payload_stage.stage_payload(
+                source, acdc_version, name, verify_hash=stage_verify_hash
+            ))
+        else:
+            print(f"⚠️ Payload folder not found, not staged: {source}")
+            staged.append(source)
+    return [os.path.abspath(path) if os.path.isdir(path) else path for path in staged]
+
 def update_iss_file(iss_path, acdc_version, available_versions, 
-                    py_source):
+                    py_source, git_source_path=git_source):
     print(f"🔧 Updating ISS file: {iss_path}")
     iss_path_new = os.path.join(acdc_version, "CellACDC.iss")
 
@@ -158,7 +306,9 @@ def update_iss_file(iss_path, acdc_version, available_versions,
 
     content = content.replace("CELLACDC_FILE_NAME", os.path.basename(cell_ACDC_source))  # Select the correct file name for Cell-ACDC source code programmatically
 
-    content = content.replace("GIT_SOURCE", git_source)  # Ensure this is set correctly
+    content = content.replace("GIT_SOURCE", git_source_path)  # Ensure this is set correctly
+
+    content = content.replace("EXECUTABLE_FILES", get_iss_executable_files())
 
     # Write the updated content back
     with open(iss_path_new, 'w') as file:
@@ -190,17 +340,53 @@ def check_package_installs():
         print("❌ Requests is not installed. Please install it using 'pip install requests'.")
         raise SystemExit("Exiting due to missing Requests.")
 
+    try:
+        import packaging
+        print("✅ Packaging is installed.")
+    except ImportError:
+        print("❌ Packaging is not installed. Please install it using 'pip install packaging'.")
+        raise SystemExit("Exiting due to missing Packaging.")
+
+    try:
+        import psutil
+        print("✅ Psutil is installed.")
+    except ImportError:
+        # Bundled into the installer for resource telemetry outside Linux
+        print("❌ Psutil is not installed. Please install it using 'pip install psutil'.")
+        raise SystemExit("Exiting due to missing Psutil.")
+
 # # build
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the Cell-ACDC installer")
+    parser.add_argument('--mode', action='append', default=[], metavar='NAME=MODE',
+                        help='Build mode of an executable, e.g. Cell-ACDC=onedir (onefile or onedir)')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Build the launcher in both modes, compare their startup times and exit')
+    parser.add_argument('--benchmark_runs', type=int, default=benchmark_runs,
+                        help='Number of warm runs per executable in --benchmark')
+    args = parser.parse_args()
+    for override in args.mode:
+        exe_name, _, mode = override.partition("=")
+        if exe_name not in build_modes or mode not in ("onefile", "onedir"):
+            parser.error(f"Invalid --mode {override}, expected one of "
+                         f"{', '.join(build_modes)} = onefile or onedir")
+        build_modes[exe_name] = mode
+
     check_package_installs()
-    shutil.rmtree(acdc_version, ignore_errors=True)  # Clean up previous builds
+    if args.benchmark:
+        run_benchmark(args.benchmark_runs)
+        sys.exit(0)
+    clean_build_folder(acdc_version)  # Clean up previous builds
     os.makedirs(build_output, exist_ok=True)
     run_pyinstaller(install_py, "Cell-ACDC-installer", admin=True)
     run_pyinstaller(launch_py, "Cell-ACDC")
+    shutil.copy2(warm_server_py, build_output)
     # copy_python_success = copy_python(mini_source, os.path.join(acdc_version, "dist", "miniforge"))
     versions = get_pypi_versions("cellacdc")
     print(f"📋 Found {len(versions)} available versions: {versions}...")
-    update_iss_file(iss_file, acdc_version, versions, mini_source)
+    staged_mini_source, staged_git_source = stage_payloads(acdc_version)
+    update_iss_file(iss_file, acdc_version, versions, staged_mini_source,
+                    git_source_path=staged_git_source)
     move_build_folder_success = move_build_folder(acdc_version)
     print("🎉 Compilation completed successfully!")
 
@@ -0,0 +1,110 @@
+import os
+import sys
+import glob
+import json
+import hashlib
+import datetime
+import subprocess
+
+# Variables holding lists of paths, activation adds entries to them
+PATH_VARIABLES = {"PATH", "LD_LIBRARY_PATH", "DYLD_LIBRARY_PATH", "DYLD_FALLBACK_LIBRARY_PATH",
+                  "PYTHONPATH", "XDG_DATA_DIRS"}
+# Set by the shell running the activation, not by the activation itself
+IGNORED_VARIABLES = {"_", "SHLVL", "PWD", "OLDPWD", "PS1", "PROMPT", "CONDA_PROMPT_MODIFIER"}
+ENV_MARKER = "ACDC_ACTIVATED_ENV:"
+
+_DUMP_SCRIPT = f"import os, json; print({ENV_MARKER!r} + json.dumps(dict(os.environ)))"
+
+def _key(name):
+    # Environment variable names are case-insensitive on Windows
+    return name.upper() if os.name == "nt" else name
+
+def get_fingerprint(env_path):
+    """Identify the conda state of the environment.
+
+    Every conda transaction updates conda-meta/history, and the activation
+    scripts live in etc/conda/activate.d, so the stored activation is
+    recomputed when either changes.
+    """
+    sha256 = hashlib.sha256()
+    paths = [os.path.join(env_path, "conda-meta", "history")]
+    paths += sorted(glob.glob(os.path.join(env_path, "etc", "conda", "activate.d", "*")))
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        sha256.update(f"{os.path.relpath(path, env_path)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return sha256.hexdigest()
+
+def _split(value):
+    return [entry for entry in value.split(os.pathsep) if entry]
+
+def compute_diff(base_env, activated_env):
+    """Return what activation changed, as set/unset variables and path entries"""
+    base = {_key(name): value for name, value in base_env.items()}
+    activated = {_key(name): value for name, value in activated_env.items()}
+    diff = {"set": {}, "unset": [], "paths": {}}
+    for name, value in activated.items():
+        if name in IGNORED_VARIABLES or base.get(name) == value:
+            continue
+        if name in PATH_VARIABLES:
+            base_entries = _split(base.get(name, ""))
+            entries = _split(value)
+            first_base = next((i for i, entry in enumerate(entries) if entry in base_entries), len(entries))
+            diff["paths"][name] = {
+                "prepend": [entry for entry in entries[:first_base] if entry not in base_entries],
+                "append": [entry for entry in entries[first_base:] if entry not in base_entries],
+            }
+        else:
+            diff["set"][name] = value
+    diff["unset"] = sorted(name for name in base if name not in activated and name not in IGNORED_VARIABLES)
+    return diff
+
+def compute(conda_path, env_path, timeout=300):
+    """Activate the environment once with `conda run` and return the diff"""
+    # Start from a clean slate, as if no conda environment was active
+    base_env = {name: value for name, value in os.environ.items()
+                if not _key(name).startswith("CONDA_") and _key(name) != "PYTHONHOME"}
+    result = subprocess.run(
+        [conda_path, "run", "-p", env_path, "python", "-c", _DUMP_SCRIPT],
+        env=base_env, capture_output=True, text=True, encoding='utf-8',
+        errors='replace', timeout=timeout
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith(ENV_MARKER):
+            activated_env = json.loads(line[len(ENV_MARKER):])
+            break
+    else:
+        raise RuntimeError(f"conda run failed ({result.returncode}): {result.stderr.strip()[-500:]}")
+    activation = compute_diff(base_env, activated_env)
+    activation["fingerprint"] = get_fingerprint(env_path)
+    activation["computed"] = datetime.datetime.now().isoformat(timespec='seconds')
+    return activation
+
+def is_valid(activation, env_path):
+    return bool(activation) and activation.get("fingerprint") == get_fingerprint(env_path)
+
+def apply(activation, base_env=None):
+    """Return a copy of `base_env` (default: os.environ) with the activation applied"""
+    env = dict(os.environ if base_env is None else base_env)
+    names = {_key(name): name for name in env}
+    for name in activation.get("unset", []):
+        env.pop(names.get(name, name), None)
+    for name, value in activation.get("set", {}).items():
+        env[names.get(name, name)] = value
+    for name, entries in activation.get("paths", {}).items():
+        name = names.get(name, name)
+        current = _split(env.get(name, ""))
+        prepend = [entry for entry in entries["prepend"] if entry not in current]
+        append = [entry for entry in entries["append"] if entry not in current]
+        env[name] = os.pathsep.join(prepend + current + append)
+    return env
+
+def changed_variables(env, base_env=None):
+    """Return the variables of `env` that differ from `base_env` (default: os.environ)"""
+    base_env = os.environ if base_env is None else base_env
+    return {name: value for name, value in env.items() if base_env.get(name) != value}
+
+if __name__ == "__main__":
+    print(json.dumps(compute(sys.argv[1], sys.argv[2]), indent=4))
@@ -0,0 +1,35 @@
+import os
+import json
+
+from file_lock import FileLock
+
+INSTALL_DETAILS_FILENAME = "install_details.json"
+LOCK_FILENAME = "install_details.lock"
+
+def DetailsLock(target_dir, timeout=90):
+    """Cross-process lock around updates of install_details.json"""
+    return FileLock(os.path.join(target_dir, LOCK_FILENAME), timeout=timeout)
+
+def read_install_details(target_dir):
+    with open(os.path.join(target_dir, INSTALL_DETAILS_FILENAME), 'r', encoding='utf-8', errors='replace') as f:
+        return json.load(f)
+
+def update_install_details(target_dir, update, create=False):
+    """Apply `update(install_details)` to install_details.json under the lock.
+
+    The file is replaced atomically, so readers never see a partial file.
+    With `create=True` a missing file is started from empty details.
+    Returns the updated details.
+    """
+    details_path = os.path.join(target_dir, INSTALL_DETAILS_FILENAME)
+    with DetailsLock(target_dir):
+        if create and not os.path.exists(details_path):
+            install_details = {}
+        else:
+            install_details = read_install_details(target_dir)
+        update(install_details)
+        tmp_path = details_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(install_details, f, indent=4)
+        os.replace(tmp_path, details_path)
+    return install_details
@@ -0,0 +1,354 @@
+import os
+import re
+import glob
+import gzip
+import json
+import time
+import base64
+import hashlib
+import datetime
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+MANIFEST_FILENAME = "env_manifest.json.gz"
+VERIFY_CACHE_FILENAME = "env_verify_cache.json"
+# A successful verification is trusted for this long, unless the manifest,
+# the site-packages folder or one of its package folders changed in the
+# meantime. Changes deeper in a package only show up after this window
+VERIFY_CACHE_HOURS = 6
+
+def get_site_packages(env_path):
+    """Return the site-packages folder of a venv or conda environment"""
+    windows_path = os.path.join(env_path, "Lib", "site-packages")
+    if os.path.isdir(windows_path):
+        return windows_path
+    candidates = sorted(glob.glob(os.path.join(env_path, "lib", "python3*", "site-packages")))
+    if candidates:
+        return candidates[-1]
+    raise FileNotFoundError(f"No site-packages folder found in environment: {env_path}")
+
+def get_env_python(env_path):
+    """Return the Python executable of a venv or conda environment"""
+    candidates = [
+        os.path.join(env_path, "Scripts", "python.exe"),  # Windows venv
+        os.path.join(env_path, "python.exe"),  # Windows conda env
+        os.path.join(env_path, "bin", "python"),  # POSIX venv and conda env
+    ]
+    for candidate in candidates:
+        if os.path.exists(candidate):
+            return candidate
+    raise FileNotFoundError(f"No Python executable found in environment: {env_path}")
+
+def _record_hash_to_hex(record_hash):
+    """Convert a RECORD hash ("sha256=<urlsafe b64>") to a hex digest"""
+    algorithm, _, value = record_hash.partition("=")
+    if algorithm != "sha256" or not value:
+        return None
+    padded = value + "=" * (-len(value) % 4)
+    return base64.urlsafe_b64decode(padded).hex()
+
+def _hash_file(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def _read_metadata(dist_info):
+    name, version = None, None
+    with open(os.path.join(dist_info, "METADATA"), 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if line.startswith("Name:"):
+                name = line.split(":", 1)[1].strip()
+            elif line.startswith("Version:"):
+                version = line.split(":", 1)[1].strip()
+            elif not line.strip():
+                break
+    return name, version
+
+def _read_direct_url(dist_info):
+    path = os.path.join(dist_info, "direct_url.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return json.load(f)
+
+def _manifest_dist(site_packages, dist_info):
+    name, version = _read_metadata(dist_info)
+    files = []
+    with open(os.path.join(dist_info, "RECORD"), 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            parts = line.rstrip("\r\n").rsplit(",", 2)
+            if len(parts) != 3 or not parts[1]:
+                # RECORD itself and generated files carry no hash
+                continue
+            rel_path, record_hash, record_size = parts
+            path = os.path.normpath(os.path.join(site_packages, rel_path))
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            file_hash = _record_hash_to_hex(record_hash)
+            if file_hash is None or str(stat.st_size) != record_size:
+                # Modified after installation, e.g. rewritten entry points
+                file_hash = _hash_file(path)
+            files.append([rel_path, stat.st_size, stat.st_mtime_ns, file_hash])
+    return name, {
+        "version": version,
+        "dist_info": os.path.basename(dist_info),
+        "direct_url": _read_direct_url(dist_info),
+        "files": files,
+    }
+
+def build_manifest(env_path):
+    """Record size, mtime and hash of every installed file of the environment.
+
+    The file lists and hashes come from the RECORD of each installed
+    distribution, so building the manifest only hashes files that were
+    modified after installation.
+    """
+    site_packages = get_site_packages(env_path)
+    dists = {}
+    for dist_info in glob.glob(os.path.join(site_packages, "*.dist-info")):
+        if not os.path.exists(os.path.join(dist_info, "RECORD")):
+            continue
+        try:
+            name, dist = _manifest_dist(site_packages, dist_info)
+        except (OSError, ValueError):
+            continue
+        if name:
+            dists[name] = dist
+    return {
+        "version": 1,
+        "created": datetime.datetime.now().isoformat(timespec='seconds'),
+        "env_path": env_path,
+        "site_packages": os.path.relpath(site_packages, env_path),
+        "dists": dists,
+    }
+
+def _normalize_name(name):
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+def refresh_manifest(env_path, manifest):
+    """Update the entries of packages upgraded or uninstalled since the install.
+
+    pip replaces the dist-info folder of a package it upgrades or removes,
+    so an entry whose dist-info is gone describes an old installation, not
+    a damaged one. Returns the names of the updated (or dropped) entries.
+    """
+    site_packages = os.path.join(env_path, manifest["site_packages"])
+    changed = [name for name, dist in manifest["dists"].items()
+               if not os.path.isdir(os.path.join(site_packages, dist["dist_info"]))]
+    if not changed:
+        return changed
+    installed = {}
+    for dist_info in glob.glob(os.path.join(site_packages, "*.dist-info")):
+        try:
+            name, _ = _read_metadata(dist_info)
+        except OSError:
+            continue
+        if name:
+            installed[_normalize_name(name)] = dist_info
+    for name in changed:
+        dist_info = installed.get(_normalize_name(name))
+        manifest["dists"].pop(name)
+        if dist_info is None or not os.path.exists(os.path.join(dist_info, "RECORD")):
+            continue
+        try:
+            new_name, dist = _manifest_dist(site_packages, dist_info)
+        except (OSError, ValueError):
+            continue
+        manifest["dists"][new_name or name] = dist
+    return changed
+
+def _save_manifest(target_dir, manifest):
+    manifest_path = os.path.join(target_dir, MANIFEST_FILENAME)
+    tmp_path = manifest_path + ".tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    os.replace(tmp_path, manifest_path)
+    return manifest_path
+
+def write_manifest(target_dir, env_path):
+    manifest = build_manifest(env_path)
+    manifest_path = _save_manifest(target_dir, manifest)
+    # A new manifest makes any cached verification result obsolete
+    cache_path = os.path.join(target_dir, VERIFY_CACHE_FILENAME)
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+    n_files = sum(len(dist["files"]) for dist in manifest["dists"].values())
+    print(f"🧾 Environment manifest saved: {len(manifest['dists'])} packages, "
+          f"{n_files} files -> {manifest_path}")
+    return manifest_path
+
+def read_manifest(target_dir):
+    manifest_path = os.path.join(target_dir, MANIFEST_FILENAME)
+    with gzip.open(manifest_path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+def _verify_dist(site_packages, dist, full):
+    problems = []
+    for rel_path, size, mtime_ns, file_hash in dist["files"]:
+        path = os.path.normpath(os.path.join(site_packages, rel_path))
+        try:
+            stat = os.stat(path)
+        except OSError:
+            problems.append(["missing", rel_path])
+            continue
+        if stat.st_size != size:
+            problems.append(["changed", rel_path])
+        elif full or stat.st_mtime_ns != mtime_ns:
+            # Only files touched since the install are hashed in quick mode
+            try:
+                if _hash_file(path) != file_hash:
+                    problems.append(["changed", rel_path])
+            except OSError:
+                problems.append(["unreadable", rel_path])
+    return problems
+
+def verify(env_path, manifest, full=False, max_workers=8):
+    """Check the environment against its manifest.
+
+    The quick check only stats files and hashes those whose mtime changed,
+    `full=True` hashes every file. Packages whose recorded dist-info is gone
+    were upgraded or uninstalled (see `refresh_manifest`) and are skipped.
+    Returns {package name: problems} for the damaged packages only.
+    """
+    site_packages = os.path.join(env_path, manifest["site_packages"])
+    dists = {name: dist for name, dist in manifest["dists"].items()
+             if os.path.isdir(os.path.join(site_packages, dist["dist_info"]))}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = {
+            name: executor.submit(_verify_dist, site_packages, dist, full)
+            for name, dist in dists.items()
+        }
+        damaged = {name: future.result() for name, future in results.items()}
+    return {name: problems for name, problems in damaged.items() if problems}
+
+def _folders_digest(site_packages):
+    """Digest of the mtimes of the package and dist-info folders.
+
+    A folder's mtime changes when a file directly inside it is added,
+    removed or replaced (as pip and most editors do), which the mtime of
+    site-packages alone does not show.
+    """
+    digest = hashlib.sha256()
+    with os.scandir(site_packages) as entries:
+        for entry in sorted(entries, key=lambda entry: entry.name):
+            try:
+                mtime_ns = entry.stat(follow_symlinks=False).st_mtime_ns
+            except OSError:
+                continue
+            digest.update(f"{entry.name}\0{mtime_ns}\n".encode("utf-8", "surrogateescape"))
+    return digest.hexdigest()
+
+def _cache_key(target_dir, env_path):
+    manifest_path = os.path.join(target_dir, MANIFEST_FILENAME)
+    site_packages = get_site_packages(env_path)
+    return {
+        "manifest_mtime_ns": os.stat(manifest_path).st_mtime_ns,
+        "site_packages_mtime_ns": os.stat(site_packages).st_mtime_ns,
+        "folders_digest": _folders_digest(site_packages),
+    }
+
+def verify_cached(target_dir, env_path, full=False, use_cache=True):
+    """Verify the environment, reusing a recent successful result.
+
+    Returns (damaged, from_cache), where `damaged` is the same as for
+    `verify`. Returns (None, False) if the install has no manifest.
+    """
+    if not os.path.exists(os.path.join(target_dir, MANIFEST_FILENAME)):
+        return None, False
+
+    cache_path = os.path.join(target_dir, VERIFY_CACHE_FILENAME)
+    key = _cache_key(target_dir, env_path)
+    if use_cache and not full and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            age_hours = (time.time() - cache["checked_at"]) / 3600
+            if cache["key"] == key and not cache["damaged"] and age_hours < VERIFY_CACHE_HOURS:
+                return {}, True
+        except (OSError, ValueError, KeyError):
+            pass
+
+    manifest = read_manifest(target_dir)
+    changed = refresh_manifest(env_path, manifest)
+    if changed:
+        print(f"♻️ {len(changed)} packages were upgraded or removed since the install, "
+              f"updating the manifest: {', '.join(sorted(changed))}")
+        _save_manifest(target_dir, manifest)
+        key = _cache_key(target_dir, env_path)
+    damaged = verify(env_path, manifest, full=full)
+    try:
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump({"key": key, "checked_at": time.time(), "full": full,
+                       "damaged": damaged}, f)
+    except OSError:
+        pass
+    return damaged, False
+
+def print_damaged(damaged, max_files=5):
+    for name, problems in damaged.items():
+        print(f"   ❌ {name}: {len(problems)} damaged files")
+        for kind, rel_path in problems[:max_files]:
+            print(f"      {kind}: {rel_path}")
+        if len(problems) > max_files:
+            print(f"      ... and {len(problems) - max_files} more")
+
+def _get_bundled_pip(env_path):
+    """Return the pip wheel shipped with ensurepip in the environment"""
+    prefixes = [env_path]
+    pyvenv_cfg = os.path.join(env_path, "pyvenv.cfg")
+    if os.path.exists(pyvenv_cfg):
+        # A venv has no standard library of its own, look in the base Python
+        with open(pyvenv_cfg, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                key, _, value = line.partition("=")
+                if key.strip() == "home":
+                    home = value.strip()
+                    prefixes.extend([home, os.path.dirname(home)])
+    for prefix in prefixes:
+        for pattern in ("Lib", os.path.join("lib", "python3*")):
+            wheels = sorted(glob.glob(
+                os.path.join(prefix, pattern, "ensurepip", "_bundled", "pip-*.whl")
+            ))
+            if wheels:
+                return wheels[-1]
+    return None
+
+def get_repair_commands(env_path, manifest, damaged):
+    """Return the pip commands that reinstall only the damaged packages"""
+    python_exec = get_env_python(env_path)
+    pip_args = ["install", "--no-deps", "--force-reinstall"]
+    base_cmd = [python_exec, "-m", "pip"] + pip_args
+    commands = []
+    names = list(damaged)
+    if "pip" in damaged:
+        # A damaged pip cannot repair itself, run pip from the bundled wheel instead
+        names.remove("pip")
+        bundled_pip = _get_bundled_pip(env_path)
+        if bundled_pip is not None:
+            commands.append(
+                [python_exec, os.path.join(bundled_pip, "pip")] + pip_args
+                + [f"pip=={manifest['dists']['pip']['version']}"]
+            )
+        else:
+            names.insert(0, "pip")
+    for name in names:
+        dist = manifest["dists"][name]
+        direct_url = dist.get("direct_url") or {}
+        url = direct_url.get("url", "")
+        if url.startswith("file://"):
+            # Installed from a local clone or wheel: reinstall from the same place
+            source = urllib.request.url2pathname(urllib.parse.urlparse(url).path)
+            if direct_url.get("dir_info", {}).get("editable"):
+                commands.append(base_cmd + ["-e", source])
+            else:
+                commands.append(base_cmd + [source])
+        elif url:
+            commands.append(base_cmd + [url])
+        else:
+            commands.append(base_cmd + [f"{name}=={dist['version']}"])
+    return commands
@@ -0,0 +1,309 @@
+import os
+import re
+import sys
+import glob
+import json
+import time
+import datetime
+import subprocess
+
+from packaging.requirements import InvalidRequirement, Requirement
+
+import env_integrity
+import details_store
+
+DIST_NAME = "cellacdc"
+
+# Required dependencies of Cell-ACDC that are only imported by optional
+# features (the Bio-Formats reader and some segmentation models, checked
+# for 1.6), with their own dependencies (botocore, joblib...) they make up a
+# large part of the core download. A progressive install leaves them to the
+# background phase, as the group below.
+DEFERRED_REQUIREMENTS = {"boto3", "scikit-learn"}
+DEFERRED_GROUP = "deferred"
+
+# Extras groups that are never part of "all"
+EXCLUDED_EXTRAS = {"dev", "test", "tests", "doc", "docs", DEFERRED_GROUP}
+# Seconds between checks whether another install of extras has finished
+WAIT_INTERVAL = 5
+# An "installing" state older than this belongs to an interrupted install
+STALE_INSTALL_HOURS = 6
+
+def _normalize(name):
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+def find_dist_info(env_path, dist_name=DIST_NAME):
+    site_packages = env_integrity.get_site_packages(env_path)
+    for dist_info in glob.glob(os.path.join(site_packages, "*.dist-info")):
+        name = os.path.basename(dist_info)[:-len(".dist-info")].rsplit("-", 1)[0]
+        if _normalize(name) == _normalize(dist_name):
+            return dist_info
+    return None
+
+def get_marker_environment(env_path):
+    """Python version of the environment, for evaluating requirement markers"""
+    try:
+        result = subprocess.run(
+            [env_integrity.get_env_python(env_path), "-c",
+             "import platform; print(platform.python_version())"],
+            capture_output=True, text=True, timeout=60
+        )
+    except (OSError, subprocess.SubprocessError):
+        return {}
+    version = result.stdout.strip()
+    if result.returncode != 0 or not version:
+        return {}
+    return {"python_full_version": version,
+            "python_version": ".".join(version.split(".")[:2])}
+
+def get_extra_requirements(requirements, extras, environment=None):
+    """Return {extra: [requirements]} for requirements whose marker selects an extra.
+
+    Markers are evaluated for this platform (and `environment`, e.g. the
+    Python version of the target environment), the selected requirements
+    are returned without their marker.
+    """
+    selected = {extra: [] for extra in extras}
+    for requirement in requirements:
+        try:
+            parsed = Requirement(requirement)
+        except InvalidRequirement:
+            continue
+        marker, parsed.marker = parsed.marker, None
+        if marker is None:
+            continue
+        for extra in extras:
+            # Requirements of the core evaluate to true for every extra
+            if (marker.evaluate({**(environment or {}), "extra": extra})
+                    and not marker.evaluate({**(environment or {}), "extra": ""})):
+                selected[extra].append(str(parsed))
+    return selected
+
+def _read_requires(dist_info):
+    extras = []
+    requires_dist = []
+    with open(os.path.join(dist_info, "METADATA"), 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if not line.strip():
+                break
+            if line.startswith("Provides-Extra:"):
+                extras.append(line.split(":", 1)[1].strip())
+            elif line.startswith("Requires-Dist:"):
+                requires_dist.append(line.split(":", 1)[1].strip())
+    return extras, requires_dist
+
+def split_core_requirements(env_path, deferred=DEFERRED_REQUIREMENTS, dist_name=DIST_NAME):
+    """Return (core, deferred) required dependencies of the installed Cell-ACDC.
+
+    Requirements of extras and those whose marker does not apply to the
+    target environment are left out.
+    """
+    dist_info = find_dist_info(env_path, dist_name)
+    if dist_info is None:
+        raise FileNotFoundError(f"{dist_name} is not installed in: {env_path}")
+    _, requires_dist = _read_requires(dist_info)
+    environment = {**get_marker_environment(env_path), "extra": ""}
+    deferred = {_normalize(name) for name in deferred}
+    core, later = [], []
+    for requirement in requires_dist:
+        try:
+            parsed = Requirement(requirement)
+        except InvalidRequirement:
+            continue
+        if parsed.marker is not None and not parsed.marker.evaluate(environment):
+            continue
+        parsed.marker = None
+        (later if _normalize(parsed.name) in deferred else core).append(str(parsed))
+    return core, later
+
+def read_extras(env_path, dist_name=DIST_NAME):
+    """Return {extra: [requirements]} declared by the installed Cell-ACDC.
+
+    Read from the METADATA of the installed distribution, so this works the
+    same for PyPI, wheel and editable installs. Extras that refer to other
+    extras of Cell-ACDC (e.g. "all") are expanded. The deferred required
+    dependencies of a progressive install are the group DEFERRED_GROUP.
+    """
+    dist_info = find_dist_info(env_path, dist_name)
+    if dist_info is None:
+        return {}
+    extras, requires_dist = _read_requires(dist_info)
+    extras = get_extra_requirements(requires_dist, extras, get_marker_environment(env_path))
+    _, deferred = split_core_requirements(env_path, dist_name=dist_name)
+    if deferred:
+        extras[DEFERRED_GROUP] = deferred
+
+    own_name = _normalize(dist_name)
+    def expand(extra, seen):
+        requirements = []
+        for requirement in extras.get(extra, []):
+            match = re.match(r"([A-Za-z0-9_.-]+)\s*\[([^\]]*)\]", requirement)
+            if match and _normalize(match.group(1)) == own_name:
+                for nested in match.group(2).split(","):
+                    nested = nested.strip()
+                    if nested and nested not in seen:
+                        requirements.extend(expand(nested, seen | {nested}))
+            else:
+                requirements.append(requirement)
+        return requirements
+    return {extra: list(dict.fromkeys(expand(extra, {extra}))) for extra in extras}
+
+def select_extras(available, requested):
+    """Resolve a comma-separated list of extras ("all" for every group)"""
+    if not requested:
+        return []
+    names = [name.strip() for name in requested.split(",") if name.strip()]
+    if "all" in names:
+        return sorted(name for name in available if name not in EXCLUDED_EXTRAS and name != "all")
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        print(f"⚠️ Cell-ACDC has no optional extras named: {', '.join(unknown)}")
+        print(f"   Available extras: {', '.join(sorted(available)) or 'none'}")
+    return [name for name in names if name in available]
+
+def _set_extras_state(install_details, names, status, **fields):
+    extras = install_details.setdefault("extras", {})
+    for name in names:
+        state = extras.setdefault(name, {})
+        state.update(fields)
+        state["status"] = status
+        state["updated"] = datetime.datetime.now().isoformat(timespec='seconds')
+
+def update_extras_state(target_dir, names, status, **fields):
+    """Set the state of the extras `names` in install_details.json"""
+    def update(install_details):
+        _set_extras_state(install_details, names, status, **fields)
+    return details_store.update_install_details(target_dir, update)["extras"]
+
+def get_extras_state(install_details):
+    """Return {extra: status}, with interrupted installs reported as failed"""
+    states = {}
+    for name, state in install_details.get("extras", {}).items():
+        status = state.get("status", "pending")
+        if status == "installing":
+            try:
+                updated = datetime.datetime.fromisoformat(state["updated"])
+                if datetime.datetime.now() - updated > datetime.timedelta(hours=STALE_INSTALL_HOURS):
+                    status = "failed"
+            except (KeyError, ValueError):
+                status = "failed"
+        states[name] = status
+    return states
+
+def is_process_running(pid):
+    if os.name == "nt":
+        import ctypes
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        STILL_ACTIVE = 259
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return False
+        try:
+            exit_code = ctypes.c_ulong()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code)):
+                return False
+            return exit_code.value == STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def get_running_install(install_details):
+    """Return the pid of another live process installing extras, else None"""
+    for name, status in get_extras_state(install_details).items():
+        pid = install_details["extras"][name].get("pid")
+        if status == "installing" and pid and pid != os.getpid() and is_process_running(pid):
+            return pid
+    return None
+
+def claim_extras(target_dir, names, interval=WAIT_INTERVAL):
+    """Mark `names` as installed by this process, once no other process installs extras.
+
+    Checked and set under the install_details.json lock, so that two pips
+    never install into the same environment at once.
+    """
+    running = []
+    def claim(install_details):
+        running[:] = [get_running_install(install_details)]
+        if running[0] is None:
+            _set_extras_state(install_details, names, "installing", pid=os.getpid())
+    details_store.update_install_details(target_dir, claim)
+    if running[0] is None:
+        return
+    print(f"⏳ Optional extras are being installed by another process (pid {running[0]}), "
+          f"waiting for it to finish...")
+    while running[0] is not None:
+        time.sleep(interval)
+        details_store.update_install_details(target_dir, claim)
+
+def install_extras(target_dir, env_path, names, run):
+    """Install the requirements of the extras `names` one group at a time.
+
+    `run(cmd, step)` runs a pip command and raises on failure. Returns the
+    names of the extras that failed. Waits for another process installing
+    extras into the same environment first, two pips must not run at once.
+    """
+    claim_extras(target_dir, names)
+    available = read_extras(env_path)
+    pip_cmd = [env_integrity.get_env_python(env_path), "-m", "pip", "install"]
+    failed = []
+    for name in names:
+        requirements = available.get(name)
+        if requirements is None:
+            update_extras_state(target_dir, [name], "failed", error="Unknown extra")
+            failed.append(name)
+            continue
+        update_extras_state(target_dir, [name], "installing", pid=os.getpid())
+        print(f"🧩 Installing optional extra '{name}': {', '.join(requirements)}")
+        try:
+            if requirements:
+                run(pip_cmd + requirements, f"extra_{name}")
+            update_extras_state(target_dir, [name], "installed", pid=None, error=None)
+            print(f"✅ Optional extra '{name}' installed.")
+        except Exception as e:
+            update_extras_state(target_dir, [name], "failed", pid=None, error=str(e))
+            print(f"❌ Optional extra '{name}' failed to install: {e}")
+            failed.append(name)
+    try:
+        # The new packages are part of the environment from now on
+        env_integrity.write_manifest(target_dir, env_path)
+    except Exception as e:
+        print(f"⚠️ Could not update environment manifest: {e}")
+    return failed
+
+def start_background_install(installer_cmd, target_dir, names):
+    """Start the installer detached, to install `names` after it exits"""
+    # Absolute, the installer runs with the install folder as working directory
+    target_dir = os.path.abspath(target_dir)
+    cmd = installer_cmd + ["--target", target_dir, "--install_extras", ",".join(names),
+                           "--non_interactive"]
+    kwargs = {}
+    if os.name == "nt":
+        kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    process = subprocess.Popen(
+        cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL, cwd=target_dir, **kwargs
+    )
+    return process.pid
+
+def print_extras_state(install_details):
+    states = get_extras_state(install_details)
+    if not states:
+        return
+    icons = {"installed": "✅", "installing": "⏳", "pending": "⏳", "failed": "❌"}
+    print("🧩 Optional extras: " + ", ".join(
+        f"{icons.get(status, '')} {name} ({status})" for name, status in sorted(states.items())
+    ))
+    if any(status == "failed" for status in states.values()):
+        print("   Install them when needed with: Cell-ACDC.exe --extras <name>")
+
+if __name__ == "__main__":
+    print(json.dumps(read_extras(sys.argv[1]), indent=4))
@@ -0,0 +1,257 @@
+import os
+import sys
+import stat
+import time
+import glob
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+TRASH_SUFFIX = ".acdc-trash"
+MAX_WORKERS = 16
+PROGRESS_INTERVAL = 2.0
+
+class RemovalResult:
+    """Outcome of a tree removal"""
+    def __init__(self, path):
+        self.path = path
+        self.files = 0
+        self.dirs = 0
+        self.failed = []
+        self.duration = 0.0
+
+    @property
+    def success(self):
+        return not self.failed
+
+    def __repr__(self):
+        return (f"RemovalResult(path={self.path!r}, files={self.files}, dirs={self.dirs}, "
+                f"failed={len(self.failed)}, duration={self.duration:.2f})")
+
+def _make_writable(path):
+    try:
+        os.chmod(path, stat.S_IWRITE | stat.S_IREAD | stat.S_IEXEC)
+    except OSError:
+        pass
+
+def is_trash(name):
+    """Whether `name` is a tree moved aside by `move_aside`"""
+    return f"{TRASH_SUFFIX}-" in name
+
+def _is_link(entry):
+    """Symlink or, on Windows, junction (any other reparse point too)"""
+    if entry.is_symlink():
+        return True
+    if hasattr(entry, "is_junction"):
+        # Python 3.12+
+        if entry.is_junction():
+            return True
+    try:
+        attributes = entry.stat(follow_symlinks=False).st_file_attributes
+    except (OSError, AttributeError):
+        return False
+    return bool(attributes & stat.FILE_ATTRIBUTE_REPARSE_POINT)
+
+def _is_junction(path):
+    if hasattr(os.path, "isjunction"):
+        return os.path.isjunction(path)
+    try:
+        attributes = os.lstat(path).st_file_attributes
+    except (OSError, AttributeError):
+        return False
+    return bool(attributes & stat.FILE_ATTRIBUTE_REPARSE_POINT)
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        if os.name == "nt" and os.path.isdir(path):
+            # Directory symlink or junction
+            os.rmdir(path)
+        else:
+            raise
+
+def _retry(func, path, retries):
+    """Call func(path), retrying with backoff on files that are locked.
+
+    Windows refuses to delete read-only files and files that are open in
+    another process (e.g. an antivirus scan), both are usually transient.
+    """
+    for attempt in range(retries + 1):
+        try:
+            func(path)
+            return None
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            if attempt == retries:
+                return e
+            _make_writable(path)
+            time.sleep(0.05 * 2 ** attempt)
+
+def move_aside(path):
+    """Rename `path` to a unique sibling, so that `path` is free at once.
+
+    Returns the new path, or None if the tree cannot be renamed (e.g. a
+    file inside is open on Windows).
+    """
+    parent, name = os.path.split(os.path.abspath(path))
+    trash_path = os.path.join(parent, f"{name}{TRASH_SUFFIX}-{os.getpid()}-{int(time.time() * 1000)}")
+    try:
+        os.replace(path, trash_path)
+    except OSError:
+        return None
+    return trash_path
+
+class _Progress:
+    def __init__(self, callback):
+        self.callback = callback
+        self.files = 0
+        self.lock = threading.Lock()
+        self.last_report = time.time()
+
+    def add(self, n_files):
+        with self.lock:
+            self.files += n_files
+            now = time.time()
+            if self.callback is None or now - self.last_report < PROGRESS_INTERVAL:
+                return
+            self.last_report = now
+            files = self.files
+        self.callback(files)
+
+def _clear_dir(path, result, progress, retries):
+    """Delete the files of one folder, return its subfolders"""
+    subdirs = []
+    n_files = 0
+    try:
+        entries = list(os.scandir(path))
+    except FileNotFoundError:
+        return subdirs
+    except OSError as e:
+        result.failed.append((path, e))
+        return subdirs
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir(follow_symlinks=False)
+        except OSError:
+            is_dir = False
+        if is_dir and not _is_link(entry):
+            subdirs.append(entry.path)
+            continue
+        error = _retry(_unlink, entry.path, retries)
+        if error is not None:
+            result.failed.append((entry.path, error))
+        else:
+            n_files += 1
+    progress.add(n_files)
+    return subdirs
+
+def _delete_tree(path, result, workers, retries, progress):
+    if path is None:
+        return
+    if os.path.islink(path) or _is_junction(path) or not os.path.isdir(path):
+        error = _retry(_unlink, path, retries)
+        if error is not None:
+            result.failed.append((path, error))
+        else:
+            result.files = 1
+        return
+    progress = _Progress(progress)
+    dirs = [path]
+    level = [path]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Folders of one depth are cleared in parallel, then the next depth
+        while level:
+            futures = [executor.submit(_clear_dir, d, result, progress, retries) for d in level]
+            level = [subdir for future in futures for subdir in future.result()]
+            dirs.extend(level)
+    for d in reversed(dirs):
+        error = _retry(os.rmdir, d, retries)
+        if error is not None:
+            result.failed.append((d, error))
+        else:
+            result.dirs += 1
+    result.files = progress.files
+
+class RemovalJob(threading.Thread):
+    """Deletion of a tree that was moved aside, running in the background.
+
+    Not a daemon thread, so the interpreter waits for it before exiting.
+    """
+    def __init__(self, path, trash_path, workers, retries, progress):
+        super().__init__(name="acdc-rmtree")
+        self.result = RemovalResult(path)
+        self.trash_path = trash_path
+        self._args = (workers, retries, progress)
+
+    def run(self):
+        start_time = time.time()
+        _delete_tree(self.trash_path, self.result, *self._args)
+        self.result.duration = time.time() - start_time
+
+    def wait(self, timeout=None):
+        self.join(timeout)
+        return self.result
+
+def print_progress(n_files):
+    print(f"   🗑️ Removed {n_files} files...")
+
+def remove_tree(path, workers=None, retries=5, background=False, progress=print_progress,
+                daemon=False):
+    """Delete the folder `path` with a pool of workers.
+
+    The folder is first renamed aside, so `path` can be reused immediately.
+    Files that fail to delete are retried with backoff. With
+    `background=True` the deletion runs in a `RemovalJob` that is returned
+    right away, otherwise the `RemovalResult` is returned when done. A
+    `daemon=True` job does not keep the process alive, what is left is
+    deleted by the next `purge_trash`. `progress(n_files)` is called every
+    few seconds.
+    """
+    if workers is None:
+        workers = min(MAX_WORKERS, (os.cpu_count() or 1) * 2)
+    trash_path = None
+    if os.path.lexists(path):
+        trash_path = move_aside(path)
+        if trash_path is None:
+            # Delete in place, `path` is only free once everything is deleted
+            trash_path = path
+            background = False
+    job = RemovalJob(path, trash_path, workers, retries, progress)
+    if background:
+        job.daemon = daemon
+        job.start()
+        return job
+    job.run()
+    return job.result
+
+def _purge_trash(trash_paths, workers, retries, progress):
+    results = []
+    for trash_path in trash_paths:
+        job = RemovalJob(trash_path, trash_path, workers, retries, progress)
+        job.run()
+        results.append(job.result)
+    return results
+
+def purge_trash(parent_dir, name=None, workers=MAX_WORKERS, retries=5, progress=None,
+                background=False):
+    """Delete trees left aside by interrupted removals in `parent_dir`
+
+    With `background=True` the deletion runs in a daemon thread that is
+    returned right away (None if there is nothing to delete).
+    """
+    trash_paths = glob.glob(os.path.join(parent_dir, f"{name or '*'}{TRASH_SUFFIX}-*"))
+    if not background:
+        return _purge_trash(trash_paths, workers, retries, progress)
+    if not trash_paths:
+        return None
+    thread = threading.Thread(
+        target=_purge_trash, args=(trash_paths, workers, retries, progress),
+        name="acdc-purge-trash", daemon=True
+    )
+    thread.start()
+    return thread
+
+if __name__ == "__main__":
+    for arg in sys.argv[1:]:
+        print(remove_tree(arg))
@@ -0,0 +1,39 @@
+import os
+import time
+
+class FileLock:
+    """Cross-process lock based on an exclusive file.
+
+    A lock file older than `stale_after` seconds was left behind by a
+    killed process and is taken over. Raises TimeoutError if the lock
+    cannot be acquired within `timeout` seconds.
+    """
+    def __init__(self, lock_path, timeout=10, stale_after=60):
+        self.lock_path = lock_path
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.fd = None
+
+    def __enter__(self):
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                self.fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.lock_path) > self.stale_after:
+                        os.remove(self.lock_path)
+                        continue
+                except OSError:
+                    pass
+                if time.time() > deadline:
+                    raise TimeoutError(f"Could not acquire lock: {self.lock_path}")
+                time.sleep(0.05)
+
+    def __exit__(self, *exc):
+        try:
+            os.close(self.fd)
+            os.remove(self.lock_path)
+        except OSError:
+            pass
@@ -0,0 +1,212 @@
+import os
+import sys
+import glob
+import json
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import wheel_cache
+
+INDEX_FILENAME = "python_index.json"
+PROBE_TIMEOUT = 15
+# Part of the cache key, increase when the probe script reports new fields
+PROBE_VERSION = 1
+
+_PROBE_SCRIPT = r"""
+import sys, os, json, struct, platform, importlib.util
+prefix, base_prefix = sys.prefix, getattr(sys, 'base_prefix', sys.prefix)
+def find_conda():
+    roots = [prefix, base_prefix]
+    # An environment of a conda install: <root>/envs/<name>
+    for root in list(roots):
+        if os.path.basename(os.path.dirname(root)) == 'envs':
+            roots.append(os.path.dirname(os.path.dirname(root)))
+    for root in roots:
+        for rel in (('Scripts', 'conda.exe'), ('condabin', 'conda.bat'), ('bin', 'conda'), ('condabin', 'conda')):
+            path = os.path.join(root, *rel)
+            if os.path.exists(path):
+                return path
+    return None
+print(json.dumps({
+    "executable": sys.executable,
+    "version": platform.python_version(),
+    "implementation": platform.python_implementation(),
+    "bits": struct.calcsize("P") * 8,
+    "machine": platform.machine(),
+    "prefix": prefix,
+    "is_venv": prefix != base_prefix,
+    "is_conda": os.path.isdir(os.path.join(prefix, 'conda-meta')) or os.path.isdir(os.path.join(base_prefix, 'conda-meta')),
+    "conda_exe": find_conda(),
+    "has_venv": importlib.util.find_spec('venv') is not None and importlib.util.find_spec('ensurepip') is not None,
+    "has_pip": importlib.util.find_spec('pip') is not None,
+}))
+"""
+
+def get_index_path():
+    return os.path.join(wheel_cache.get_default_cache_dir(), INDEX_FILENAME)
+
+def _python_names():
+    if os.name == "nt":
+        return ["python.exe", "python3.exe"]
+    return ["python3", "python"] + [f"python3.{minor}" for minor in range(8, 16)]
+
+def candidate_paths(extra_paths=()):
+    """Return the executables found on PATH and in the usual install locations"""
+    home = os.path.expanduser("~")
+    patterns = []
+    for folder in os.environ.get("PATH", "").split(os.pathsep):
+        if folder:
+            patterns.extend(os.path.join(folder, name) for name in _python_names())
+    conda_roots = ["miniforge3", "miniconda3", "anaconda3", "mambaforge", "Miniforge3", "Miniconda3", "Anaconda3"]
+    if os.name == "nt":
+        local_app_data = os.environ.get("LOCALAPPDATA", os.path.join(home, "AppData", "Local"))
+        program_files = [os.environ.get(var) for var in ("ProgramFiles", "ProgramFiles(x86)", "ProgramData")]
+        patterns.append(os.path.join(local_app_data, "Programs", "Python", "Python3*", "python.exe"))
+        patterns.append(os.path.join(os.environ.get("SystemDrive", "C:") + os.sep, "Python3*", "python.exe"))
+        for folder in filter(None, program_files):
+            patterns.append(os.path.join(folder, "Python3*", "python.exe"))
+            patterns.extend(os.path.join(folder, root, "python.exe") for root in conda_roots)
+        for root in conda_roots:
+            patterns.append(os.path.join(home, root, "python.exe"))
+            patterns.append(os.path.join(home, root, "envs", "*", "python.exe"))
+    else:
+        for folder in ("/usr/bin", "/usr/local/bin", "/opt/homebrew/bin"):
+            patterns.append(os.path.join(folder, "python3*"))
+        patterns.append("/Library/Frameworks/Python.framework/Versions/*/bin/python3")
+        patterns.append(os.path.join(home, ".pyenv", "versions", "*", "bin", "python"))
+        for root in conda_roots:
+            patterns.append(os.path.join(home, root, "bin", "python"))
+            patterns.append(os.path.join(home, root, "envs", "*", "bin", "python"))
+    patterns.extend(extra_paths)
+
+    paths = {}
+    for pattern in patterns:
+        for path in glob.glob(pattern):
+            if path.endswith("-config") or not os.path.isfile(path) or not os.access(path, os.X_OK):
+                continue
+            # First found wins, PATH entries come first
+            paths.setdefault(os.path.normcase(os.path.abspath(path)), path)
+    return list(paths.values())
+
+def _stat_key(path):
+    stat = os.stat(os.path.realpath(path))
+    return [PROBE_VERSION, stat.st_mtime_ns, stat.st_size]
+
+def probe(path):
+    """Run the interpreter once and return what it reports, or None if it fails"""
+    try:
+        result = subprocess.run(
+            [path, "-I", "-c", _PROBE_SCRIPT], capture_output=True, text=True,
+            encoding='utf-8', errors='replace', timeout=PROBE_TIMEOUT
+        )
+        info = json.loads(result.stdout.strip().splitlines()[-1])
+    except (OSError, subprocess.SubprocessError, ValueError, IndexError):
+        return None
+    info["path"] = path
+    return info
+
+def _read_index(index_path):
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_index(index_path, index):
+    try:
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=4)
+        os.replace(tmp_path, index_path)
+    except OSError:
+        pass
+
+def _probe_cached(path, index):
+    """Return (info, cache entry), probing only if the executable changed"""
+    try:
+        key = _stat_key(path)
+    except OSError:
+        return None, None
+    entry = index.get(path)
+    if entry is not None and entry.get("key") == key:
+        return entry["info"], entry
+    info = probe(path)
+    return info, {"key": key, "info": info}
+
+def get_python_info(path, use_cache=True, update_cache=True):
+    """Probe a single interpreter, using the cached result if still valid"""
+    index_path = get_index_path()
+    index = _read_index(index_path) if use_cache else {}
+    info, entry = _probe_cached(path, index)
+    if update_cache and entry is not None and index.get(path) is not entry:
+        index = _read_index(index_path)
+        index[path] = entry
+        _write_index(index_path, index)
+    return info
+
+def discover(extra_paths=(), use_cache=True, max_workers=8):
+    """Find and probe the Python interpreters of this machine, in parallel.
+
+    Returns the working interpreters, newest version first. Probe results
+    are cached and reused until the executable's mtime or size changes.
+    """
+    index_path = get_index_path()
+    index = _read_index(index_path) if use_cache else {}
+    paths = candidate_paths(extra_paths)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(lambda path: (path, *_probe_cached(path, index)), paths))
+    new_index = {path: entry for path, _, entry in results if entry is not None}
+    if new_index != index:
+        _write_index(index_path, new_index)
+
+    # Symlinks, launchers and shims (e.g. pyenv) run an interpreter that is
+    # also found elsewhere, list every environment once
+    pythons = {}
+    for _, info, _ in results:
+        if info is None:
+            continue
+        key = (os.path.normcase(info["prefix"]), info["version"])
+        if key not in pythons or os.path.normcase(info["path"]) == os.path.normcase(info["executable"]):
+            pythons[key] = info
+    pythons = list(pythons.values())
+    pythons.sort(
+        key=lambda info: tuple(int(part) for part in info["version"].split(".")[:3] if part.isdigit()),
+        reverse=True
+    )
+    return pythons
+
+def is_usable(info):
+    """Whether the installer can create a Cell-ACDC environment with it"""
+    return info["bits"] == 64 and (info["has_venv"] or bool(info["conda_exe"]))
+
+def print_pythons(pythons):
+    if not pythons:
+        print("No Python interpreters found.")
+        return
+    for info in pythons:
+        kind = "conda" if info["is_conda"] else ("venv" if info["is_venv"] else "system")
+        capabilities = []
+        if info["has_venv"]:
+            capabilities.append("venv")
+        if info["conda_exe"]:
+            capabilities.append("conda")
+        print(f"{'✅' if is_usable(info) else '❌'} Python {info['version']:<8} {info['bits']}-bit "
+              f"{kind:<6} [{', '.join(capabilities) or 'no venv/conda'}] {info['path']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List the Python interpreters usable for Cell-ACDC")
+    parser.add_argument('--json', action='store_true', help='Print the probe results as JSON')
+    parser.add_argument('--no_cache', action='store_true', help='Probe every interpreter again')
+    parser.add_argument('paths', nargs='*', help='Additional interpreters to probe')
+    args = parser.parse_args(argv)
+    pythons = discover(args.paths, use_cache=not args.no_cache)
+    if args.json:
+        print(json.dumps(pythons, indent=4))
+    else:
+        print_pythons(pythons)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,18 +9,55 @@ try:
     import platform
 
     import re
+    import glob
     import time
     import pathlib
 
+    import batch_install
+    import log_store
+    import progress_events
+    import env_integrity
+    import wheel_cache
+    import prune_install
+    import fast_rmtree
+    import extras_install
+    import details_store
+    import conda_activation
+    import find_pythons
+    import resource_telemetry
+    import perf_history
+    import mirrors
+    import install_planner
+
 except ImportError as e:
     print(f"❌ Import error: {e}")
     input("Press Enter to close...")
     sys.exit(1)
 
-def run_subprocess_with_logging(cmd):
-    """Run subprocess and capture all output to log file with real-time streaming"""
+def finish_step_telemetry(monitor, step, attempt, return_code):
+    """Stop the resource monitor of a command, log and record its summary"""
+    if monitor is None:
+        return None
+    summary = monitor.stop()
+    print(f"   📊 Resources: {resource_telemetry.format_summary(summary)}")
+    resource_telemetry.record(step, summary, attempt=attempt, return_code=return_code)
+    return summary
+
+def run_subprocess_with_logging(cmd, step=None, on_retry=mirrors.on_retry):
+    """Run subprocess and capture all output to log file with real-time streaming
+
+    `step` names the command in the progress events (default: executable name)
+    `on_retry(cmd, output)` returns the command to run after a failed attempt,
+    by default switching to the next mirror after connection errors.
+    """
     if isinstance(cmd, str):
         cmd = [cmd]
+    if step is None:
+        step = os.path.splitext(os.path.basename(cmd[0]))[0]
+
+    events = progress_events.get_emitter()
+    events.step_start(step, cmd=cmd)
+    step_start_time = time.time()
 
     print("-" * 40)
     print(f"🔧 Running command: {' '.join(cmd)}")
@@ -30,13 +67,17 @@ def run_subprocess_with_logging(cmd):
     
     max_tries = 3
     tries_remaining = max_tries
+    resources = None
     
     while tries_remaining > 0:
+        monitor = None
         try:
             if tries_remaining < max_tries:
                 print(f"🔄 Retrying command (attempt {max_tries - tries_remaining + 1} of {max_tries})...")
             
             start_time = datetime.datetime.now()
+            attempt = max_tries - tries_remaining + 1
+            progress_parser = progress_events.OutputProgressParser()
             
             # Start the process with pipes for real-time output
             process = subprocess.Popen(
@@ -49,6 +90,7 @@ def run_subprocess_with_logging(cmd):
                 bufsize=1,
                 universal_newlines=True
             )
+            monitor = resource_telemetry.monitor(process.pid)
             
             # Stream output in real-time
             output_lines = []
@@ -60,9 +102,12 @@ def run_subprocess_with_logging(cmd):
                     # Print to console (and thus to log via Tee)
                     print(output.rstrip())
                     output_lines.append(output)
+                    if progress_parser.feed(output):
+                        events.progress(step, attempt=attempt, **progress_parser.state)
             
             # Wait for process to complete and get return code
             return_code = process.poll()
+            resources = finish_step_telemetry(monitor, step, attempt, return_code)
             
             end_time = datetime.datetime.now()
             duration = (end_time - start_time).total_seconds()
@@ -70,12 +115,18 @@ def run_subprocess_with_logging(cmd):
             if return_code == 0:
                 print(f"   ✅ Command completed successfully in {duration:.2f} seconds")
                 print("-" * 40)
+                events.step_end(step, "success", time.time() - step_start_time,
+                                attempts=attempt, resources=resources, **progress_parser.state)
                 return  # Success, exit the retry loop
             else:
                 print(f"❌ Command failed with return code {return_code} after {duration:.2f} seconds")
                 tries_remaining -= 1
                 
                 if tries_remaining > 0:
+                    events.emit("step_retry", step=step, attempt=attempt,
+                                return_code=return_code)
+                    if on_retry is not None:
+                        cmd = on_retry(cmd, ''.join(output_lines))
                     print(f"⏳ {tries_remaining} tries remaining. Waiting 5 seconds before retry...")
                     time.sleep(5)
                 else:
@@ -86,6 +137,8 @@ def run_subprocess_with_logging(cmd):
             if tries_remaining <= 1:
                 print(f"❌ Command failed with return code {e.returncode} after all retries")
                 print("-" * 40)
+                events.step_end(step, "failed", time.time() - step_start_time,
+                                return_code=e.returncode, resources=resources)
                 raise e
             else:
                 tries_remaining -= 1
@@ -94,9 +147,13 @@ def run_subprocess_with_logging(cmd):
                 time.sleep(5)
                 
         except Exception as e:
+            if monitor is not None:
+                monitor.stop()
             if tries_remaining <= 1:
                 print(f"❌ Error running subprocess: {e}")
                 print("-" * 40)
+                events.step_end(step, "failed", time.time() - step_start_time,
+                                error=str(e))
                 raise e
             else:
                 tries_remaining -= 1
@@ -200,15 +257,11 @@ def get_install_params(executable_dir):
     return target_dir, use_github, cellacdc_version, python_path, is_embedded_python, pyversion, custom_CellACDC_path
 
 def setup_logging():
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_filename = f"{timestamp}_cellacdc_install.log"
-    user_home_path = str(pathlib.Path.home())
-    user_profile_path = os.path.join(user_home_path, 'acdc-appdata')
-    log_path = os.path.join(user_profile_path, ".acdc-logs", log_filename)
-    os.makedirs(os.path.dirname(log_path), exist_ok=True)
-
-    # Open log file with UTF-8 encoding
-    log_file = open(log_path, 'w', encoding='utf-8', errors='replace')
+    # Open log file with UTF-8 encoding, parallel installs (batch mode) get separate files
+    log_file, log_path = log_store.create_log_file(log_store.get_log_dir(), "install")
+
+    # Compress and expire older logs while the installation runs
+    log_store.start_maintenance(os.path.dirname(log_path), exclude=[log_path])
     
     # Store original stdout/stderr
     original_stdout = sys.stdout
@@ -233,6 +286,178 @@ def setup_logging():
     print(f"📄 Installation log will be saved to: {log_path}")
     return log_file, original_stdout, original_stderr, log_path
 
+def setup_shared_caches(cache_dir):
+    """Point pip and conda at a cache directory shared between installs"""
+    cache_dir = os.path.abspath(cache_dir)
+    pip_cache = os.path.join(cache_dir, "pip")
+    conda_pkgs = os.path.join(cache_dir, "conda_pkgs")
+    os.makedirs(pip_cache, exist_ok=True)
+    os.makedirs(conda_pkgs, exist_ok=True)
+    # Inherited by every pip/conda child process started from here on
+    os.environ["PIP_CACHE_DIR"] = pip_cache
+    os.environ["CONDA_PKGS_DIRS"] = conda_pkgs
+    print(f"🗃️ Using shared cache directory: {cache_dir}")
+    print(f"   pip cache: {pip_cache}")
+    print(f"   conda packages: {conda_pkgs}")
+    return cache_dir
+
+def install_from_source(pip_cmd, env_path, source_path, build_cache):
+    """Editable install of a local Cell-ACDC source, reusing cached builds
+
+    `pip_cmd` is the command that runs pip of the environment at `env_path`.
+    """
+    source_key = wheel_cache.get_source_key(source_path, build_cache.git_exec)
+    dependency_hash = wheel_cache.get_dependency_hash(source_path)
+    print(f"   Source state: {source_key}")
+    state = build_cache.check(env_path, source_path, source_key, dependency_hash)
+    progress_events.get_emitter().emit("cache_check", cache="build", hit=state is not None)
+    if state == "unchanged":
+        print("♻️ Source unchanged since the last build in this environment, skipping build.")
+        return
+    if state == "code_only":
+        print("♻️ Only code changed since the last build (dependency metadata is unchanged), "
+              "skipping reinstall of the editable install.")
+        build_cache.write_record(env_path, source_path, source_key,
+                                 dependency_hash=dependency_hash)
+        return
+
+    requires = wheel_cache.read_build_requires(source_path)
+    python_version = wheel_cache.get_python_version(env_integrity.get_env_python(env_path))
+    try:
+        # Build against cached build requirements instead of an isolated build env
+        wheelhouse, cached = build_cache.get_wheelhouse(
+            requires, python_version, pip_cmd, run_subprocess_with_logging
+        )
+        progress_events.get_emitter().emit("cache_check", cache="wheelhouse", hit=cached)
+        run_subprocess_with_logging(
+            pip_cmd + ["install", "--no-index", "--find-links", wheelhouse, *requires],
+            step="build_requirements"
+        )
+        run_subprocess_with_logging(
+            pip_cmd + ["install", "--no-build-isolation", "-e", source_path],
+            step="pip_install"
+        )
+    except (subprocess.CalledProcessError, OSError):
+        print("⚠️ Build with cached build requirements failed, building in an isolated environment...")
+        run_subprocess_with_logging(pip_cmd + ["install", "-e", source_path], step="pip_install")
+
+    build_cache.write_record(env_path, source_path, source_key,
+                             dependency_hash=dependency_hash)
+    wheel_cache.evict(build_cache.cache_dir)
+
+def update_clone(git_exec, clone_path, git_ref=None, repo_url=None):
+    """Fetch new objects and fast-forward an existing clone
+
+    `git_ref` is a branch, tag or commit, by default the upstream of the
+    checked out branch is used. Local changes or diverged history are kept
+    as they are. With `repo_url` (e.g. the selected git mirror) the fetch
+    goes there instead of to origin, and fails over to the next mirror.
+    """
+    head_before = wheel_cache.git_output(git_exec, clone_path, "rev-parse", "HEAD")
+    dependency_hash_before = wheel_cache.get_dependency_hash(clone_path)
+
+    if repo_url is None:
+        fetch_args = ["origin"]
+    else:
+        # Same remote-tracking refs as a fetch from origin
+        fetch_args = ["--tags", repo_url, "+refs/heads/*:refs/remotes/origin/*"]
+    run_subprocess_with_logging(
+        [git_exec, "-C", clone_path, "fetch", "--prune"] + fetch_args, step="git_fetch"
+    )
+    try:
+        if git_ref is None:
+            wheel_cache.git_output(git_exec, clone_path, "merge", "--ff-only", "@{u}")
+        else:
+            try:
+                wheel_cache.git_output(git_exec, clone_path, "rev-parse", "--verify",
+                                       "--quiet", f"origin/{git_ref}")
+                is_branch = True
+            except RuntimeError:
+                is_branch = False
+            if is_branch:
+                wheel_cache.git_output(git_exec, clone_path, "checkout", git_ref)
+                wheel_cache.git_output(git_exec, clone_path, "merge", "--ff-only",
+                                       f"origin/{git_ref}")
+            else:
+                wheel_cache.git_output(git_exec, clone_path, "checkout", "--detach", git_ref)
+    except RuntimeError as e:
+        print(f"⚠️ Could not update the existing clone, keeping the current checkout: {e}")
+
+    head_after = wheel_cache.git_output(git_exec, clone_path, "rev-parse", "HEAD")
+    if head_after == head_before:
+        print(f"   ✅ Clone is up to date at {head_after[:12]}")
+    else:
+        print(f"   ✅ Updated clone {head_before[:12]} -> {head_after[:12]}")
+    if wheel_cache.get_dependency_hash(clone_path) != dependency_hash_before:
+        print("   📦 Dependency metadata changed, dependencies will be reinstalled.")
+    return head_before, head_after
+
+def resolve_python(python_path, is_embedded_python, target_dir, is_windows, update_cache=True):
+    """Return (python_path, python_info, is_conda, conda_path) of the base Python"""
+    if isinstance(is_embedded_python, str):
+        if is_embedded_python.lower() == 'true':
+            is_embedded_python = True
+    if is_embedded_python is True:
+        # Cross-platform Python executable path
+        python_exe = "python.exe" if is_windows else "python"
+        python_path = os.path.join(target_dir, "miniforge", python_exe)
+
+    # Probed once, the result is cached until the executable changes
+    python_info = find_pythons.get_python_info(python_path, update_cache=update_cache)
+    if python_info is not None:
+        print(f"🐍 Python {python_info['version']} ({python_info['bits']}-bit) at: {python_path}")
+        if not find_pythons.is_usable(python_info):
+            print("⚠️ This Python can neither create a venv nor a conda environment for Cell-ACDC, "
+                  "run the installer with --list_pythons to see the usable interpreters.")
+        is_conda = python_info["is_conda"] and python_info["conda_exe"] is not None
+    else:
+        print(f"⚠️ Could not run the Python at {python_path}, guessing its type from the path.")
+        is_conda = python_path.lower().find("miniforge") != -1 or python_path.lower().find("conda") != -1
+    conda_path = None
+    if is_conda and python_info is not None:
+        conda_path = os.path.abspath(python_info["conda_exe"])
+    elif is_conda:
+        folder = os.path.dirname(python_path)
+        # Cross-platform conda executable path
+        if is_windows:
+            conda_path = os.path.join(folder, "Scripts", "conda.exe")
+        else:
+            conda_path = os.path.join(folder, "bin", "conda")
+        conda_path = os.path.abspath(conda_path)  # Ensure absolute path for conda
+    #     conda_path = f'"{conda_path}"'  # Ensure proper quoting for Windows paths
+    return python_path, python_info, is_conda, conda_path
+
+def install_package(pip_cmd, env_path, package, progressive=False):
+    """pip install Cell-ACDC (a PyPI requirement or a wheel) into the environment.
+
+    With `progressive=True` only the core dependencies are installed and the
+    deferred ones are returned, for the background phase.
+    """
+    if not progressive:
+        run_subprocess_with_logging(pip_cmd + ["install", package], step="pip_install")
+        return []
+    run_subprocess_with_logging(pip_cmd + ["install", "--no-deps", package],
+                                step="pip_install_cellacdc")
+    core, deferred = extras_install.split_core_requirements(env_path)
+    if deferred:
+        print(f"   Installing the core first, deferred to the background: {', '.join(deferred)}")
+    if core:
+        run_subprocess_with_logging(pip_cmd + ["install", *core], step="pip_install")
+    return deferred
+
+def get_git_exec(install_dir, is_windows):
+    """The portable Git of an install on Windows, else git from PATH"""
+    portable_git_exec = os.path.abspath(
+        os.path.join(install_dir, "portable_git", "cmd", "git.exe")
+    )
+    return portable_git_exec if is_windows and os.path.exists(portable_git_exec) else "git"
+
+def get_installer_cmd():
+    """Command that runs this installer again, frozen or from source"""
+    if getattr(sys, 'frozen', False):
+        return [sys.executable]
+    return [sys.executable, os.path.abspath(__file__)]
+
 def print_closing_logging(log_path):
     """Print closing message for logging"""
     print()
@@ -250,15 +475,29 @@ def print_closing_logging(log_path):
     print(f"Installation Source: {'GitHub' if use_github else 'PyPI'}")
     if not use_github:
         print(f"Version: {cellacdc_version}")
+    if prune_summary is not None:
+        prune_install.print_summary(prune_summary)
     print(f"Session End: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 80)
 
     print("✅ Installation completed successfully!")
 
 if __name__ == "__main__":
+    exit_code = 0
+    non_interactive = '--non_interactive' in sys.argv
+    # A plan changes nothing, not even the logs, caches or history
+    plan_mode = '--plan' in sys.argv
+    session_start = datetime.datetime.now()
+    session_status = "success"
+    prune_summary = None
+    old_env_removal = None
+    perf_recorder = None
     try:
         # Set up logging at the beginning of your script
-        log_file, original_stdout, original_stderr, log_path = setup_logging()
+        if plan_mode:
+            log_file, original_stdout, original_stderr, log_path = None, sys.stdout, sys.stderr, None
+        else:
+            log_file, original_stdout, original_stderr, log_path = setup_logging()
 
         repo_url = "https://github.com/SchmollerLab/Cell_ACDC"
         clone_path = "Cell_ACDC"
@@ -273,8 +512,122 @@ if __name__ == "__main__":
         parser.add_argument('--embeddedpyflag', help='Path to Python installer executable (if applicable)')
         parser.add_argument('--pyversion',  help='Python version to use for conda environment')
         parser.add_argument('--custom_CellACDC_path', help='Custom path to CellACDC repository clone (if applicable)')
+        parser.add_argument('--cache_dir', help='Directory for pip/conda/git caches shared between installs')
+        parser.add_argument('--non_interactive', action='store_true', help='Never wait for user input, exit with an error code on failure')
+        parser.add_argument('--batch', help='Path to a JSON manifest of targets to install in batch mode')
+        parser.add_argument('--max_workers', type=int, help='Maximum number of parallel installs in batch mode')
+        parser.add_argument('--report', help='Path of the JSON report written in batch mode')
+        parser.add_argument('--git_ref', help='Branch, tag or commit to install for GitHub installs (default: the default branch)')
+        parser.add_argument('--events', help='Write JSON-lines progress events to a file, "fd:N" or "tcp://HOST:PORT"')
+        parser.add_argument('--prune', action='store_true', help='Remove package caches, build leftovers and test suites after installing')
+        parser.add_argument('--prune_policy', help='JSON file with additional keep/drop rules for --prune')
+        parser.add_argument('--extras', help='Comma-separated optional Cell-ACDC extras ("all" for every group) to install after the core')
+        parser.add_argument('--wait_extras', action='store_true', help='Install the extras before exiting instead of in the background')
+        parser.add_argument('--progressive', action='store_true', help='Install a minimal core first and the dependencies only optional features use in the background (implied by --extras)')
+        parser.add_argument('--install_extras', help='Install these extras into the existing install at --target and exit')
+        parser.add_argument('--list_pythons', '--list-pythons', action='store_true', help='List the Python interpreters found on this machine and exit')
+        parser.add_argument('--perf_report', action='store_true', help='Show the install and launch performance history with regressed steps and exit')
+        parser.add_argument('--mirrors', help='JSON file with "index" and "git" lists of package index and Cell-ACDC git mirrors')
+        parser.add_argument('--index_mirrors', help='Comma-separated package index mirrors, the fastest reachable one is used')
+        parser.add_argument('--git_mirrors', help='Comma-separated Cell-ACDC git mirrors, the fastest reachable one is used')
+        parser.add_argument('--plan', action='store_true', help='Show the steps, downloads and estimated time of the install without changing anything, then exit')
+        parser.add_argument('--plan_output', help='Also write the --plan result as JSON to this file')
+        parser.add_argument('--telemetry_interval', type=float, default=resource_telemetry.DEFAULT_INTERVAL, help='Seconds between resource samples of installer commands (0 to disable)')
 
         args = parser.parse_args()
+        if args.plan and (args.batch or args.install_extras):
+            parser.error("--plan cannot be combined with --batch or --install_extras")
+
+        if args.events:
+            try:
+                progress_events.configure(args.events)
+                print(f"📡 Writing progress events to: {args.events}")
+            except OSError as e:
+                print(f"⚠️ Could not open progress event channel {args.events}: {e}")
+        progress_events.get_emitter().emit("session_start", log_path=log_path)
+        resource_telemetry.configure(args.telemetry_interval, log_path)
+
+        if args.list_pythons:
+            find_pythons.print_pythons(find_pythons.discover())
+            sys.exit(0)
+
+        if args.perf_report:
+            sys.exit(perf_history.main(["report"]))
+
+        operating_system = platform.system().lower()
+        is_windows = operating_system == "windows"
+
+        # Get the executable path for PyInstaller
+        if getattr(sys, 'frozen', False):
+            # Running as PyInstaller executable
+            executable_path = sys.executable
+            executable_dir = os.path.dirname(sys.executable)
+            print(f"📦 Running from PyInstaller executable: {executable_path}")
+        else:
+            # Running as Python script
+            executable_path = os.path.abspath(__file__)
+            executable_dir = os.path.dirname(executable_path)
+            print(f"🐍 Running as Python script: {executable_path}")
+
+        index_urls, git_urls = mirrors.load_config(args.mirrors, args.index_mirrors, args.git_mirrors)
+        if len(index_urls) > 1:
+            print("🌐 Probing package index mirrors...")
+        # Git mirrors are probed once the git executable of the target is known
+        index_mirrors, git_mirrors = mirrors.configure(index_urls, git_urls, git_exec=None)
+        if index_mirrors.latencies:
+            print("   Package index endpoints:")
+            index_mirrors.print_summary()
+        print(f"🌐 Using package index: {mirrors.get_index_url()}")
+
+        def select_git_mirror(git_exec):
+            if len(git_mirrors.urls) > 1:
+                print("🌐 Probing git mirrors...")
+            mirrors.probe_git_mirrors(git_exec)
+            if git_mirrors.latencies:
+                print("   Git endpoints:")
+                git_mirrors.print_summary()
+            selected_url = mirrors.get_git_url(repo_url)
+            progress_events.get_emitter().emit(
+                "mirrors_selected", index=mirrors.get_index_url(), git=selected_url
+            )
+            print(f"🌐 Using Cell-ACDC repository: {selected_url}")
+            return selected_url
+
+        if args.batch:
+            # The batch runs from an existing install, which may bring its portable Git
+            batch_git_exec = get_git_exec(executable_dir, is_windows)
+            repo_url = select_git_mirror(batch_git_exec)
+            batch_install.repo_url = repo_url
+            batch_report = batch_install.run_batch(
+                args.batch, get_installer_cmd(), max_workers=args.max_workers,
+                report_path=args.report, cache_dir=args.cache_dir,
+                payload_dir=executable_dir, git_exec=batch_git_exec
+            )
+            print(f"📄 Batch log can be found at: {log_path}")
+            if batch_report["failed"]:
+                session_status = "error"
+            sys.exit(1 if batch_report["failed"] else 0)
+
+        # Batch runs are recorded by the installer processes of each target
+        perf_recorder = perf_history.RunRecorder("extras" if args.install_extras else "install")
+        progress_events.get_emitter().add_listener(perf_recorder.on_event)
+
+        if args.install_extras:
+            # Background (or on demand) phase of a progressive install
+            target_dir = args.target
+            extras_env_path = details_store.read_install_details(target_dir)["venv_path"]
+            perf_recorder.set(version=perf_history.read_installed_version(extras_env_path))
+            failed_extras = extras_install.install_extras(
+                target_dir, extras_env_path,
+                extras_install.select_extras(extras_install.read_extras(extras_env_path),
+                                             args.install_extras),
+                lambda cmd, step: run_subprocess_with_logging(cmd, step=step)
+            )
+            if failed_extras:
+                session_status = "error"
+            print(f"📄 Extras installation log can be found at: {log_path}")
+            sys.exit(1 if failed_extras else 0)
+
         target_dir = args.target if args.target else None
         use_github = args.use_github.lower() == 'true' if args.use_github else None
         cellacdc_version = args.version if args.version else None
@@ -313,18 +666,6 @@ if __name__ == "__main__":
         # Determine and announce the installation mode
         flag_mode = all(value is not None for _, value in install_flags)
 
-        # Get the executable path for PyInstaller
-        if getattr(sys, 'frozen', False):
-            # Running as PyInstaller executable
-            executable_path = sys.executable
-            executable_dir = os.path.dirname(sys.executable)
-            print(f"📦 Running from PyInstaller executable: {executable_path}")
-        else:
-            # Running as Python script
-            executable_path = os.path.abspath(__file__)
-            executable_dir = os.path.dirname(executable_path)
-            print(f"🐍 Running as Python script: {executable_path}")
-        
         if not flag_mode:
             target_dir, use_github, cellacdc_version, python_path, is_embedded_python, pyversion, custom_CellACDC_path = get_install_params(executable_dir)
 
@@ -343,11 +684,57 @@ if __name__ == "__main__":
             use_whl = custom_CellACDC_path.endswith('.whl')
             custom_CellACDC_path = os.path.abspath(custom_CellACDC_path)  # Ensure absolute path for custom path
             use_custom_CellACDC = True if not use_whl else False
-            
-        operating_system = platform.system().lower()
-        is_windows = operating_system == "windows"
+        perf_recorder.set_config(
+            source_mode="github" if use_github else "wheel" if use_whl
+            else "custom" if use_custom_CellACDC else "pypi"
+        )
 
         clone_path = os.path.join(target_dir, clone_path)
+        git_exec = get_git_exec(target_dir, is_windows)
+        repo_url = select_git_mirror(git_exec)
+        # Timings from another mirror or git are not comparable
+        perf_recorder.set_config(**install_planner.get_source_config(
+            "github" if use_github else "pypi", repo_url, git_exec
+        ))
+
+        if args.plan:
+            # Runs are only recorded when something was installed
+            perf_recorder = None
+            plan_python_path, plan_python_info, plan_is_conda, plan_conda_path = resolve_python(
+                python_path, is_embedded_python, target_dir, is_windows, update_cache=False
+            )
+            print("🗺️ Planning installation (resolving packages, this may take a minute)...")
+            plan = install_planner.plan_install(
+                target_dir,
+                "github" if use_github else "wheel" if use_whl
+                else "custom" if use_custom_CellACDC else "pypi",
+                plan_python_path, plan_python_info, plan_is_conda, plan_conda_path,
+                version=cellacdc_version, pyversion=pyversion,
+                custom_path=custom_CellACDC_path, repo_url=repo_url,
+                cache_dir=args.cache_dir, prune=args.prune, extras=args.extras,
+                git_exec=git_exec
+            )
+            install_planner.print_plan(plan)
+            if args.plan_output:
+                install_planner.write_plan(plan, args.plan_output)
+                print(f"📄 Plan written to: {args.plan_output}")
+            sys.exit(0)
+
+        # Editable installs from a clone always install all dependencies
+        progressive = ((args.progressive or bool(args.extras)) and not args.wait_extras
+                       and not (use_github or use_custom_CellACDC))
+        if (args.progressive or args.extras) and not args.wait_extras \
+                and (use_github or use_custom_CellACDC):
+            print("ℹ️ Source installs install the full core, only the extras are deferred.")
+        deferred_requirements = []
+
+        cache_dir = args.cache_dir
+        if cache_dir:
+            cache_dir = setup_shared_caches(cache_dir)
+
+        build_cache = wheel_cache.BuildCache(
+            cache_dir or wheel_cache.get_default_cache_dir(), git_exec
+        )
 
         # Log all command line arguments for debugging
         if flag_mode:
@@ -357,7 +744,10 @@ if __name__ == "__main__":
             print()
 
         if use_github:
-            if os.path.exists(clone_path):
+            if os.path.exists(os.path.join(clone_path, ".git")):
+                print(f"🔄 CellACDC repository already exists at {clone_path}. Updating it...")
+                update_clone(git_exec, clone_path, args.git_ref, repo_url=repo_url)
+            elif os.path.exists(clone_path):
                 print(f"⚠️ CellACDC repository already exists at {clone_path}. Skipping clone.")
             else:
                 print(f"📥 Cloning CellACDC repository from {repo_url} to {clone_path} (This may take a while)...")
@@ -370,10 +760,19 @@ if __name__ == "__main__":
                         git_prefix = "git"
                     
                     cmd = [git_prefix, "clone", repo_url, clone_path]
-                    run_subprocess_with_logging(cmd)
+                    git_mirror_path = batch_install.get_git_mirror_path(cache_dir) if cache_dir else None
+                    if git_mirror_path and os.path.exists(git_mirror_path):
+                        # Borrow objects from the shared mirror, then copy them so
+                        # that the clone does not depend on the cache afterwards
+                        print(f"   Using shared git mirror: {git_mirror_path}")
+                        cmd[2:2] = ["--reference-if-able", git_mirror_path, "--dissociate"]
+                    run_subprocess_with_logging(cmd, step="git_clone")
                     cmd = ["git", "config", "--global", "--add", 
                            "safe.directory", clone_path]
-                    run_subprocess_with_logging(cmd)
+                    run_subprocess_with_logging(cmd, step="git_config")
+                    if args.git_ref:
+                        print(f"   Checking out: {args.git_ref}")
+                        wheel_cache.git_output(git_prefix, clone_path, "checkout", args.git_ref)
                     
                     # Add a small delay to ensure file system operations are complete
                     print("   Waiting for file system operations to complete...")
@@ -438,24 +837,14 @@ if __name__ == "__main__":
         elif use_whl:
             clone_path = os.path.abspath(custom_CellACDC_path)  # Ensure absolute path for pip install
 
-        if isinstance(is_embedded_python, str):
-            if is_embedded_python.lower() == 'true':
-                is_embedded_python = True
-        if is_embedded_python is True:
-            # Cross-platform Python executable path
-            python_exe = "python.exe" if is_windows else "python"
-            python_path = os.path.join(target_dir, "miniforge", python_exe)
-
-        is_conda = python_path.lower().find("miniforge") != -1 or python_path.lower().find("conda") != -1
-        if is_conda:
-            folder = os.path.dirname(python_path)
-            # Cross-platform conda executable path
-            if is_windows:
-                conda_path = os.path.join(folder, "Scripts", "conda.exe")
-            else:
-                conda_path = os.path.join(folder, "bin", "conda")
-            conda_path = os.path.abspath(conda_path)  # Ensure absolute path for conda
-        #     conda_path = f'"{conda_path}"'  # Ensure proper quoting for Windows paths
+        python_path, python_info, is_conda, conda_path = resolve_python(
+            python_path, is_embedded_python, target_dir, is_windows
+        )
+        perf_recorder.set_config(
+            env_kind="conda" if is_conda else "venv",
+            python=python_info["version"] if python_info is not None else None,
+            shared_cache=bool(cache_dir)
+        )
         # python_path = f'"{python_path}"'  # Ensure proper quoting for Windows paths'
         
         if not is_conda:
@@ -463,7 +852,8 @@ if __name__ == "__main__":
             venv_path = os.path.abspath(venv_path)  # Ensure absolute path for venv
             print(f"🌱 Creating venv at: {venv_path}")
             print(f"Using Python at: {python_path}")
-            run_subprocess_with_logging([python_path, "-m", "venv", venv_path])
+            run_subprocess_with_logging([python_path, "-m", "venv", venv_path],
+                                        step="create_venv")
             print("✅ venv created.")
 
             # Cross-platform pip executable path
@@ -478,36 +868,52 @@ if __name__ == "__main__":
                 clone_path = os.path.abspath(clone_path)  # Ensure absolute path for pip install
                 print(f"   Absolute path: {clone_path}")
                 
-                # Install in editable mode from local clone
-                cmd = [pip_path, "install", clone_path]
-                if not use_whl:
-                    cmd.insert(-1, "-e")
-                run_subprocess_with_logging(cmd)
+                if use_whl:
+                    deferred_requirements = install_package(
+                        [pip_path], venv_path, clone_path, progressive
+                    )
+                else:
+                    # Install in editable mode from local clone
+                    install_from_source([pip_path], venv_path, clone_path, build_cache)
             else:
                 print(f"🛠️ Downloading and installing CellACDC v{cellacdc_version} and dependencies...")
                 
                 # Install specific version from PyPI
-                run_subprocess_with_logging([
-                    pip_path, "install", f"cellacdc=={cellacdc_version}"
-                ])
+                deferred_requirements = install_package(
+                    [pip_path], venv_path, f"cellacdc=={cellacdc_version}", progressive
+                )
             
             print("✅ Pip installation completed.")
         
         elif is_conda:
             conda_venv_path = os.path.join(target_dir, "conda_venv")
             conda_venv_path = os.path.abspath(conda_venv_path)  # Ensure absolute path for conda venv
-            print(f"🌱 Creating conda venv: {conda_venv_path}")
-            print(f"Using conda/miniforge Python at: {python_path}")
-
-            # Create conda environment with Python
-            run_subprocess_with_logging([
-                conda_path,
-                "create", "-y",
-                "-p", conda_venv_path,
-                f"python={pyversion}"
-            ])
-            
-            print("✅ Conda environment created.")
+            existing_python = glob.glob(os.path.join(
+                conda_venv_path, "conda-meta", f"python-{pyversion}*.json"
+            ))
+            if use_github and existing_python:
+                # Updating a GitHub install, recreating the env would force a full reinstall
+                print(f"♻️ Reusing existing conda venv with Python {pyversion}: {conda_venv_path}")
+            else:
+                if os.path.exists(conda_venv_path):
+                    # Deleted in the background while the new environment is created
+                    print(f"🗑️ Removing previous conda venv: {conda_venv_path}")
+                    fast_rmtree.purge_trash(target_dir, name="conda_venv")
+                    old_env_removal = fast_rmtree.remove_tree(
+                        conda_venv_path, background=True, daemon=True
+                    )
+                print(f"🌱 Creating conda venv: {conda_venv_path}")
+                print(f"Using conda/miniforge Python at: {python_path}")
+
+                # Create conda environment with Python
+                run_subprocess_with_logging([
+                    conda_path,
+                    "create", "-y",
+                    "-p", conda_venv_path,
+                    f"python={pyversion}"
+                ], step="create_conda_env")
+
+                print("✅ Conda environment created.")
 
             if use_github or custom_CellACDC_path:
                 print("🛠️ Installing CellACDC and dependencies...")
@@ -515,25 +921,26 @@ if __name__ == "__main__":
                 clone_path = os.path.abspath(clone_path)  # Ensure absolute path for pip install
                 print(f"   Absolute path: {clone_path}")
                 
-                # Install in editable mode from local clone
-                cmd = [
+                conda_pip_cmd = [
                     conda_path,
                     "run", "-p", conda_venv_path,
-                    "pip", "install", clone_path
+                    "pip"
                 ]
-                if not use_whl:
-                    cmd.insert(-1, "-e")
-
-                run_subprocess_with_logging(cmd)
+                if use_whl:
+                    deferred_requirements = install_package(
+                        conda_pip_cmd, conda_venv_path, clone_path, progressive
+                    )
+                else:
+                    # Install in editable mode from local clone
+                    install_from_source(conda_pip_cmd, conda_venv_path, clone_path, build_cache)
             else:
                 print(f"🛠️ Downloading and installing CellACDC v{cellacdc_version} and dependencies...")
                 
                 # Install specific version from PyPI
-                run_subprocess_with_logging([
-                    conda_path,
-                    "run", "-p", conda_venv_path,
-                    "pip", "install", f"cellacdc=={cellacdc_version}"
-                ])
+                deferred_requirements = install_package(
+                    [conda_path, "run", "-p", conda_venv_path, "pip"], conda_venv_path,
+                    f"cellacdc=={cellacdc_version}", progressive
+                )
             
             print("✅ Conda pip installation completed.")
 
@@ -547,11 +954,31 @@ if __name__ == "__main__":
             "version": cellacdc_version,
             "conda_path": conda_path if is_conda else "",
         }
-        with open(os.path.join(target_dir, "install_details.json"), "w") as f:
-            json.dump(install_details, f, indent=4)
+        # Under the lock, keeping the keys the install does not own
+        # (e.g. warm_launch, or extras installed by a background process)
+        details_store.update_install_details(
+            target_dir, lambda details: details.update(install_details), create=True
+        )
         print("✅ Installation details saved to install_details.json.")
 
+        setup_env = None
+        if is_conda:
+            # Activating conda at every launch is slow, store what it changes instead
+            print("🔧 Computing conda environment activation...")
+            try:
+                activation = conda_activation.compute(conda_path, conda_venv_path)
+                details_store.update_install_details(
+                    target_dir, lambda details: details.update(activation=activation)
+                )
+                setup_env = conda_activation.apply(activation)
+                print(f"✅ Conda activation saved: {len(activation['set'])} variables, "
+                      f"{sum(len(p['prepend']) + len(p['append']) for p in activation['paths'].values())} path entries.")
+            except Exception as e:
+                print(f"⚠️ Could not compute conda activation, the launcher will retry: {e}")
+
         print("🛠️ Launching CellACDC for internal setup...")
+        progress_events.get_emitter().step_start("acdc_setup")
+        acdc_setup_start = time.time()
         # Cross-platform ACDC executable paths
         if not is_conda:
             if is_windows:
@@ -571,12 +998,79 @@ if __name__ == "__main__":
             subprocess.run([acdc_exec_path, "-y",
                                         "--install_details", 
                                         os.path.join(target_dir, 
-                                        "install_details.json")])
+                                        "install_details.json")], env=setup_env)
+        progress_events.get_emitter().step_end("acdc_setup", "success",
+                                               time.time() - acdc_setup_start)
         print("✅ CellACDC internal setup completed.")
 
+        if args.prune:
+            print("✂️ Pruning files not needed to run Cell-ACDC...")
+            progress_events.get_emitter().step_start("prune")
+            prune_start = time.time()
+            try:
+                prune_summary = prune_install.prune(
+                    target_dir, venv_path if not is_conda else conda_venv_path,
+                    clone_path=clone_path if use_github else None,
+                    policy=prune_install.load_policy(args.prune_policy),
+                    env=setup_env
+                )
+                prune_status = "restored" if prune_summary["restored"] else "success"
+                print("✅ Pruning completed.")
+            except Exception as e:
+                prune_status = "error"
+                print(f"⚠️ Pruning failed, the installation is not affected: {e}")
+            progress_events.get_emitter().step_end(
+                "prune", prune_status, time.time() - prune_start,
+                saved_bytes=(prune_summary["before_bytes"] - prune_summary["after_bytes"]
+                             if prune_summary else 0)
+            )
+
+        # Record the installed files, so that the launcher can detect a damaged environment
+        try:
+            env_integrity.write_manifest(target_dir, venv_path if not is_conda else conda_venv_path)
+        except Exception as e:
+            print(f"⚠️ Could not save environment manifest: {e}")
+        perf_recorder.set(version=perf_history.read_installed_version(
+            venv_path if not is_conda else conda_venv_path
+        ))
+
+        if args.extras or deferred_requirements:
+            # Cell-ACDC is usable from here on, the optional extras follow
+            env_path = venv_path if not is_conda else conda_venv_path
+            selected_extras = extras_install.select_extras(
+                extras_install.read_extras(env_path), args.extras
+            )
+            if deferred_requirements:
+                selected_extras.insert(0, extras_install.DEFERRED_GROUP)
+            if selected_extras:
+                extras_install.update_extras_state(target_dir, selected_extras, "pending")
+                if args.wait_extras:
+                    extras_install.install_extras(
+                        target_dir, env_path, selected_extras,
+                        lambda cmd, step: run_subprocess_with_logging(cmd, step=step)
+                    )
+                else:
+                    extras_pid = extras_install.start_background_install(
+                        get_installer_cmd(), target_dir, selected_extras
+                    )
+                    print(f"🧩 Installing optional extras in the background (pid {extras_pid}): "
+                          f"{', '.join(selected_extras)}")
+                    print("   Cell-ACDC can already be used, the launcher shows their progress.")
+
+        if old_env_removal is not None:
+            removal_result = old_env_removal.result
+            if old_env_removal.is_alive():
+                # Not worth waiting for, the launcher deletes the rest on its next start
+                print(f"🗑️ The previous conda venv is still being deleted, the rest is deleted "
+                      f"next time Cell-ACDC starts: {old_env_removal.trash_path}")
+            elif not removal_result.success:
+                print(f"⚠️ Could not delete {len(removal_result.failed)} files of the previous "
+                      f"conda venv, left in: {old_env_removal.trash_path}")
+
         # Log final session summary
         print_closing_logging(log_path)
     except Exception as e:
+        session_status = "error"
         # Restore original stdout/stderr for error handling
         sys.stdout = original_stdout
         sys.stderr = original_stderr
@@ -590,31 +1084,61 @@ if __name__ == "__main__":
         traceback.print_exc()
         
         # Save error to log file
-        try:
-            with open(log_path, 'a', encoding='utf-8', errors='replace') as f:
-                f.write(f"\n\n{'='*80}\n")
-                f.write(f"INSTALLATION ERROR - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"{'='*80}\n")
-                f.write(f"❌ ERROR: {str(e)}\n")
-                f.write(f"Traceback:\n{traceback.format_exc()}\n")
-                f.write(f"{'='*80}\n")
-            print(f"📄 Full installation log saved to: {log_path}")
-            print("=" * 80)
-        except:
-            print("⚠️ Could not save error log.")
-        
-        print("Log files are saved in the following directory:")
-        print(f"📂 {os.path.dirname(log_path)}")
+        if log_path is not None:
+            try:
+                with open(log_path, 'a', encoding='utf-8', errors='replace') as f:
+                    f.write(f"\n\n{'='*80}\n")
+                    f.write(f"INSTALLATION ERROR - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+                    f.write(f"{'='*80}\n")
+                    f.write(f"❌ ERROR: {str(e)}\n")
+                    f.write(f"Traceback:\n{traceback.format_exc()}\n")
+                    f.write(f"{'='*80}\n")
+                print(f"📄 Full installation log saved to: {log_path}")
+                print("=" * 80)
+            except:
+                print("⚠️ Could not save error log.")
+
+            print("Log files are saved in the following directory:")
+            print(f"📂 {os.path.dirname(log_path)}")
         print("Please copy the two newest log files, and report this issue to the CellACDC team at:")
         print(repo_url)
-        input("❌!!!CELL-ACDC SETUP IS IN ERROR STATE!!!❌ Press Enter to close this window...")
+        print("You can also bundle the logs of all failed sessions with:")
+        print("   Cell-ACDC.exe --export_logs cellacdc_logs.zip")
+        exit_code = 1
+        if not non_interactive:
+            input("❌!!!CELL-ACDC SETUP IS IN ERROR STATE!!!❌ Press Enter to close this window...")
         
     finally:
         # Safely close log file and restore stdout/stderr
         try:
             sys.stdout = original_stdout
             sys.stderr = original_stderr
-            if 'log_file' in locals() and not log_file.closed:
+            if 'log_file' in locals() and log_file is not None and not log_file.closed:
                 log_file.close()
         except:
-            pass
\ No newline at end of file
+            pass
+        try:
+            events = progress_events.get_emitter()
+            events.emit("session_end", status=session_status)
+            events.close()
+        except Exception:
+            pass
+        try:
+            if 'log_path' in locals() and log_path is not None:
+                log_store.record_session(
+                    log_path, "install", session_start, session_status,
+                    target=target_dir if 'target_dir' in locals() else None,
+                    batch=bool(args.batch) if 'args' in locals() else False
+                )
+        except Exception:
+            pass
+        try:
+            if perf_recorder is not None:
+                perf_recorder.save(
+                    session_status, target=target_dir if 'target_dir' in locals() else None,
+                    log=log_path
+                )
+        except Exception:
+            pass
+
+    sys.exit(exit_code)
\ No newline at end of file
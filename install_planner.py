@@ -0,0 +1,353 @@
+import os
+import glob
+import json
+import sqlite3
+import hashlib
+import tempfile
+import subprocess
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import mirrors
+import env_integrity
+import wheel_cache
+import perf_history
+
+RESOLVE_TIMEOUT = 300
+SIZE_TIMEOUT = 10
+
+def get_pip_cache_dir(python_exec, cache_dir=None):
+    """pip cache folder used by the install, None if unknown"""
+    if cache_dir:
+        return os.path.join(os.path.abspath(cache_dir), "pip")
+    if os.environ.get("PIP_CACHE_DIR"):
+        return os.environ["PIP_CACHE_DIR"]
+    try:
+        result = subprocess.run(
+            [python_exec, "-m", "pip", "cache", "dir"], capture_output=True, text=True,
+            encoding='utf-8', errors='replace', timeout=30
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    lines = result.stdout.strip().splitlines()
+    return lines[-1].strip() if result.returncode == 0 and lines else None
+
+def is_in_pip_cache(pip_cache_dir, url):
+    """Whether pip's HTTP cache holds a response for `url`.
+
+    pip caches downloads with CacheControl, under the SHA-224 of the
+    normalized URL (scheme and host lowercase, no fragment).
+    """
+    if not pip_cache_dir or not url:
+        return False
+    parts = urllib.parse.urlsplit(url)
+    key = f"{parts.scheme.lower()}://{parts.netloc.lower()}{parts.path or '/'}"
+    if parts.query:
+        key += f"?{parts.query}"
+    hashed = hashlib.sha224(key.encode()).hexdigest()
+    for cache_name in ("http-v2", "http"):
+        path = os.path.join(pip_cache_dir, cache_name, *hashed[:5], hashed)
+        if os.path.exists(path) or os.path.exists(path + ".body"):
+            return True
+    return False
+
+def get_download_size(url, timeout=SIZE_TIMEOUT):
+    """Size of a download from the Content-Length of a HEAD request"""
+    if url.startswith("file://"):
+        path = urllib.request.url2pathname(urllib.parse.urlsplit(url).path)
+        # Local source folders are built, not downloaded
+        return os.path.getsize(path) if os.path.isfile(path) else None
+    try:
+        request = urllib.request.Request(url, method="HEAD")
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            length = response.headers.get("Content-Length")
+            return int(length) if length else None
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
+
+def resolve_pip(python_exec, requirements, ignore_installed=False, python_version=None):
+    """Resolve `requirements` with pip's dry-run report, without installing.
+
+    Returns the packages pip would install, as dicts with name, version,
+    url and whether they come from a direct (local or VCS) reference.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        report_path = os.path.join(tmp_dir, "report.json")
+        cmd = [python_exec, "-m", "pip", "install", "--dry-run", "--quiet",
+               "--report", report_path, *requirements]
+        if ignore_installed:
+            cmd.insert(4, "--ignore-installed")
+        if python_version:
+            # The environment will have another Python than the resolving one
+            cmd[4:4] = ["--python-version", python_version, "--only-binary=:all:"]
+        result = subprocess.run(
+            cmd, capture_output=True, text=True, encoding='utf-8', errors='replace',
+            timeout=RESOLVE_TIMEOUT
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip()[-500:] or f"pip exited with {result.returncode}")
+        with open(report_path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    packages = []
+    for item in report.get("install", []):
+        download_info = item.get("download_info", {})
+        packages.append({
+            "name": item["metadata"]["name"],
+            "version": item["metadata"]["version"],
+            "url": download_info.get("url"),
+            "direct": bool(item.get("is_direct")),
+        })
+    return packages
+
+def resolve_conda(conda_path, pyversion):
+    """Packages `conda create` would fetch for a new environment"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        result = subprocess.run(
+            [conda_path, "create", "--dry-run", "--json", "-p", os.path.join(tmp_dir, "env"),
+             f"python={pyversion}"],
+            capture_output=True, text=True, encoding='utf-8', errors='replace',
+            timeout=RESOLVE_TIMEOUT
+        )
+    try:
+        output = json.loads(result.stdout)
+    except ValueError:
+        raise RuntimeError(result.stderr.strip()[-500:] or f"conda exited with {result.returncode}")
+    if not output.get("success", result.returncode == 0):
+        raise RuntimeError(output.get("message") or output.get("error") or "conda dry run failed")
+    actions = output.get("actions", {})
+    fetch = {item.get("fn") or item.get("name"): item.get("size") for item in actions.get("FETCH", [])}
+    return [
+        {
+            "name": item["name"],
+            "version": item["version"],
+            "size": fetch.get(item.get("fn"), fetch.get(item["name"])),
+            "cached": item.get("fn") not in fetch and item["name"] not in fetch,
+        }
+        for item in actions.get("LINK", [])
+    ]
+
+def _add_sizes(packages, pip_cache_dir):
+    def size(package):
+        url = package["url"]
+        if url is None or (package["direct"] and not url.startswith("file://")):
+            # VCS references have no size before cloning
+            return None
+        return get_download_size(url)
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        sizes = list(executor.map(size, packages))
+    for package, package_size in zip(packages, sizes):
+        package["size"] = package_size
+        package["cached"] = (package["url"] or "").startswith("file://") \
+            or is_in_pip_cache(pip_cache_dir, package["url"])
+
+def get_source_config(source_mode, repo_url=None, git_exec=None):
+    """Endpoints and tools an install downloads with, part of its perf configuration"""
+    config = {"index": mirrors.get_index_url() or mirrors.DEFAULT_INDEX_URL}
+    if source_mode == "github":
+        config["git_mirror"] = repo_url
+        config["git"] = "system" if git_exec in (None, "git") else "portable"
+    return config
+
+def plan_install(target_dir, source_mode, python_path, python_info, is_conda, conda_path,
+                 version=None, pyversion=None, custom_path=None, repo_url=None,
+                 cache_dir=None, prune=False, extras=None, git_exec=None):
+    """Work out what an install with these settings would do, changing nothing.
+
+    Returns the plan as a dict: the resolved configuration, the steps with
+    time estimates from the performance history, and the packages to
+    download with their sizes and whether they are in the local caches.
+    """
+    target_dir = os.path.abspath(target_dir)
+    clone_path = os.path.join(target_dir, "Cell_ACDC")
+    env_path = os.path.join(target_dir, "conda_venv" if is_conda else "venv")
+    try:
+        env_python = env_integrity.get_env_python(env_path)
+    except FileNotFoundError:
+        env_python = None
+    env_exists = env_python is not None
+    warnings = []
+    steps = []
+
+    def add_step(step, action):
+        steps.append({"step": step, "action": action})
+
+    source_path = None
+    requirements = [f"cellacdc=={version}" if version else "cellacdc"]
+    if source_mode == "github":
+        if os.path.exists(os.path.join(clone_path, ".git")):
+            add_step("git_fetch", f"Update the clone at {clone_path}")
+            source_path = clone_path
+        else:
+            add_step("git_clone", f"Clone {repo_url} to {clone_path}")
+            warnings.append("The repository is not cloned yet, packages are resolved for the "
+                            "latest Cell-ACDC release instead.")
+            requirements = ["cellacdc"]
+    elif source_mode in ("custom", "wheel"):
+        source_path = custom_path
+    if source_path:
+        requirements = [source_path]
+
+    # Conda environments are recreated, except when updating a GitHub install
+    reuse_conda_env = is_conda and source_mode == "github" and bool(glob.glob(os.path.join(
+        env_path, "conda-meta", f"python-{pyversion}*.json"
+    )))
+    if is_conda:
+        if reuse_conda_env:
+            add_step("create_conda_env", f"Reuse the conda environment {env_path} (skipped)")
+            steps[-1]["skipped"] = True
+        else:
+            if os.path.exists(env_path):
+                add_step("remove_conda_env", f"Remove the previous environment {env_path} (in the background)")
+                steps[-1]["skipped"] = True
+            add_step("create_conda_env", f"Create a conda environment with Python {pyversion} at {env_path}")
+    else:
+        add_step("create_venv", f"Create a venv at {env_path} with {python_path}")
+
+    build_state = None
+    if source_mode in ("github", "custom") and source_path:
+        build_cache = wheel_cache.BuildCache(cache_dir or wheel_cache.get_default_cache_dir())
+        try:
+            build_state = build_cache.check(
+                env_path, source_path, wheel_cache.get_source_key(source_path),
+                wheel_cache.get_dependency_hash(source_path), touch=False
+            )
+        except Exception:
+            build_state = None
+    if build_state is not None:
+        add_step("pip_install", f"Skip the editable install of {source_path} ({build_state.replace('_', ' ')})")
+        steps[-1]["skipped"] = True
+    elif source_mode in ("github", "custom") and source_path:
+        add_step("build_requirements", "Install the build requirements from the wheel cache")
+        add_step("pip_install", f"Editable install of {source_path}")
+    else:
+        add_step("pip_install", f"Install {requirements[0]} and its dependencies")
+    add_step("acdc_setup", "Run the Cell-ACDC setup")
+    if prune:
+        add_step("prune", "Remove files not needed to run Cell-ACDC")
+    if extras:
+        add_step("extras", f"Install the optional extras {extras} in the background")
+        steps[-1]["skipped"] = True
+
+    # Resolve with the environment's pip when it survives, otherwise with
+    # the base Python (for everything the new environment needs)
+    keep_env = env_exists and (not is_conda or reuse_conda_env)
+    resolve_python = env_python if keep_env else python_path
+    python_version = None
+    if not keep_env and is_conda and pyversion and python_info is not None \
+            and not python_info["version"].startswith(f"{pyversion}."):
+        python_version = pyversion
+
+    def pip_packages():
+        if build_state is not None:
+            return []
+        if python_info is None and not keep_env:
+            raise RuntimeError(f"Python not found at {python_path}")
+        packages = resolve_pip(resolve_python, requirements, ignore_installed=not keep_env,
+                               python_version=python_version)
+        _add_sizes(packages, get_pip_cache_dir(resolve_python, cache_dir))
+        return packages
+
+    def conda_packages():
+        if not is_conda or reuse_conda_env:
+            return []
+        return resolve_conda(conda_path, pyversion)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        pip_future = executor.submit(pip_packages)
+        conda_future = executor.submit(conda_packages)
+        packages = {}
+        for kind, future in (("pip", pip_future), ("conda", conda_future)):
+            try:
+                packages[kind] = future.result()
+            except Exception as e:
+                packages[kind] = None
+                warnings.append(f"Could not resolve the {kind} packages: {e}")
+
+    config = perf_history.get_config(
+        source_mode=source_mode, env_kind="conda" if is_conda else "venv",
+        python=python_info["version"] if python_info is not None else None,
+        shared_cache=bool(cache_dir),
+        **get_source_config(source_mode, repo_url, git_exec)
+    )
+    estimates = {}
+    conn = perf_history.connect(read_only=True)
+    if conn is not None:
+        try:
+            estimates = perf_history.get_step_estimates(conn, "install", config)
+        except sqlite3.Error as e:
+            warnings.append(f"Could not read the performance history: {e}")
+        finally:
+            conn.close()
+    total_estimate = 0
+    for step in steps:
+        estimate = None if step.get("skipped") else estimates.get(step["step"])
+        step["estimate_s"] = round(estimate[0], 1) if estimate else None
+        step["estimate_exact"] = estimate[1] if estimate else None
+        total_estimate += step["estimate_s"] or 0
+
+    all_packages = (packages["pip"] or []) + (packages["conda"] or [])
+    return {
+        "config": {
+            "target_dir": target_dir,
+            "source_mode": source_mode,
+            "env_kind": "conda" if is_conda else "venv",
+            "env_path": env_path,
+            "env_exists": env_exists,
+            "python_path": python_path,
+            "python": python_info["version"] if python_info is not None else None,
+            "conda_path": conda_path,
+            "cache_dir": cache_dir,
+        },
+        "steps": steps,
+        "packages": packages,
+        "download_bytes": sum(p["size"] or 0 for p in all_packages if not p["cached"]),
+        "cached_bytes": sum(p["size"] or 0 for p in all_packages if p["cached"]),
+        "unknown_sizes": sum(1 for p in all_packages if p["size"] is None),
+        "estimate_s": round(total_estimate, 1) if any(step["estimate_s"] for step in steps) else None,
+        "estimate_complete": all(step["estimate_s"] is not None
+                                 for step in steps if not step.get("skipped")),
+        "warnings": warnings,
+    }
+
+def _format_duration(seconds):
+    if seconds is None:
+        return "unknown"
+    return f"{seconds / 60:.1f} min" if seconds >= 90 else f"{seconds:.0f} s"
+
+def print_plan(plan):
+    config = plan["config"]
+    print("🗺️ Installation plan (nothing was changed)")
+    print(f"   Target: {config['target_dir']}")
+    print(f"   Source: {config['source_mode']}, {config['env_kind']} environment at {config['env_path']}"
+          f"{' (exists)' if config['env_exists'] else ''}")
+    print(f"   Python: {config['python'] or 'not found'} at {config['python_path']}")
+    print("📋 Steps:")
+    for i, step in enumerate(plan["steps"], 1):
+        if step.get("skipped"):
+            estimate = "-"
+        else:
+            estimate = _format_duration(step["estimate_s"])
+            if step["estimate_exact"] is False:
+                estimate += " (other configurations)"
+        print(f"   {i}. {step['action']} [{estimate}]")
+    for kind in ("conda", "pip"):
+        packages = plan["packages"].get(kind)
+        if not packages:
+            continue
+        print(f"📦 {kind} packages to install: {len(packages)}")
+        for package in sorted(packages, key=lambda p: -(p["size"] or 0)):
+            size = f"{package['size'] / 1e6:.1f} MB" if package["size"] is not None else "size unknown"
+            print(f"   {'♻️' if package['cached'] else '📥'} {package['name']} {package['version']} ({size})")
+    print(f"📥 To download: {plan['download_bytes'] / 1e6:.1f} MB, "
+          f"already in local caches: {plan['cached_bytes'] / 1e6:.1f} MB"
+          f"{', ' + str(plan['unknown_sizes']) + ' packages of unknown size' if plan['unknown_sizes'] else ''}")
+    print(f"⏱️ Estimated time: {_format_duration(plan['estimate_s'])}"
+          f"{'' if plan['estimate_complete'] else ' (some steps have no recorded timings yet)'}")
+    for warning in plan["warnings"]:
+        print(f"⚠️ {warning}")
+
+def write_plan(plan, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(plan, f, indent=4)
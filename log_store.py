@@ -0,0 +1,334 @@
+import os
+import sys
+import json
+import gzip
+import time
+import shutil
+import pathlib
+import zipfile
+import argparse
+import datetime
+import threading
+
+INDEX_FILENAME = "index.jsonl"
+LOCK_FILENAME = "index.lock"
+
+# Retention defaults
+MAX_AGE_DAYS = 90
+MAX_TOTAL_MB = 200
+KEEP_UNCOMPRESSED = 10
+# Logs that are not in the index yet are only touched once they are this
+# old, since they may belong to a session that is still running
+UNINDEXED_GRACE_DAYS = 2
+# Files written next to a log (e.g. resource telemetry), removed and
+# exported together with it
+SIDECAR_SUFFIXES = (".telemetry.jsonl",)
+
+def get_log_dir():
+    user_home_path = str(pathlib.Path.home())
+    user_profile_path = os.path.join(user_home_path, 'acdc-appdata')
+    return os.path.join(user_profile_path, ".acdc-logs")
+
+def create_log_file(log_dir, kind):
+    """Open a new `<timestamp>_cellacdc_<kind>.log` in `log_dir`.
+
+    Exclusive create, so that sessions started in the same second (e.g.
+    batch installs, or the launcher opened twice) get separate files.
+    Returns the open file and its path.
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    log_path = os.path.join(log_dir, f"{timestamp}_cellacdc_{kind}.log")
+    suffix = 1
+    while True:
+        try:
+            return open(log_path, 'x', encoding='utf-8', errors='replace'), log_path
+        except FileExistsError:
+            log_path = os.path.join(log_dir, f"{timestamp}_{suffix}_cellacdc_{kind}.log")
+            suffix += 1
+
+def _is_log_file(filename):
+    return filename.endswith((".log", ".log.gz"))
+
+def _log_name(filename):
+    """Name of a log without the compression suffix, used as index key"""
+    if filename.endswith(".gz"):
+        return filename[:-len(".gz")]
+    return filename
+
+def get_sidecar_paths(log_dir, name):
+    """Return the existing sidecar files of a log"""
+    paths = (os.path.join(log_dir, name + suffix) for suffix in SIDECAR_SUFFIXES)
+    return [path for path in paths if os.path.exists(path)]
+
+def _remove_log(log_dir, path, name):
+    os.remove(path)
+    for sidecar_path in get_sidecar_paths(log_dir, name):
+        try:
+            os.remove(sidecar_path)
+        except OSError:
+            pass
+
+def resolve_log_path(log_dir, name):
+    """Return the current path of a log, whether compressed or not"""
+    path = os.path.join(log_dir, name)
+    if os.path.exists(path):
+        return path
+    if os.path.exists(path + ".gz"):
+        return path + ".gz"
+    return None
+
+def IndexLock(log_dir, timeout=10):
+    """Cross-process lock around index rewrites"""
+    return FileLock(os.path.join(log_dir, LOCK_FILENAME), timeout=timeout)
+
+def read_index(log_dir):
+    index_path = os.path.join(log_dir, INDEX_FILENAME)
+    sessions = []
+    if not os.path.exists(index_path):
+        return sessions
+    with open(index_path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                sessions.append(json.loads(line))
+            except ValueError:
+                # Partially written line from an interrupted session
+                continue
+    return sessions
+
+def _write_index(log_dir, sessions):
+    index_path = os.path.join(log_dir, INDEX_FILENAME)
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for session in sessions:
+            f.write(json.dumps(session) + "\n")
+    os.replace(tmp_path, index_path)
+
+def record_session(log_path, kind, start_time, status, target=None, **extra):
+    """Add a finished session to the index of its log directory.
+
+    `kind` is "install" or "launch", `status` is "success" or "error".
+    Additional keyword arguments are stored as they are.
+    """
+    log_dir = os.path.dirname(log_path)
+    end_time = datetime.datetime.now()
+    session = {
+        "log": os.path.basename(log_path),
+        "kind": kind,
+        "start": start_time.isoformat(timespec='seconds'),
+        "duration_s": round((end_time - start_time).total_seconds(), 2),
+        "status": status,
+        "target": target,
+        **extra,
+    }
+    with IndexLock(log_dir):
+        with open(os.path.join(log_dir, INDEX_FILENAME), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(session) + "\n")
+    return session
+
+def _compress_log(path):
+    gz_path = path + ".gz"
+    tmp_path = gz_path + ".tmp"
+    with open(path, 'rb') as src, gzip.open(tmp_path, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    shutil.copystat(path, tmp_path)
+    try:
+        os.remove(path)
+    except OSError:
+        # Still open by another process (Windows), try again next time
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, gz_path)
+    return True
+
+def run_maintenance(log_dir=None, exclude=(), max_age_days=MAX_AGE_DAYS,
+                    max_total_mb=MAX_TOTAL_MB, keep_uncompressed=KEEP_UNCOMPRESSED):
+    """Apply retention and compress older logs.
+
+    Only logs of finished sessions (present in the index) are compressed or
+    deleted, except for unindexed logs older than UNINDEXED_GRACE_DAYS,
+    e.g. from versions that did not write an index yet.
+    Returns a dictionary with the number of compressed and removed logs.
+    """
+    log_dir = log_dir or get_log_dir()
+    stats = {"compressed": 0, "removed": 0}
+    if not os.path.isdir(log_dir):
+        return stats
+
+    exclude = {os.path.basename(path) for path in exclude}
+    now = time.time()
+    indexed = {session.get("log") for session in read_index(log_dir)}
+
+    logs = []
+    for entry in os.scandir(log_dir):
+        if not entry.is_file() or not _is_log_file(entry.name):
+            continue
+        name = _log_name(entry.name)
+        if name in exclude:
+            continue
+        stat = entry.stat()
+        age_days = (now - stat.st_mtime) / 86400
+        finished = name in indexed or age_days > UNINDEXED_GRACE_DAYS
+        if finished:
+            logs.append([entry.path, name, stat.st_mtime, stat.st_size])
+
+    # Newest first
+    logs.sort(key=lambda log: log[2], reverse=True)
+
+    kept = []
+    for i, (path, name, mtime, size) in enumerate(logs):
+        if (now - mtime) / 86400 > max_age_days:
+            try:
+                _remove_log(log_dir, path, name)
+                stats["removed"] += 1
+            except OSError:
+                pass
+            continue
+        if i >= keep_uncompressed and not path.endswith(".gz"):
+            try:
+                if _compress_log(path):
+                    path = path + ".gz"
+                    size = os.path.getsize(path)
+                    stats["compressed"] += 1
+            except OSError:
+                pass
+        kept.append((path, name, size))
+
+    total_bytes = sum(size for _, _, size in kept)
+    max_total_bytes = max_total_mb * 1024 * 1024
+    for path, name, size in reversed(kept[keep_uncompressed:]):
+        if total_bytes <= max_total_bytes:
+            break
+        try:
+            _remove_log(log_dir, path, name)
+            total_bytes -= size
+            stats["removed"] += 1
+        except OSError:
+            pass
+
+    if stats["removed"]:
+        with IndexLock(log_dir):
+            sessions = [
+                session for session in read_index(log_dir)
+                if resolve_log_path(log_dir, session.get("log", ""))
+            ]
+            _write_index(log_dir, sessions)
+
+    return stats
+
+def start_maintenance(log_dir, exclude=()):
+    """Run the log maintenance in a background thread.
+
+    The thread is not a daemon, so that a compression in progress finishes
+    before the interpreter exits.
+    """
+    def _target():
+        try:
+            run_maintenance(log_dir, exclude=exclude)
+        except Exception:
+            # Never let log housekeeping break an install or a launch
+            pass
+
+    thread = threading.Thread(target=_target, name="acdc-log-maintenance")
+    thread.start()
+    return thread
+
+def query(log_dir=None, kind=None, status=None, since=None, target=None, last=None):
+    """Return the indexed sessions matching the filters, oldest first"""
+    log_dir = log_dir or get_log_dir()
+    sessions = read_index(log_dir)
+    if kind:
+        sessions = [s for s in sessions if s.get("kind") == kind]
+    if status:
+        sessions = [s for s in sessions if s.get("status") == status]
+    if since:
+        sessions = [s for s in sessions if s.get("start", "") >= since]
+    if target:
+        target = os.path.normcase(os.path.abspath(target))
+        sessions = [
+            s for s in sessions
+            if s.get("target") and os.path.normcase(os.path.abspath(s["target"])) == target
+        ]
+    sessions.sort(key=lambda s: s.get("start", ""))
+    if last:
+        sessions = sessions[-last:]
+    return sessions
+
+def export_bundle(sessions, bundle_path, log_dir=None):
+    """Write the logs of the given sessions and their sidecars, uncompressed, into a zip file"""
+    log_dir = log_dir or get_log_dir()
+    with zipfile.ZipFile(bundle_path, 'w', compression=zipfile.ZIP_DEFLATED) as bundle:
+        bundle.writestr("sessions.json", json.dumps(sessions, indent=4))
+        for session in sessions:
+            path = resolve_log_path(log_dir, session.get("log", ""))
+            if path is None:
+                continue
+            if path.endswith(".gz"):
+                with gzip.open(path, 'rb') as f:
+                    bundle.writestr(session["log"], f.read())
+            else:
+                bundle.write(path, session["log"])
+            for sidecar_path in get_sidecar_paths(log_dir, session["log"]):
+                bundle.write(sidecar_path, os.path.basename(sidecar_path))
+    return bundle_path
+
+def print_sessions(sessions):
+    if not sessions:
+        print("No matching sessions found.")
+        return
+    for session in sessions:
+        icon = "✅" if session.get("status") == "success" else "❌"
+        print(f"{icon} {session.get('start', '?'):<19}  {session.get('kind', '?'):<8} "
+              f"{session.get('duration_s', 0):>9.2f}s  {session.get('log', '?')}"
+              f"{'  ' + session['target'] if session.get('target') else ''}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Query and export the Cell-ACDC installer and launcher logs"
+    )
+    parser.add_argument('--log_dir', help='Log directory (default: ~/acdc-appdata/.acdc-logs)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for name in ('list', 'export'):
+        sub = subparsers.add_parser(name)
+        sub.add_argument('--kind', choices=['install', 'launch'], help='Only sessions of this kind')
+        sub.add_argument('--status', choices=['success', 'error'], help='Only sessions with this outcome')
+        sub.add_argument('--since', help='Only sessions started after this date (YYYY-MM-DD)')
+        sub.add_argument('--target', help='Only sessions for this install directory')
+        sub.add_argument('--last', type=int, help='Only the N most recent matching sessions')
+        if name == 'export':
+            sub.add_argument('-o', '--output', required=True, help='Path of the zip bundle to write')
+
+    maintain = subparsers.add_parser('maintain')
+    maintain.add_argument('--max_age_days', type=float, default=MAX_AGE_DAYS)
+    maintain.add_argument('--max_total_mb', type=float, default=MAX_TOTAL_MB)
+    maintain.add_argument('--keep_uncompressed', type=int, default=KEEP_UNCOMPRESSED)
+
+    args = parser.parse_args(argv)
+    log_dir = args.log_dir or get_log_dir()
+
+    if args.command == 'maintain':
+        stats = run_maintenance(
+            log_dir, max_age_days=args.max_age_days,
+            max_total_mb=args.max_total_mb,
+            keep_uncompressed=args.keep_uncompressed
+        )
+        print(f"✅ Compressed {stats['compressed']} and removed {stats['removed']} log files.")
+        return 0
+
+    sessions = query(
+        log_dir, kind=args.kind, status=args.status, since=args.since,
+        target=args.target, last=args.last
+    )
+    if args.command == 'list':
+        print_sessions(sessions)
+    else:
+        export_bundle(sessions, args.output, log_dir)
+        print(f"📦 Exported {len(sessions)} sessions to: {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
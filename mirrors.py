@@ -0,0 +1,223 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import subprocess
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_INDEX_URL = "https://pypi.org/simple"
+DEFAULT_GIT_URL = "https://github.com/SchmollerLab/Cell_ACDC"
+# Comma-separated mirror lists, also inherited by the installers of a batch
+INDEX_MIRRORS_ENV = "ACDC_INDEX_MIRRORS"
+GIT_MIRRORS_ENV = "ACDC_GIT_MIRRORS"
+PROBE_TIMEOUT = 5
+# Project page requested from package indexes, small compared to the index root
+PROBE_PROJECT = "pip"
+
+# Output of pip and git that means the endpoint, not the command, failed.
+# "No matching distribution found" is left out, on its own it means the
+# requirement does not exist, not that the index is unreachable
+CONNECTION_ERRORS = re.compile("|".join([
+    r"NewConnectionError", r"ConnectionError", r"ConnectTimeoutError", r"ProxyError",
+    r"Max retries exceeded", r"Read timed out", r"Could not fetch URL",
+    r"Temporary failure in name resolution", r"Name or service not known",
+    r"HTTP error 5\d\d", r"SSLError",
+    r"Could not resolve host", r"Failed to connect", r"Connection (?:timed out|refused|reset)",
+    r"unable to access", r"early EOF", r"does not appear to be a git repository",
+]))
+
+def _is_local(url):
+    return url.startswith("file://") or "://" not in url
+
+def _local_path(url):
+    if url.startswith("file://"):
+        return urllib.request.url2pathname(urllib.parse.urlparse(url).path)
+    return url
+
+def probe_index(url, timeout=PROBE_TIMEOUT):
+    """Return the latency of a package index in seconds, None if unusable"""
+    start = time.time()
+    if _is_local(url):
+        return time.time() - start if os.path.isdir(_local_path(url)) else None
+    request = urllib.request.Request(
+        url.rstrip("/") + f"/{PROBE_PROJECT}/",
+        headers={"Accept": "application/vnd.pypi.simple.v1+json, text/html"}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read(1024)
+    except urllib.error.HTTPError as e:
+        # The index answered, it may just not mirror the probed project
+        if e.code >= 500:
+            return None
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
+    return time.time() - start
+
+def probe_git(url, timeout=PROBE_TIMEOUT * 2, git_exec="git"):
+    """Return the latency of a git remote in seconds, None if unusable"""
+    start = time.time()
+    env = {**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+    try:
+        result = subprocess.run(
+            [git_exec, "ls-remote", "--heads", url], capture_output=True,
+            timeout=timeout, env=env, stdin=subprocess.DEVNULL
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return time.time() - start if result.returncode == 0 else None
+
+class MirrorSet:
+    """Endpoints of one kind ("index" or "git"), fastest healthy one first"""
+    def __init__(self, kind, urls, probe):
+        self.kind = kind
+        self.urls = list(dict.fromkeys(url.strip() for url in urls if url.strip()))
+        self._probe = probe
+        self.latencies = {}
+        self.healthy = list(self.urls)
+        self.failed = []
+
+    def probe(self, max_workers=8):
+        """Probe every endpoint concurrently and order the healthy ones by latency"""
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            self.latencies = dict(zip(self.urls, executor.map(self._probe, self.urls)))
+        healthy = [url for url in self.urls if self.latencies[url] is not None]
+        self.healthy = sorted(healthy, key=lambda url: self.latencies[url])
+        return self.healthy
+
+    @property
+    def current(self):
+        return self.healthy[0] if self.healthy else None
+
+    def fail_over(self):
+        """Drop the current endpoint, return the next one (None if none left)"""
+        if self.healthy:
+            self.failed.append(self.healthy.pop(0))
+        return self.current
+
+    def print_summary(self):
+        for url in self.urls:
+            latency = self.latencies.get(url)
+            if url not in self.latencies:
+                status = "not probed"
+            elif latency is None:
+                status = "❌ unreachable"
+            else:
+                status = f"{latency * 1000:.0f} ms"
+            marker = "👉" if url == self.current else "  "
+            print(f"   {marker} {url} ({status})")
+
+def parse_list(value):
+    return [url for url in (value or "").split(",") if url.strip()]
+
+def load_config(path=None, index_mirrors=None, git_mirrors=None):
+    """Return (index urls, git urls) from a JSON file, arguments and environment.
+
+    The JSON file holds {"index": [...], "git": [...]}. The default endpoints
+    (the index of PIP_INDEX_URL, or PyPI, and GitHub) are always tried last.
+    """
+    config = {}
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    index_urls = (parse_list(index_mirrors) + list(config.get("index", []))
+                  + parse_list(os.environ.get(INDEX_MIRRORS_ENV))
+                  + [os.environ.get("PIP_INDEX_URL") or DEFAULT_INDEX_URL])
+    git_urls = (parse_list(git_mirrors) + list(config.get("git", []))
+                + parse_list(os.environ.get(GIT_MIRRORS_ENV)) + [DEFAULT_GIT_URL])
+    return (list(dict.fromkeys(url.strip() for url in index_urls if url.strip())),
+            list(dict.fromkeys(url.strip() for url in git_urls if url.strip())))
+
+_index = None
+_git = None
+
+def configure(index_urls, git_urls, git_exec="git", probe=True):
+    """Select the fastest healthy endpoints and apply them to this process.
+
+    The chosen package index is exported as PIP_INDEX_URL for every pip
+    started from here on. Without configured mirrors nothing is probed.
+    With `git_exec=None` the git mirrors are probed later, by
+    `probe_git_mirrors`, once the git executable is known.
+    Returns the (index, git) mirror sets.
+    """
+    global _index, _git
+    _index = MirrorSet("index", index_urls, probe_index)
+    _git = MirrorSet("git", git_urls, None)
+    if probe and len(_index.urls) > 1:
+        _index.probe()
+    _apply_index()
+    # Installers started from here (e.g. batch targets) use the same lists
+    os.environ[INDEX_MIRRORS_ENV] = ",".join(_index.healthy or _index.urls)
+    if git_exec is not None:
+        probe_git_mirrors(git_exec, probe=probe)
+    else:
+        os.environ[GIT_MIRRORS_ENV] = ",".join(_git.urls)
+    return _index, _git
+
+def probe_git_mirrors(git_exec="git", probe=True):
+    """Probe the git mirrors with `git_exec` (e.g. the portable Git on Windows)"""
+    _git._probe = lambda url: probe_git(url, git_exec=git_exec)
+    if probe and len(_git.urls) > 1:
+        _git.probe()
+    os.environ[GIT_MIRRORS_ENV] = ",".join(_git.healthy or _git.urls)
+    return _git
+
+def _apply_index():
+    if _index is not None and _index.current and len(_index.urls) > 1:
+        os.environ["PIP_INDEX_URL"] = _index.current
+
+def get_git_url(default=DEFAULT_GIT_URL):
+    if _git is None or _git.current is None:
+        return default
+    return _git.current
+
+def get_index_url():
+    return _index.current if _index is not None else None
+
+def _is_pip(cmd):
+    # pip, pip.exe, "python -m pip" or "conda run ... pip"
+    return any(os.path.splitext(os.path.basename(str(part)))[0].lower() in ("pip", "pip3")
+               for part in cmd[:6])
+
+def on_retry(cmd, output):
+    """Retry hook: fail over to the next endpoint after a connection error.
+
+    Returns the command to run on the next attempt.
+    """
+    if not CONNECTION_ERRORS.search(output):
+        return cmd
+    if _git is not None and _git.current in cmd:
+        failed = _git.current
+        new_url = _git.fail_over()
+        if new_url is not None:
+            print(f"🔀 Git mirror {failed} failed, switching to: {new_url}")
+            return [new_url if part == failed else part for part in cmd]
+    elif _index is not None and _is_pip(cmd) and len(_index.urls) > 1:
+        failed = _index.current
+        new_url = _index.fail_over()
+        if new_url is not None:
+            print(f"🔀 Package index {failed} failed, switching to: {new_url}")
+            _apply_index()
+    return cmd
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Probe the package index and git mirrors")
+    parser.add_argument('--mirrors', help='JSON file with "index" and "git" mirror lists')
+    parser.add_argument('--index_mirrors', help='Comma-separated package index URLs')
+    parser.add_argument('--git_mirrors', help='Comma-separated git repository URLs')
+    args = parser.parse_args(argv)
+    index_urls, git_urls = load_config(args.mirrors, args.index_mirrors, args.git_mirrors)
+    for mirror_set in configure(index_urls, git_urls):
+        if len(mirror_set.urls) == 1:
+            mirror_set.probe()
+        print(f"🌐 {'Package index' if mirror_set.kind == 'index' else 'Git'} endpoints:")
+        mirror_set.print_summary()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+import os
+import sys
+import glob
+import json
+import shutil
+import hashlib
+import argparse
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+STAGE_DIRNAME = "stage"
+MANIFEST_SUFFIX = ".manifest.json"
+
+def get_manifest_path(stage_dir):
+    """The manifest sits next to the staged tree, so it is not packaged with it"""
+    return stage_dir.rstrip("/\\") + MANIFEST_SUFFIX
+
+def read_manifest(stage_dir):
+    try:
+        with open(get_manifest_path(stage_dir), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _hash_file(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def scan_tree(root):
+    """Return {relative path: [size, mtime_ns]} of the files below `root`"""
+    files = {}
+    stack = [root]
+    while stack:
+        folder = stack.pop()
+        for entry in os.scandir(folder):
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+                continue
+            stat = entry.stat()
+            rel_path = os.path.relpath(entry.path, root).replace(os.sep, "/")
+            files[rel_path] = [stat.st_size, stat.st_mtime_ns]
+    return files
+
+def find_previous_stage(build_root, name, exclude=None):
+    """Return the most recently staged `name` of another build folder"""
+    pattern = os.path.join(build_root, "*", STAGE_DIRNAME, name + MANIFEST_SUFFIX)
+    candidates = []
+    for manifest_path in glob.glob(pattern):
+        stage_dir = manifest_path[:-len(MANIFEST_SUFFIX)]
+        if exclude and os.path.abspath(stage_dir) == os.path.abspath(exclude):
+            continue
+        if os.path.isdir(stage_dir):
+            candidates.append((os.path.getmtime(manifest_path), stage_dir))
+    return max(candidates)[1] if candidates else None
+
+def _is_unchanged(entry, source_info, source_path, staged_path, verify_hash):
+    """Compare a manifest entry [size, mtime_ns, sha256] with the source file"""
+    if entry is None or entry[0] != source_info[0]:
+        return False, None
+    if not verify_hash:
+        return entry[1] == source_info[1], entry[2]
+    source_hash = _hash_file(source_path)
+    staged_hash = entry[2]
+    if staged_hash is None and os.path.exists(staged_path):
+        # Staged without hashes, hash the staged file once
+        staged_hash = _hash_file(staged_path)
+    return source_hash == staged_hash, source_hash
+
+def _copy(source_path, dst_path):
+    tmp_path = dst_path + ".staging"
+    shutil.copy2(source_path, tmp_path)
+    # Replace instead of writing in place, the old file may be hard-linked
+    # into the stage of another build
+    os.replace(tmp_path, dst_path)
+
+def link_file(previous_path, dst_path):
+    """Hard-link `previous_path` as `dst_path`, replacing it atomically"""
+    tmp_path = dst_path + ".staging"
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    os.link(previous_path, tmp_path)
+    os.replace(tmp_path, dst_path)
+
+def stage_tree(source, stage_dir, previous_stage=None, verify_hash=False, max_workers=8):
+    """Sync the tree `source` into `stage_dir`, copying only what changed.
+
+    A file is unchanged when size and mtime match the manifest of the stage
+    (or, with `verify_hash=True`, its SHA-256). Files already in `stage_dir`
+    are kept, files unchanged in `previous_stage` are hard-linked from it,
+    the rest is copied. Files no longer in `source` are deleted. Writes the
+    manifest and returns a dict with counts.
+    """
+    source_files = scan_tree(source)
+    current = read_manifest(stage_dir) if os.path.isdir(stage_dir) else None
+    previous = read_manifest(previous_stage) if previous_stage else None
+    current_files = current["files"] if current else {}
+    previous_files = previous["files"] if previous else {}
+    stats = {"kept": 0, "linked": 0, "copied": 0, "removed": 0, "copied_bytes": 0}
+    manifest_files = {}
+
+    def sync(rel_path):
+        source_info = source_files[rel_path]
+        source_path = os.path.join(source, rel_path)
+        dst_path = os.path.join(stage_dir, rel_path)
+        unchanged, file_hash = _is_unchanged(
+            current_files.get(rel_path), source_info, source_path, dst_path, verify_hash
+        )
+        if unchanged and os.path.exists(dst_path):
+            return rel_path, "kept", file_hash
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+        previous_path = os.path.join(previous_stage, rel_path) if previous_stage else None
+        unchanged, file_hash = _is_unchanged(
+            previous_files.get(rel_path), source_info, source_path, previous_path, verify_hash
+        )
+        if unchanged:
+            try:
+                link_file(previous_path, dst_path)
+                return rel_path, "linked", file_hash
+            except OSError:
+                # Other drive or no hard link support, copy instead
+                pass
+        _copy(source_path, dst_path)
+        if verify_hash and file_hash is None:
+            file_hash = _hash_file(source_path)
+        return rel_path, "copied", file_hash
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for rel_path, action, file_hash in executor.map(sync, sorted(source_files)):
+            stats[action] += 1
+            if action == "copied":
+                stats["copied_bytes"] += source_files[rel_path][0]
+            manifest_files[rel_path] = source_files[rel_path] + [file_hash]
+
+    for rel_path in scan_tree(stage_dir):
+        if rel_path not in source_files:
+            os.remove(os.path.join(stage_dir, rel_path))
+            stats["removed"] += 1
+    for root, dirs, files in os.walk(stage_dir, topdown=False):
+        if root != stage_dir and not dirs and not files:
+            try:
+                os.rmdir(root)
+            except OSError:
+                pass
+
+    manifest_path = get_manifest_path(stage_dir)
+    with open(manifest_path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump({
+            "source": os.path.abspath(source),
+            "created": datetime.datetime.now().isoformat(timespec='seconds'),
+            "hashed": verify_hash,
+            "files": manifest_files,
+        }, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return stats
+
+def stage_payload(source, build_dir, name, verify_hash=False):
+    """Stage `source` as `<build_dir>/stage/<name>` and return its path.
+
+    Unchanged files are hard-linked from the newest stage of another build
+    folder next to `build_dir`.
+    """
+    stage_dir = os.path.join(build_dir, STAGE_DIRNAME, name)
+    build_root = os.path.dirname(os.path.abspath(build_dir))
+    previous_stage = find_previous_stage(build_root, name, exclude=stage_dir)
+    print(f"📦 Staging {name}: {source} -> {stage_dir}")
+    if previous_stage:
+        print(f"   Reusing unchanged files of: {previous_stage}")
+    os.makedirs(stage_dir, exist_ok=True)
+    stats = stage_tree(source, stage_dir, previous_stage, verify_hash=verify_hash)
+    print(f"✅ Staged {name}: {stats['kept']} kept, {stats['linked']} linked, "
+          f"{stats['copied']} copied ({stats['copied_bytes'] / 1e6:.1f} MB), "
+          f"{stats['removed']} removed")
+    return stage_dir
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incrementally stage a payload folder for the installer")
+    parser.add_argument('source', help='Folder to stage')
+    parser.add_argument('build_dir', help='Versioned build folder')
+    parser.add_argument('name', help='Name of the staged folder')
+    parser.add_argument('--verify_hash', action='store_true', help='Compare file hashes instead of size and modification time')
+    args = parser.parse_args(argv)
+    stage_payload(args.source, args.build_dir, args.name, verify_hash=args.verify_hash)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
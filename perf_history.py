@@ -0,0 +1,337 @@
+import os
+import sys
+import json
+import time
+import pathlib
+import sqlite3
+import hashlib
+import argparse
+import platform
+import datetime
+import statistics
+import urllib.request
+
+DB_FILENAME = "perf_history.sqlite3"
+# A step regressed when its latest duration exceeds the median of its
+# history by this factor and by at least MIN_DELTA_S seconds
+REGRESSION_FACTOR = 1.5
+MIN_DELTA_S = {"install": 10.0, "extras": 10.0, "launch": 1.0}
+MIN_HISTORY = 3
+HISTORY_WINDOW = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    start TEXT NOT NULL,
+    duration REAL,
+    status TEXT,
+    target TEXT,
+    config_key TEXT,
+    config TEXT,
+    version TEXT,
+    packages_cached INTEGER,
+    packages_downloaded INTEGER,
+    download_bytes INTEGER,
+    cache_hits INTEGER,
+    cache_misses INTEGER,
+    log TEXT
+);
+CREATE TABLE IF NOT EXISTS steps (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    step TEXT NOT NULL,
+    status TEXT,
+    duration REAL,
+    attempts INTEGER,
+    cpu_s REAL,
+    peak_rss_bytes INTEGER
+);
+CREATE INDEX IF NOT EXISTS steps_by_name ON steps(step, run_id);
+CREATE INDEX IF NOT EXISTS runs_by_config ON runs(kind, config_key, start);
+"""
+
+def get_db_path():
+    user_home_path = str(pathlib.Path.home())
+    return os.path.join(user_home_path, 'acdc-appdata', DB_FILENAME)
+
+def connect(db_path=None, read_only=False):
+    """Open the history database, None if `read_only` and it does not exist yet"""
+    db_path = db_path or get_db_path()
+    if read_only:
+        if not os.path.exists(db_path):
+            return None
+        conn = sqlite3.connect(
+            f"file:{urllib.request.pathname2url(os.path.abspath(db_path))}?mode=ro",
+            uri=True, timeout=30
+        )
+        conn.row_factory = sqlite3.Row
+        return conn
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    # Parallel batch installs write to the same database
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+def get_config(**fields):
+    """Configuration of a run, runs are only compared within one"""
+    config = {"platform": f"{platform.system().lower()}-{platform.machine().lower()}"}
+    config.update(_normalize_config(fields))
+    return config
+
+def _normalize_config(fields):
+    if fields.get("python"):
+        # Patch releases share a configuration
+        fields["python"] = ".".join(str(fields["python"]).split(".")[:2])
+    return fields
+
+def get_config_key(kind, config):
+    key_source = json.dumps([kind, config], sort_keys=True)
+    return hashlib.sha256(key_source.encode()).hexdigest()[:16]
+
+class RunRecorder:
+    """Collect the timings of one installer or launcher run.
+
+    Steps come from the progress events (pass `on_event` to the emitter's
+    `add_listener`) or from `add_step`. Nothing is written before `save`.
+    """
+    def __init__(self, kind):
+        self.kind = kind
+        self.start_time = time.time()
+        self.steps = []
+        self.config = get_config()
+        self.fields = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def on_event(self, event):
+        if event["event"] == "step_end":
+            resources = event.get("resources") or {}
+            self.add_step(
+                event["step"], event.get("duration"), event.get("status"),
+                attempts=event.get("attempts"), cpu_s=resources.get("cpu_s"),
+                peak_rss_bytes=resources.get("peak_rss_bytes"),
+                packages_cached=event.get("packages_cached"),
+                downloads=event.get("downloads"), download_bytes=event.get("download_bytes"),
+            )
+        elif event["event"] == "cache_check":
+            self.add_cache_check(event.get("hit", False))
+
+    def add_step(self, step, duration, status="success", **metrics):
+        self.steps.append({"step": step, "duration": duration, "status": status, **metrics})
+
+    def add_cache_check(self, hit):
+        if hit:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+
+    def set_config(self, **fields):
+        self.config.update(_normalize_config(fields))
+
+    def set(self, **fields):
+        """Set run fields that are not part of the configuration (e.g. version)"""
+        self.fields.update(fields)
+
+    def save(self, status, target=None, log=None, db_path=None):
+        def total(key):
+            return sum(step.get(key) or 0 for step in self.steps)
+        start = datetime.datetime.fromtimestamp(self.start_time).isoformat(timespec='seconds')
+        conn = connect(db_path)
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO runs (kind, start, duration, status, target, config_key, config, "
+                    "version, packages_cached, packages_downloaded, download_bytes, cache_hits, "
+                    "cache_misses, log) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self.kind, start, round(time.time() - self.start_time, 3), status,
+                     os.path.abspath(target) if target else None,
+                     get_config_key(self.kind, self.config), json.dumps(self.config, sort_keys=True),
+                     self.fields.get("version"), total("packages_cached"), total("downloads"),
+                     total("download_bytes"), self.cache_hits, self.cache_misses,
+                     os.path.basename(log) if log else None)
+                )
+                conn.executemany(
+                    "INSERT INTO steps (run_id, seq, step, status, duration, attempts, cpu_s, "
+                    "peak_rss_bytes) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(cursor.lastrowid, seq, step["step"], step["status"], step["duration"],
+                      step.get("attempts"), step.get("cpu_s"), step.get("peak_rss_bytes"))
+                     for seq, step in enumerate(self.steps)]
+                )
+        finally:
+            conn.close()
+        return cursor.lastrowid
+
+def read_installed_version(env_path):
+    """Version of the Cell-ACDC installed in the environment, None if not found"""
+    import extras_install
+    dist_info = extras_install.find_dist_info(env_path)
+    if dist_info is None:
+        return None
+    return os.path.basename(dist_info)[:-len(".dist-info")].rsplit("-", 1)[1]
+
+def _step_rows(conn, kind=None, target=None):
+    query = ("SELECT runs.id, runs.kind, runs.start, runs.config_key, runs.config, runs.version, "
+             "steps.step, steps.duration FROM steps JOIN runs ON runs.id = steps.run_id "
+             "WHERE steps.status = 'success' AND steps.duration IS NOT NULL")
+    params = []
+    if kind:
+        query += " AND runs.kind = ?"
+        params.append(kind)
+    if target:
+        query += " AND runs.target = ?"
+        params.append(os.path.abspath(target))
+    return conn.execute(query + " ORDER BY runs.start, runs.id", params).fetchall()
+
+def _group_steps(rows):
+    """Return {(kind, config_key, step): [rows, oldest first]}"""
+    groups = {}
+    for row in rows:
+        groups.setdefault((row["kind"], row["config_key"], row["step"]), []).append(row)
+    return groups
+
+def find_regressions(conn, kind=None, target=None, factor=REGRESSION_FACTOR,
+                     min_history=MIN_HISTORY, window=HISTORY_WINDOW):
+    """Compare the latest duration of every step with its history.
+
+    The history is the previous `window` successful runs of the step with
+    the same kind and configuration. Returns a list of dicts, worst first.
+    """
+    regressions = []
+    for (run_kind, config_key, step), rows in _group_steps(_step_rows(conn, kind, target)).items():
+        history = [row["duration"] for row in rows[:-1][-window:]]
+        if len(history) < min_history:
+            continue
+        latest = rows[-1]
+        median = statistics.median(history)
+        min_delta = MIN_DELTA_S.get(run_kind, 1.0)
+        if latest["duration"] > median * factor and latest["duration"] - median >= min_delta:
+            regressions.append({
+                "kind": run_kind,
+                "step": step,
+                "config": json.loads(latest["config"]),
+                "run_id": latest["id"],
+                "start": latest["start"],
+                "version": latest["version"],
+                "previous_version": rows[-2]["version"],
+                "duration": latest["duration"],
+                "median": round(median, 3),
+                "ratio": round(latest["duration"] / median, 2) if median else None,
+                "history": len(history),
+            })
+    regressions.sort(key=lambda regression: regression["duration"] - regression["median"], reverse=True)
+    return regressions
+
+def get_trends(conn, kind=None, target=None, last=HISTORY_WINDOW):
+    """Summarize the durations of every step over its last `last` runs"""
+    trends = []
+    for (run_kind, config_key, step), rows in _group_steps(_step_rows(conn, kind, target)).items():
+        durations = [row["duration"] for row in rows[-last:]]
+        half = len(durations) // 2
+        change = None
+        if half >= 2:
+            older = statistics.median(durations[:half])
+            newer = statistics.median(durations[-half:])
+            change = round((newer - older) / older * 100, 1) if older else None
+        trends.append({
+            "kind": run_kind,
+            "config_key": config_key,
+            "config": json.loads(rows[-1]["config"]),
+            "step": step,
+            "runs": len(durations),
+            "median": round(statistics.median(durations), 3),
+            "min": min(durations),
+            "max": max(durations),
+            "latest": durations[-1],
+            "change_pct": change,
+        })
+    trends.sort(key=lambda trend: (trend["kind"], trend["config_key"], trend["step"]))
+    return trends
+
+def get_step_estimates(conn, kind, config, window=HISTORY_WINDOW):
+    """Return {step: (median seconds, exact)} from successful runs of `kind`.
+
+    Repeated steps of a run are added up. Steps never recorded for `config`
+    fall back to the runs of every configuration, with exact=False.
+    """
+    config_key = get_config_key(kind, config)
+    rows = conn.execute(
+        "SELECT runs.config_key, steps.step, SUM(steps.duration) AS duration FROM steps "
+        "JOIN runs ON runs.id = steps.run_id WHERE runs.kind = ? AND runs.status = 'success' "
+        "AND steps.status = 'success' GROUP BY runs.id, steps.step ORDER BY runs.start, runs.id",
+        (kind,)
+    ).fetchall()
+    matching, other = {}, {}
+    for row in rows:
+        durations = matching if row["config_key"] == config_key else other
+        durations.setdefault(row["step"], []).append(row["duration"])
+    estimates = {step: (statistics.median(values[-window:]), False) for step, values in other.items()}
+    estimates.update({step: (statistics.median(values[-window:]), True) for step, values in matching.items()})
+    return estimates
+
+def _format_config(config):
+    return ", ".join(f"{key}={value}" for key, value in sorted(config.items()) if value is not None)
+
+def print_report(conn, kind=None, target=None, last=HISTORY_WINDOW):
+    trends = get_trends(conn, kind, target, last)
+    if not trends:
+        print("No performance history recorded yet.")
+        return []
+    current = None
+    for trend in trends:
+        if (trend["kind"], trend["config_key"]) != current:
+            current = (trend["kind"], trend["config_key"])
+            print(f"\n⏱️ {trend['kind']} runs ({_format_config(trend['config'])})")
+            print(f"   {'step':<28}{'runs':>5}{'median':>10}{'latest':>10}{'trend':>9}")
+        change = f"{trend['change_pct']:+.0f}%" if trend["change_pct"] is not None else "-"
+        print(f"   {trend['step']:<28}{trend['runs']:>5}{trend['median']:>9.1f}s"
+              f"{trend['latest']:>9.1f}s{change:>9}")
+
+    regressions = find_regressions(conn, kind, target)
+    print()
+    if not regressions:
+        print("✅ No step regressed compared with its history.")
+    for regression in regressions:
+        version = ""
+        if regression["version"] != regression["previous_version"]:
+            version = f", Cell-ACDC {regression['previous_version']} -> {regression['version']}"
+        print(f"⚠️ {regression['kind']} step '{regression['step']}' took {regression['duration']:.1f}s "
+              f"on {regression['start']}, {regression['ratio']}x its median of {regression['median']:.1f}s "
+              f"over {regression['history']} runs ({_format_config(regression['config'])}{version})")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the install and launch performance history")
+    parser.add_argument('command', nargs='?', default='report', choices=['report', 'regressions'])
+    parser.add_argument('--kind', choices=['install', 'extras', 'launch'], help='Only show installs, extras installs or launches')
+    parser.add_argument('--target', help='Only show runs of this installation folder')
+    parser.add_argument('--last', type=int, default=HISTORY_WINDOW, help='Number of runs per step in the trends')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    parser.add_argument('--db', help='Path of the history database')
+    args = parser.parse_args(argv)
+    conn = connect(args.db)
+    try:
+        if args.command == 'regressions':
+            regressions = find_regressions(conn, args.kind, args.target)
+            if args.json:
+                print(json.dumps(regressions, indent=4))
+            else:
+                for regression in regressions:
+                    print(f"⚠️ {regression['kind']} {regression['step']}: {regression['duration']:.1f}s "
+                          f"vs median {regression['median']:.1f}s")
+            # Non-zero exit for scripted checks
+            return 1 if regressions else 0
+        if args.json:
+            print(json.dumps({
+                "trends": get_trends(conn, args.kind, args.target, args.last),
+                "regressions": find_regressions(conn, args.kind, args.target),
+            }, indent=4))
+        else:
+            print_report(conn, args.kind, args.target, args.last)
+    finally:
+        conn.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
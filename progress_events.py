@@ -0,0 +1,211 @@
+import os
+import re
+import json
+import time
+import queue
+import socket
+import threading
+
+# Progress events of a step are sent at most this often, step start/end
+# and session events are always sent
+MIN_PROGRESS_INTERVAL = 0.25
+
+class EventEmitter:
+    """Write installer events as JSON lines to an optional sink.
+
+    `spec` selects the sink:
+      - None: events are only passed to in-process listeners
+      - "tcp://HOST:PORT": connect to a local socket
+      - "fd:N": write to an inherited file descriptor (e.g. a pipe)
+      - anything else: path of a file (or Windows named pipe) to append to
+
+    Writing happens in a background thread fed by a bounded queue, so that
+    a slow consumer never blocks the installation. When the queue is full,
+    progress events are dropped; once the sink is gone (e.g. a closed pipe),
+    nothing is queued anymore. `dropped` counts the events not written.
+    """
+    def __init__(self, spec=None, min_interval=MIN_PROGRESS_INTERVAL):
+        self.spec = spec
+        self.min_interval = min_interval
+        self.listeners = []
+        self.start_time = time.time()
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._last_progress = {}
+        self._pending_progress = {}
+        self._stream = None
+        self._queue = None
+        self._thread = None
+        self._sink_closed = threading.Event()
+        self.dropped = 0
+        if spec:
+            self._stream = self._open_sink(spec)
+            self._queue = queue.Queue(maxsize=1000)
+            self._thread = threading.Thread(
+                target=self._writer, name="acdc-events", daemon=True
+            )
+            self._thread.start()
+
+    @staticmethod
+    def _open_sink(spec):
+        if spec.startswith("tcp://"):
+            host, port = spec[len("tcp://"):].rsplit(":", 1)
+            sock = socket.create_connection((host, int(port)), timeout=5)
+            return sock.makefile('w', encoding='utf-8', newline='\n')
+        if spec.startswith("fd:"):
+            return os.fdopen(int(spec[len("fd:"):]), 'w', encoding='utf-8', closefd=False)
+        return open(spec, 'a', encoding='utf-8')
+
+    def _writer(self):
+        try:
+            while True:
+                line = self._queue.get()
+                if line is None:
+                    break
+                try:
+                    self._stream.write(line)
+                    self._stream.flush()
+                except (OSError, ValueError):
+                    # Consumer went away, keep installing without events
+                    self.dropped += 1
+                    break
+        finally:
+            self._sink_closed.set()
+
+    def add_listener(self, callback):
+        """Call `callback(event)` with every event, in the emitting thread"""
+        self.listeners.append(callback)
+
+    def emit(self, event, **fields):
+        with self._lock:
+            self._seq += 1
+            now = time.time()
+            record = {
+                "seq": self._seq,
+                "time": round(now, 3),
+                "elapsed": round(now - self.start_time, 3),
+                "event": event,
+                **fields,
+            }
+        for callback in self.listeners:
+            try:
+                callback(record)
+            except Exception:
+                pass
+        if self._queue is not None:
+            if self._sink_closed.is_set():
+                self.dropped += 1
+                return record
+            line = json.dumps(record) + "\n"
+            try:
+                if event == "progress":
+                    self._queue.put_nowait(line)
+                else:
+                    self._queue.put(line, timeout=1)
+            except queue.Full:
+                self.dropped += 1
+        return record
+
+    def progress(self, step, force=False, **fields):
+        """Emit a progress event for `step`, rate-limited per step"""
+        now = time.time()
+        if not force and now - self._last_progress.get(step, 0) < self.min_interval:
+            self._pending_progress[step] = fields
+            return
+        self._pending_progress.pop(step, None)
+        self._last_progress[step] = now
+        self.emit("progress", step=step, **fields)
+
+    def flush_progress(self, step):
+        """Send the last progress state of `step` held back by the rate limit"""
+        fields = self._pending_progress.pop(step, None)
+        if fields is not None:
+            self.progress(step, force=True, **fields)
+
+    def step_start(self, step, **fields):
+        return self.emit("step_start", step=step, **fields)
+
+    def step_end(self, step, status, duration, **fields):
+        self.flush_progress(step)
+        return self.emit(
+            "step_end", step=step, status=status, duration=round(duration, 3),
+            **fields
+        )
+
+    def close(self):
+        if self._thread is not None:
+            try:
+                if not self._sink_closed.is_set():
+                    self._queue.put(None, timeout=1)
+            except queue.Full:
+                pass
+            self._thread.join(timeout=2)
+            try:
+                self._stream.close()
+            except (OSError, ValueError):
+                pass
+            self._thread = None
+
+_SIZE_UNITS = {"B": 1, "KB": 1e3, "kB": 1e3, "MB": 1e6, "GB": 1e9}
+
+class OutputProgressParser:
+    """Turn pip/conda console output into a progress state.
+
+    Each call to `feed` returns True when the state changed.
+    """
+    patterns = [
+        ("solve", re.compile(r"^\s*(?:Collecting package metadata|Solving environment)")),
+        ("download", re.compile(r"^\s*Downloading and Extracting Packages")),
+        ("collect", re.compile(r"^\s*Collecting (\S+)")),
+        ("cached", re.compile(r"^\s*Using cached (\S+)(?: \(([\d.]+) ?(\w+)\))?")),
+        ("download", re.compile(r"^\s*Downloading (\S+)(?: \(([\d.]+) ?(\w+)\))?")),
+        ("build", re.compile(r"^\s*(?:Building wheels? for|Building editable for|Preparing (?:editable )?metadata)")),
+        ("install", re.compile(r"^\s*Installing collected packages: (.*)")),
+        ("done", re.compile(r"^\s*Successfully installed (.*)")),
+        ("install", re.compile(r"^\s*(?:Preparing|Verifying|Executing) transaction")),
+    ]
+
+    def __init__(self):
+        self.state = {
+            "phase": "start",
+            "packages_collected": 0,
+            "packages_cached": 0,
+            "downloads": 0,
+            "download_bytes": 0,
+            "packages_installed": 0,
+        }
+
+    def feed(self, line):
+        for phase, pattern in self.patterns:
+            match = pattern.match(line)
+            if match is None:
+                continue
+            state = self.state
+            state["phase"] = phase
+            if phase == "collect":
+                state["packages_collected"] += 1
+            elif phase == "cached":
+                state["packages_cached"] += 1
+            elif phase == "download" and match.groups() and match.group(1):
+                state["downloads"] += 1
+                if match.group(2):
+                    factor = _SIZE_UNITS.get(match.group(3), 1)
+                    state["download_bytes"] += int(float(match.group(2)) * factor)
+            elif phase == "done":
+                state["packages_installed"] = len(match.group(1).split())
+            return True
+        return False
+
+_emitter = EventEmitter()
+
+def configure(spec=None, min_interval=MIN_PROGRESS_INTERVAL):
+    """Replace the module emitter, used by `get_emitter`"""
+    global _emitter
+    listeners = _emitter.listeners
+    _emitter.close()
+    _emitter = EventEmitter(spec, min_interval=min_interval)
+    _emitter.listeners.extend(listeners)
+    return _emitter
+
+def get_emitter():
+    return _emitter
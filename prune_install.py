@@ -0,0 +1,311 @@
+import os
+import sys
+import glob
+import json
+import argparse
+import subprocess
+
+import env_integrity
+import fast_rmtree
+import conda_activation
+
+QUARANTINE_DIRNAME = ".acdc_prune_quarantine"
+
+# What the prune stage may remove. Patterns are globs relative to a root:
+#   - "target": the install folder
+#   - "miniforge": the embedded Miniforge
+#   - "env": the Cell-ACDC venv or conda environment
+#   - "site-packages": the site-packages folder of the environment
+#   - "clone": the Cell-ACDC clone of GitHub installs
+# A trailing "/" only matches folders. "keep" rules win over "drop" rules,
+# and nothing that the import smoke test loads is ever removed.
+DEFAULT_POLICY = {
+    "drop": [
+        {"root": "miniforge", "pattern": "pkgs/*.conda", "reason": "conda package archives"},
+        {"root": "miniforge", "pattern": "pkgs/*.tar.bz2", "reason": "conda package archives"},
+        {"root": "miniforge", "pattern": "pkgs/*/", "reason": "extracted conda package cache"},
+        {"root": "site-packages", "pattern": "~*/", "reason": "pip uninstall leftovers"},
+        {"root": "clone", "pattern": "build/", "reason": "pip build leftovers"},
+        {"root": "env", "pattern": "**/__pycache__/*.opt-[12].pyc", "reason": "optimized bytecode duplicates"},
+        {"root": "site-packages", "pattern": "numpy/**/tests/", "reason": "test suites"},
+        {"root": "site-packages", "pattern": "scipy/**/tests/", "reason": "test suites"},
+        {"root": "site-packages", "pattern": "pandas/tests/", "reason": "test suites"},
+        {"root": "site-packages", "pattern": "skimage/**/tests/", "reason": "test suites"},
+        {"root": "site-packages", "pattern": "matplotlib/tests/", "reason": "test suites"},
+        {"root": "site-packages", "pattern": "sklearn/**/tests/", "reason": "test suites"},
+        {"root": "site-packages", "pattern": "torch/test/", "reason": "test suites"},
+    ],
+    "keep": [
+        {"root": "site-packages", "pattern": "cellacdc/"},
+        {"root": "clone", "pattern": "cellacdc/"},
+    ],
+}
+
+# Modules imported by the smoke test before and after pruning. Modules that
+# already fail to import before pruning are not required afterwards.
+SMOKE_TEST_MODULES = [
+    "cellacdc",
+    "numpy",
+    "scipy.ndimage",
+    "pandas",
+    "skimage",
+    "matplotlib",
+    "qtpy",
+]
+
+_SMOKE_TEST_SCRIPT = """
+import sys, json, importlib
+ok = []
+for module in sys.argv[1:]:
+    try:
+        importlib.import_module(module)
+        ok.append(module)
+    except Exception:
+        pass
+files = [getattr(m, '__file__', None) for m in list(sys.modules.values())]
+print(json.dumps({"ok": ok, "files": [f for f in files if f]}))
+"""
+
+def load_policy(policy_path=None):
+    """Return the default policy, with the rules of a JSON file appended"""
+    policy = {key: list(rules) for key, rules in DEFAULT_POLICY.items()}
+    if policy_path:
+        with open(policy_path, 'r', encoding='utf-8') as f:
+            custom = json.load(f)
+        for key in ("drop", "keep"):
+            policy[key].extend(custom.get(key, []))
+    return policy
+
+def get_roots(target_dir, env_path, clone_path=None):
+    roots = {
+        "target": target_dir,
+        "miniforge": os.path.join(target_dir, "miniforge"),
+        "env": env_path,
+        "clone": clone_path,
+    }
+    try:
+        roots["site-packages"] = env_integrity.get_site_packages(env_path)
+    except FileNotFoundError:
+        roots["site-packages"] = None
+    return {name: path for name, path in roots.items() if path and os.path.isdir(path)}
+
+def _norm(path):
+    return os.path.normcase(os.path.abspath(path.rstrip("/\\")))
+
+def _is_within(path, folder):
+    return path == folder or path.startswith(folder.rstrip(os.sep) + os.sep)
+
+def _match_rules(roots, rules):
+    matches = []
+    for rule in rules:
+        root = roots.get(rule["root"])
+        if root is None:
+            continue
+        for path in glob.glob(os.path.join(root, rule["pattern"]), recursive=True):
+            matches.append((_norm(path), rule))
+    return matches
+
+def measure_tree(path):
+    """Return (bytes, files) of a folder, counting hard-linked files once.
+
+    Trees moved aside for deletion (e.g. a previous conda venv still being
+    removed in the background) are not counted.
+    """
+    seen = set()
+    total_bytes, n_files = 0, 0
+    stack = [path]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            if fast_rmtree.is_trash(entry.name):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+                n_files += 1
+                inode = entry.inode()
+                if inode and inode in seen:
+                    continue
+                seen.add(inode)
+                total_bytes += entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                continue
+    return total_bytes, n_files
+
+def run_smoke_test(env_path, modules=SMOKE_TEST_MODULES, timeout=300, env=None):
+    """Import `modules` in the environment.
+
+    `env` is the environment of the process, for a conda env the one with
+    its activation applied (as the launcher runs Cell-ACDC), since some
+    packages only import with it.
+    Returns (modules imported, files loaded by the imports).
+    """
+    python_exec = env_integrity.get_env_python(env_path)
+    result = subprocess.run(
+        [python_exec, "-c", _SMOKE_TEST_SCRIPT, *modules],
+        capture_output=True, text=True, encoding='utf-8', errors='replace',
+        timeout=timeout, env=env
+    )
+    try:
+        output = json.loads(result.stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        return [], set()
+    return output["ok"], {_norm(path) for path in output["files"]}
+
+def find_candidates(roots, policy, protected_files):
+    """Return [(path, reason)] of the paths to remove, without nested paths.
+
+    Paths matching a keep rule, containing a kept path or containing a file
+    loaded by the smoke test are left out.
+    """
+    kept = [path for path, _ in _match_rules(roots, policy["keep"])]
+    protected = sorted(protected_files)
+    candidates = []
+    n_protected = 0
+    for path, rule in sorted(_match_rules(roots, policy["drop"])):
+        if any(_is_within(path, chosen) for chosen, _ in candidates):
+            continue
+        if any(_is_within(path, k) or _is_within(k, path) for k in kept):
+            continue
+        if any(_is_within(f, path) for f in protected):
+            n_protected += 1
+            continue
+        candidates.append((path, rule.get("reason", rule["pattern"])))
+    return candidates, n_protected
+
+def _quarantine(candidates, target_dir, quarantine_dir):
+    """Move the candidates into the quarantine folder, keeping their layout"""
+    moved = []
+    for path, reason in candidates:
+        dst = os.path.join(quarantine_dir, os.path.relpath(path, target_dir))
+        try:
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            os.replace(path, dst)
+        except OSError as e:
+            print(f"   ⚠️ Could not move {path}: {e}")
+            continue
+        moved.append((path, dst, reason))
+    return moved
+
+def _restore(moved):
+    for path, dst, _ in reversed(moved):
+        try:
+            os.replace(dst, path)
+        except OSError as e:
+            print(f"   ⚠️ Could not restore {path}: {e}")
+
+def get_smoke_test_env(install_details, env_path):
+    """Environment to run the smoke test in, activated for conda envs"""
+    activation = install_details.get("activation")
+    if install_details.get("conda") and conda_activation.is_valid(activation, env_path):
+        return conda_activation.apply(activation)
+    return None
+
+def prune(target_dir, env_path, clone_path=None, policy=None, dry_run=False, env=None):
+    """Remove what the install does not need to run.
+
+    The removed paths are first moved aside and the smoke test is repeated
+    (in `env`, see `run_smoke_test`); if a module that imported before
+    pruning fails afterwards, everything is restored. Returns a summary
+    dict with the sizes before and after.
+    """
+    if policy is None:
+        policy = load_policy()
+    roots = get_roots(target_dir, env_path, clone_path)
+    before_bytes, before_files = measure_tree(target_dir)
+    summary = {
+        "before_bytes": before_bytes,
+        "before_files": before_files,
+        "after_bytes": before_bytes,
+        "after_files": before_files,
+        "removed": 0,
+        "protected": 0,
+        "by_reason": {},
+        "restored": False,
+    }
+
+    print("🔍 Running import smoke test before pruning...")
+    baseline_ok, loaded_files = run_smoke_test(env_path, env=env)
+    print(f"   Imported: {', '.join(baseline_ok) if baseline_ok else 'nothing'}")
+    candidates, summary["protected"] = find_candidates(roots, policy, loaded_files)
+    # Paths outside of the install folder (e.g. a custom clone) are left alone
+    target_norm = _norm(target_dir)
+    candidates = [(path, reason) for path, reason in candidates if _is_within(path, target_norm)]
+    if summary["protected"]:
+        print(f"   🛡️ Kept {summary['protected']} paths needed by the smoke test")
+
+    for path, reason in candidates:
+        size, _ = measure_tree(path) if os.path.isdir(path) else (os.path.getsize(path), 1)
+        summary["by_reason"][reason] = summary["by_reason"].get(reason, 0) + size
+    if dry_run:
+        summary["removed"] = len(candidates)
+        summary["candidates"] = [path for path, _ in candidates]
+        return summary
+
+    quarantine_dir = os.path.join(target_dir, QUARANTINE_DIRNAME)
+    fast_rmtree.remove_tree(quarantine_dir, progress=None)
+    moved = _quarantine(candidates, target_dir, quarantine_dir)
+    summary["removed"] = len(moved)
+
+    print("🔍 Running import smoke test after pruning...")
+    after_ok, _ = run_smoke_test(env_path, env=env)
+    broken = [module for module in baseline_ok if module not in after_ok]
+    if broken:
+        print(f"   ❌ Pruning broke imports of {', '.join(broken)}, restoring all removed files")
+        _restore(moved)
+        summary["removed"] = 0
+        summary["by_reason"] = {}
+        summary["restored"] = True
+    fast_rmtree.remove_tree(quarantine_dir)
+
+    summary["after_bytes"], summary["after_files"] = measure_tree(target_dir)
+    return summary
+
+def format_size(n_bytes):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n_bytes) < 1024 or unit == "GB":
+            return f"{n_bytes:.1f} {unit}" if unit != "B" else f"{n_bytes} B"
+        n_bytes /= 1024
+
+def print_summary(summary):
+    saved_bytes = summary["before_bytes"] - summary["after_bytes"]
+    saved_files = summary["before_files"] - summary["after_files"]
+    print(f"Disk Usage: {format_size(summary['before_bytes'])} ({summary['before_files']} files)"
+          f" -> {format_size(summary['after_bytes'])} ({summary['after_files']} files)")
+    print(f"Pruned: {format_size(saved_bytes)} in {saved_files} files"
+          f"{' (restored after failed smoke test)' if summary['restored'] else ''}")
+    for reason, size in sorted(summary["by_reason"].items(), key=lambda item: -item[1]):
+        print(f"   {reason}: {format_size(size)}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Remove package caches, build leftovers and test suites from a Cell-ACDC install"
+    )
+    parser.add_argument('--target', required=True, help='Cell-ACDC install folder')
+    parser.add_argument('--policy', help='JSON file with additional keep/drop rules')
+    parser.add_argument('--dry_run', action='store_true', help='Only list what would be removed')
+    args = parser.parse_args(argv)
+
+    with open(os.path.join(args.target, "install_details.json"), 'r') as f:
+        install_details = json.load(f)
+    summary = prune(
+        args.target, install_details["venv_path"],
+        clone_path=install_details.get("clone_path") or None,
+        policy=load_policy(args.policy), dry_run=args.dry_run,
+        env=get_smoke_test_env(install_details, install_details["venv_path"])
+    )
+    if args.dry_run:
+        for path in summary["candidates"]:
+            print(path)
+        for reason, size in sorted(summary["by_reason"].items(), key=lambda item: -item[1]):
+            print(f"Would prune {reason}: {format_size(size)}")
+    else:
+        print_summary(summary)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+import os
+import sys
+import json
+import time
+import threading
+
+# Seconds between two samples of a step's process tree
+DEFAULT_INTERVAL = 0.5
+SIDECAR_SUFFIX = ".telemetry.jsonl"
+
+class Sampler:
+    """Platform layer: reads the resource usage of single processes.
+
+    `sample(pid)` returns a dict with "cpu_s", "rss", "read_bytes",
+    "write_bytes" and "threads" (missing values as None), or None if the
+    process is gone. `children(pid)` returns the direct child pids.
+    """
+    name = "none"
+
+    def children(self, pid):
+        return []
+
+    def sample(self, pid):
+        return None
+
+class ProcSampler(Sampler):
+    """Linux sampler reading /proc, no dependencies"""
+    name = "proc"
+
+    def __init__(self):
+        self.ticks = os.sysconf("SC_CLK_TCK")
+        self.page_size = os.sysconf("SC_PAGE_SIZE")
+
+    @staticmethod
+    def is_available():
+        return sys.platform.startswith("linux") and os.path.exists("/proc/self/stat")
+
+    def children(self, pid):
+        children = []
+        try:
+            tasks = os.listdir(f"/proc/{pid}/task")
+        except OSError:
+            return children
+        for task in tasks:
+            try:
+                with open(f"/proc/{pid}/task/{task}/children", 'r') as f:
+                    children.extend(int(child) for child in f.read().split())
+            except OSError:
+                return self._children_by_scan(pid)
+        return children
+
+    def _children_by_scan(self, pid):
+        # Kernels without /proc/<pid>/task/<tid>/children
+        children = []
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            fields = self._read_stat(entry)
+            if fields is not None and int(fields[1]) == pid:
+                children.append(int(entry))
+        return children
+
+    @staticmethod
+    def _read_stat(pid):
+        try:
+            with open(f"/proc/{pid}/stat", 'r') as f:
+                data = f.read()
+        except OSError:
+            return None
+        # The command name may contain spaces, the fields start after it
+        return data[data.rfind(")") + 2:].split()
+
+    def sample(self, pid):
+        fields = self._read_stat(pid)
+        if fields is None:
+            return None
+        # Fields from /proc/<pid>/stat, counted from the state (field 3)
+        result = {
+            "cpu_s": (int(fields[11]) + int(fields[12])) / self.ticks,
+            "threads": int(fields[17]),
+            "rss": int(fields[21]) * self.page_size,
+            "read_bytes": None,
+            "write_bytes": None,
+        }
+        try:
+            with open(f"/proc/{pid}/io", 'r') as f:
+                for line in f:
+                    key, _, value = line.partition(":")
+                    if key in ("read_bytes", "write_bytes"):
+                        result[key] = int(value)
+        except OSError:
+            pass
+        return result
+
+class PsutilSampler(Sampler):
+    """Sampler for other platforms, psutil is bundled into the frozen installer"""
+    name = "psutil"
+
+    def __init__(self):
+        import psutil
+        self.psutil = psutil
+
+    @staticmethod
+    def is_available():
+        try:
+            import psutil
+        except ImportError:
+            return False
+        return True
+
+    def children(self, pid):
+        try:
+            return [child.pid for child in self.psutil.Process(pid).children()]
+        except self.psutil.Error:
+            return []
+
+    def sample(self, pid):
+        try:
+            process = self.psutil.Process(pid)
+            with process.oneshot():
+                cpu_times = process.cpu_times()
+                result = {
+                    "cpu_s": cpu_times.user + cpu_times.system,
+                    "threads": process.num_threads(),
+                    "rss": process.memory_info().rss,
+                    "read_bytes": None,
+                    "write_bytes": None,
+                }
+                try:
+                    io = process.io_counters()
+                    result["read_bytes"] = io.read_bytes
+                    result["write_bytes"] = io.write_bytes
+                except (AttributeError, self.psutil.Error):
+                    pass
+            return result
+        except self.psutil.Error:
+            return None
+
+# Tried in order, the first available sampler is used
+SAMPLERS = [ProcSampler, PsutilSampler]
+
+def register_sampler(sampler_class, first=True):
+    """Add a platform sampler, a class with `is_available()` and the Sampler methods"""
+    if first:
+        SAMPLERS.insert(0, sampler_class)
+    else:
+        SAMPLERS.append(sampler_class)
+
+def get_sampler():
+    for sampler_class in SAMPLERS:
+        try:
+            if sampler_class.is_available():
+                return sampler_class()
+        except Exception:
+            continue
+    return Sampler()
+
+def _total_memory():
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def _children_cpu_s():
+    """CPU time of all reaped child processes of this process (POSIX)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+class StepMonitor:
+    """Samples the process tree of a running step in a background thread"""
+    def __init__(self, pid, interval=DEFAULT_INTERVAL, sampler=None):
+        self.pid = pid
+        self.interval = interval
+        self.sampler = sampler or get_sampler()
+        self.last = {}
+        self.peak_rss = 0
+        self.peak_threads = 0
+        self.peak_processes = 0
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="acdc-telemetry", daemon=True)
+        self._start_time = None
+        self._start_children_cpu = None
+
+    def start(self):
+        self._start_time = time.time()
+        self._start_children_cpu = _children_cpu_s()
+        self._thread.start()
+        return self
+
+    def _tree(self):
+        pids, stack = [], [self.pid]
+        while stack:
+            pid = stack.pop()
+            pids.append(pid)
+            stack.extend(self.sampler.children(pid))
+        return pids
+
+    def sample_once(self):
+        rss, threads, processes = 0, 0, 0
+        for pid in self._tree():
+            values = self.sampler.sample(pid)
+            if values is None:
+                continue
+            # Cumulative counters of processes that exit later are kept
+            self.last[pid] = values
+            rss += values["rss"] or 0
+            threads += values["threads"] or 0
+            processes += 1
+        self.peak_rss = max(self.peak_rss, rss)
+        self.peak_threads = max(self.peak_threads, threads)
+        self.peak_processes = max(self.peak_processes, processes)
+        self.samples += 1
+
+    def _run(self):
+        while True:
+            try:
+                self.sample_once()
+            except Exception:
+                pass
+            if self._stop.wait(self.interval):
+                break
+
+    def stop(self):
+        """Stop sampling and return the summary of the step"""
+        self._stop.set()
+        self._thread.join(timeout=5)
+        duration = time.time() - self._start_time
+
+        def total(key):
+            values = [values[key] for values in self.last.values() if values[key] is not None]
+            return sum(values) if values else None
+
+        cpu_s = total("cpu_s")
+        children_cpu = _children_cpu_s()
+        if children_cpu is not None and self._start_children_cpu is not None:
+            # Exact for the reaped process tree, sampling misses short-lived processes
+            cpu_s = max(cpu_s or 0, children_cpu - self._start_children_cpu)
+        summary = {
+            "sampler": self.sampler.name,
+            "interval_s": self.interval,
+            "samples": self.samples,
+            "duration_s": round(duration, 3),
+            "cpu_s": round(cpu_s, 3) if cpu_s is not None else None,
+            "peak_rss_bytes": self.peak_rss or None,
+            "read_bytes": total("read_bytes"),
+            "write_bytes": total("write_bytes"),
+            "peak_threads": self.peak_threads or None,
+            "peak_processes": self.peak_processes or None,
+        }
+        summary["bound"] = classify(summary)
+        return summary
+
+def classify(summary):
+    """Guess what limited a step: "cpu", "memory", "disk" or "waiting"
+
+    "waiting" means little CPU and disk activity, i.e. network or locks.
+    """
+    duration = summary["duration_s"]
+    if not duration or summary["cpu_s"] is None:
+        return None
+    total_memory = _total_memory()
+    if total_memory and summary["peak_rss_bytes"] and summary["peak_rss_bytes"] > 0.8 * total_memory:
+        return "memory"
+    if summary["cpu_s"] / duration >= 0.7:
+        return "cpu"
+    io_bytes = (summary["read_bytes"] or 0) + (summary["write_bytes"] or 0)
+    if io_bytes / duration > 20e6:
+        return "disk"
+    return "waiting"
+
+def format_summary(summary):
+    def mb(value):
+        return f"{value / 1e6:.1f} MB" if value is not None else "n/a"
+    cpu = f"{summary['cpu_s']:.1f}s" if summary["cpu_s"] is not None else "n/a"
+    return (f"CPU {cpu}, peak RSS {mb(summary['peak_rss_bytes'])}, "
+            f"read {mb(summary['read_bytes'])}, written {mb(summary['write_bytes'])}, "
+            f"peak threads {summary['peak_threads'] or 'n/a'}"
+            f"{', likely ' + summary['bound'] + '-bound' if summary['bound'] in ('cpu', 'memory', 'disk') else ''}"
+            f"{', mostly waiting (network or locks)' if summary['bound'] == 'waiting' else ''}")
+
+_interval = DEFAULT_INTERVAL
+_sidecar_path = None
+_sidecar_lock = threading.Lock()
+
+def configure(interval=DEFAULT_INTERVAL, log_path=None):
+    """Set the sampling interval (0 disables sampling) and the sidecar file.
+
+    The sidecar is written next to the log, as JSON lines with one record
+    per step.
+    """
+    global _interval, _sidecar_path
+    _interval = interval
+    _sidecar_path = log_path + SIDECAR_SUFFIX if log_path else None
+    return _sidecar_path
+
+def monitor(pid):
+    """Start monitoring the process tree of `pid`, None if disabled"""
+    if not _interval or _interval <= 0:
+        return None
+    return StepMonitor(pid, interval=_interval).start()
+
+def record(step, summary, **fields):
+    """Append the summary of a step to the sidecar file"""
+    if _sidecar_path is None:
+        return
+    line = json.dumps({"step": step, "time": round(time.time(), 3), **fields, **summary})
+    with _sidecar_lock:
+        try:
+            with open(_sidecar_path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+        except OSError:
+            pass
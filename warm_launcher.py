@@ -0,0 +1,136 @@
+import os
+import sys
+import json
+import codecs
+import socket
+import subprocess
+
+SERVER_SCRIPT = "acdc_warm_server.py"
+STATE_DIRNAME = ".acdc_warm"
+STATE_FILENAME = "server.json"
+EXIT_MARKER = b"\x00ACDC-EXIT:"
+IDLE_TIMEOUT = 1800
+
+def is_supported():
+    """Warm launches fork the server process, so they need POSIX"""
+    return os.name == "posix"
+
+def get_state_dir(target_dir):
+    return os.path.join(target_dir, STATE_DIRNAME)
+
+def find_server_script(target_dir):
+    """Return the server script shipped next to the launcher, if any"""
+    candidates = [os.path.join(target_dir, SERVER_SCRIPT)]
+    if not getattr(sys, 'frozen', False):
+        candidates.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), SERVER_SCRIPT))
+    for candidate in candidates:
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+def read_state(target_dir):
+    state_path = os.path.join(get_state_dir(target_dir), STATE_FILENAME)
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _connect(state, timeout=2):
+    return socket.create_connection(("127.0.0.1", state["port"]), timeout=timeout)
+
+def _send_request(sock, request):
+    sock.sendall(json.dumps(request).encode('utf-8') + b"\n")
+
+def is_server_running(target_dir):
+    """Whether a warm server of the install answers a ping"""
+    state = read_state(target_dir)
+    if state is None:
+        return False
+    try:
+        with _connect(state, timeout=1) as sock:
+            _send_request(sock, {"token": state["token"], "ping": True})
+            return sock.recv(16).startswith(b"pong")
+    except (OSError, KeyError):
+        return False
+
+def start_server(target_dir, env_python, idle_timeout=IDLE_TIMEOUT, env=None):
+    """Start the warm server in the background, detached from the launcher
+
+    `env` is the environment of the server (default: the launcher's).
+    Returns False if the server script is missing or the platform has no fork.
+    """
+    server_script = find_server_script(target_dir)
+    if server_script is None or not is_supported():
+        return False
+    state_dir = get_state_dir(target_dir)
+    os.makedirs(state_dir, exist_ok=True)
+    server_log = open(os.path.join(state_dir, "server.log"), 'a', encoding='utf-8')
+    subprocess.Popen(
+        [env_python, server_script, "--state_dir", state_dir,
+         "--idle_timeout", str(idle_timeout)],
+        stdin=subprocess.DEVNULL, stdout=server_log, stderr=subprocess.STDOUT,
+        cwd=target_dir, start_new_session=True, env=env
+    )
+    server_log.close()
+    return True
+
+def launch(target_dir, argv, env=None):
+    """Run Cell-ACDC in a process forked from the warm server.
+
+    The output of Cell-ACDC is printed as it arrives. Returns the exit code,
+    or None if no warm server is available (the caller then cold starts).
+    """
+    state = read_state(target_dir)
+    if state is None or not is_supported():
+        return None
+    try:
+        sock = _connect(state)
+        _send_request(sock, {
+            "token": state["token"],
+            "argv": list(argv),
+            "cwd": os.getcwd(),
+            "env": env or {},
+        })
+        sock.settimeout(None)
+    except (OSError, KeyError):
+        return None
+
+    exit_code = None
+    pending = b""
+    got_output = False
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    with sock:
+        while True:
+            try:
+                chunk = sock.recv(65536)
+            except OSError:
+                break
+            if not chunk:
+                break
+            got_output = True
+            pending += chunk
+            idx = pending.find(EXIT_MARKER)
+            if idx >= 0:
+                _write_output(decoder.decode(pending[:idx], final=True))
+                code = pending[idx + len(EXIT_MARKER):].split(b"\n", 1)[0]
+                try:
+                    exit_code = int(code)
+                except ValueError:
+                    exit_code = 1
+                break
+            # Keep a tail in case the marker is split across chunks
+            keep = len(EXIT_MARKER)
+            _write_output(decoder.decode(pending[:-keep]))
+            pending = pending[-keep:]
+    if exit_code is None:
+        if not got_output:
+            # Server went away before accepting the request
+            return None
+        exit_code = 1
+    return exit_code
+
+def _write_output(text):
+    if text:
+        sys.stdout.write(text)
+        sys.stdout.flush()
@@ -0,0 +1,299 @@
+import os
+import re
+import glob
+import json
+import shutil
+import hashlib
+import pathlib
+import tempfile
+import datetime
+import subprocess
+import urllib.parse
+import urllib.request
+
+import env_integrity
+
+# Bounds of the build cache, least recently used entries are evicted first
+MAX_WHEELHOUSES = 10
+MAX_RECORDS = 200
+MAX_CACHE_MB = 2000
+
+# Never part of the source-tree hash
+IGNORED_DIRS = {".git", "__pycache__", "build", "dist", ".tox", ".nox", ".eggs"}
+
+def get_default_cache_dir():
+    user_home_path = str(pathlib.Path.home())
+    return os.path.join(user_home_path, 'acdc-appdata', '.acdc-cache')
+
+def git_output(git_exec, source_path, *args):
+    result = subprocess.run(
+        [git_exec, "-C", source_path, *args], capture_output=True, text=True,
+        encoding='utf-8', errors='replace', timeout=60
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    return result.stdout.strip()
+
+def _tree_hash(source_path):
+    """Hash of paths, sizes and mtimes of all files of a source tree"""
+    sha256 = hashlib.sha256()
+    for root, dirs, files in os.walk(source_path):
+        dirs[:] = sorted(
+            d for d in dirs if d not in IGNORED_DIRS and not d.endswith(".egg-info")
+        )
+        for filename in sorted(files):
+            path = os.path.join(root, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            rel_path = os.path.relpath(path, source_path).replace(os.sep, "/")
+            sha256.update(f"{rel_path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return sha256.hexdigest()
+
+def get_source_key(source_path, git_exec="git"):
+    """Identify the state of a source tree.
+
+    Returns "git:<commit>" for a clean git checkout, otherwise a hash of the
+    tree ("tree:<hash>"), which also covers uncommitted changes.
+    """
+    try:
+        commit = git_output(git_exec, source_path, "rev-parse", "HEAD")
+        # Build leftovers written into the source do not change its state
+        status = git_output(
+            git_exec, source_path, "status", "--porcelain", "--", ".",
+            ":(exclude)*.egg-info", ":(exclude)build"
+        )
+        if not status:
+            return f"git:{commit}"
+    except (OSError, RuntimeError, subprocess.SubprocessError):
+        pass
+    return f"tree:{_tree_hash(source_path)}"
+
+def get_dependency_hash(source_path):
+    """Hash of the files that declare the dependencies of a source tree"""
+    sha256 = hashlib.sha256()
+    filenames = ["pyproject.toml", "setup.py", "setup.cfg"]
+    filenames += sorted(
+        os.path.basename(path)
+        for path in glob.glob(os.path.join(source_path, "requirements*.txt"))
+    )
+    for filename in filenames:
+        path = os.path.join(source_path, filename)
+        if not os.path.exists(path):
+            continue
+        sha256.update(filename.encode() + b"\0")
+        with open(path, 'rb') as f:
+            sha256.update(f.read())
+    return sha256.hexdigest()
+
+def read_build_requires(source_path):
+    """Return the build requirements of a source tree.
+
+    These are the [build-system] requires of pyproject.toml, plus wheel,
+    which pip only adds on its own to isolated builds (needed by setuptools
+    before 70.1).
+    """
+    requires = _read_pyproject_requires(source_path)
+    if not any(re.match(r"wheel\b", requirement) for requirement in requires):
+        requires.append("wheel")
+    return requires
+
+def _read_pyproject_requires(source_path):
+    pyproject_path = os.path.join(source_path, "pyproject.toml")
+    if not os.path.exists(pyproject_path):
+        return ["setuptools>=40.8.0", "wheel"]
+    try:
+        import tomllib
+        with open(pyproject_path, 'rb') as f:
+            build_system = tomllib.load(f).get("build-system", {})
+        return list(build_system.get("requires", ["setuptools>=40.8.0", "wheel"]))
+    except ImportError:
+        pass
+    # Python < 3.11, look for the requires list of the build-system table
+    with open(pyproject_path, 'r', encoding='utf-8', errors='replace') as f:
+        content = f.read()
+    section = re.search(r"^\[build-system\](.*?)(?=^\[|\Z)", content, re.S | re.M)
+    if section:
+        requires = re.search(r"requires\s*=\s*\[(.*?)\]", section.group(1), re.S)
+        if requires:
+            return re.findall(r"[\"']([^\"']+)[\"']", requires.group(1))
+    return ["setuptools>=40.8.0", "wheel"]
+
+def _entry_path(cache_dir, kind, key):
+    return os.path.join(cache_dir, "builds", kind, key)
+
+def _touch(path):
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+def _path_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for filename in files:
+            try:
+                total += os.path.getsize(os.path.join(root, filename))
+            except OSError:
+                pass
+    return total
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        os.remove(path)
+
+def evict(cache_dir, max_wheelhouses=MAX_WHEELHOUSES, max_records=MAX_RECORDS,
+          max_cache_mb=MAX_CACHE_MB):
+    """Remove least recently used build cache entries beyond the bounds"""
+    removed = 0
+    entries = []
+    for kind, max_entries in (("wheelhouses", max_wheelhouses), ("records", max_records)):
+        paths = glob.glob(os.path.join(cache_dir, "builds", kind, "*"))
+        paths = [path for path in paths if not path.endswith(".tmp")]
+        paths.sort(key=os.path.getmtime, reverse=True)
+        for path in paths[max_entries:]:
+            _remove(path)
+            removed += 1
+        entries.extend(paths[:max_entries])
+
+    entries.sort(key=os.path.getmtime)
+    sizes = {path: _path_size(path) for path in entries}
+    total_bytes = sum(sizes.values())
+    for path in entries:
+        if total_bytes <= max_cache_mb * 1024 * 1024:
+            break
+        _remove(path)
+        total_bytes -= sizes[path]
+        removed += 1
+    return removed
+
+def _record_key(env_path, source_path):
+    normalized = [os.path.normcase(os.path.abspath(path)) for path in (env_path, source_path)]
+    return hashlib.sha256("\0".join(normalized).encode()).hexdigest()[:32]
+
+def _find_editable_dist(env_path, source_path):
+    """Return the dist-info of the editable install of `source_path`, if any"""
+    try:
+        site_packages = env_integrity.get_site_packages(env_path)
+    except FileNotFoundError:
+        return None
+    source_path = os.path.normcase(os.path.abspath(source_path))
+    for direct_url_path in glob.glob(os.path.join(site_packages, "*.dist-info", "direct_url.json")):
+        try:
+            with open(direct_url_path, 'r', encoding='utf-8', errors='replace') as f:
+                direct_url = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if not direct_url.get("dir_info", {}).get("editable"):
+            continue
+        url_path = urllib.request.url2pathname(urllib.parse.urlparse(direct_url.get("url", "")).path)
+        if os.path.normcase(os.path.abspath(url_path)) == source_path:
+            return os.path.dirname(direct_url_path)
+    return None
+
+class BuildCache:
+    """Cache of editable installs from a local source tree.
+
+    Two things are cached:
+      - a wheelhouse of the build requirements, keyed on the requirements and
+        the Python version, so that builds run without an isolated build
+        environment that pip would otherwise download and set up every time
+      - a record of every editable install, keyed on the environment and the
+        source path, storing the source key (commit or tree hash) it was
+        built from. Reinstalling an unchanged source skips the build.
+    """
+    def __init__(self, cache_dir, git_exec="git"):
+        self.cache_dir = cache_dir
+        self.git_exec = git_exec
+
+    def _record_path(self, env_path, source_path):
+        return _entry_path(self.cache_dir, "records", _record_key(env_path, source_path) + ".json")
+
+    def read_record(self, env_path, source_path, touch=True):
+        path = self._record_path(env_path, source_path)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if touch:
+            _touch(path)
+        return record
+
+    def write_record(self, env_path, source_path, source_key, **extra):
+        path = self._record_path(env_path, source_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        record = {
+            "env_path": env_path,
+            "source_path": source_path,
+            "source_key": source_key,
+            "built": datetime.datetime.now().isoformat(timespec='seconds'),
+            **extra,
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, indent=4)
+        return record
+
+    def check(self, env_path, source_path, source_key, dependency_hash, touch=True):
+        """Compare the source with its last editable install in the environment.
+
+        Returns "unchanged" if the same source state was installed,
+        "code_only" if only code changed (an editable install picks that up
+        without reinstalling), or None if a new install is needed.
+        `touch=False` leaves the eviction order of the cache as it is.
+        """
+        record = self.read_record(env_path, source_path, touch=touch)
+        if record is None or _find_editable_dist(env_path, source_path) is None:
+            return None
+        if record.get("source_key") == source_key:
+            return "unchanged"
+        if record.get("dependency_hash") == dependency_hash:
+            return "code_only"
+        return None
+
+    def get_wheelhouse(self, requires, python_version, pip_cmd, run):
+        """Return a folder with wheels of the build requirements.
+
+        The wheels are downloaded with `pip_cmd` (pip of the target
+        environment) on first use, `run` executes the command.
+        """
+        key_source = json.dumps([sorted(requires), python_version, os.name])
+        key = hashlib.sha256(key_source.encode()).hexdigest()[:16]
+        wheelhouse = _entry_path(self.cache_dir, "wheelhouses", key)
+        if os.path.isdir(wheelhouse):
+            print(f"♻️ Using cached build requirements: {wheelhouse}")
+            _touch(wheelhouse)
+            return wheelhouse, True
+
+        print(f"📥 Caching build requirements {requires} in: {wheelhouse}")
+        os.makedirs(os.path.dirname(wheelhouse), exist_ok=True)
+        # Unique per process, installs sharing the cache may run concurrently
+        tmp_wheelhouse = tempfile.mkdtemp(
+            prefix=os.path.basename(wheelhouse) + ".", suffix=".tmp",
+            dir=os.path.dirname(wheelhouse)
+        )
+        try:
+            run(pip_cmd + ["wheel", "--wheel-dir", tmp_wheelhouse, *requires])
+            try:
+                os.replace(tmp_wheelhouse, wheelhouse)
+            except OSError:
+                if not os.path.isdir(wheelhouse):
+                    raise
+                # Another install cached the same requirements meanwhile
+                print(f"♻️ Using cached build requirements: {wheelhouse}")
+                return wheelhouse, True
+        finally:
+            shutil.rmtree(tmp_wheelhouse, ignore_errors=True)
+        return wheelhouse, False
+
+def get_python_version(python_exec):
+    result = subprocess.run(
+        [python_exec, "-c", "import sys; print('%d.%d' % sys.version_info[:2])"],
+        capture_output=True, text=True, timeout=60
+    )
+    return result.stdout.strip()